@@ -4,13 +4,12 @@ from fastapi.security import OAuth2PasswordRequestForm
 from typing import Any
 
 # Use absolute imports when running as a module
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_and_update_password, hash_password, create_access_token
 from app.core.config import settings
-from app.core.database import users_collection
+from app.repositories.user import user_repository
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.token import Token
 from app.models.user import UserModel
-from bson import ObjectId
 
 router = APIRouter()
 
@@ -20,14 +19,14 @@ async def register(user_data: UserCreate) -> Any:
     Register a new user
     """
     # Check if user with the same email exists
-    if users_collection.find_one({"email": user_data.email}):
+    if await user_repository.get_by_email(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email already exists",
         )
 
     # Check if user with the same username exists
-    if users_collection.find_one({"username": user_data.username}):
+    if await user_repository.get_by_username(user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this username already exists",
@@ -38,14 +37,11 @@ async def register(user_data: UserCreate) -> Any:
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await hash_password(user_data.password),
     )
 
     # Insert user into database
-    result = users_collection.insert_one(user.model_dump(by_alias=True))
-
-    # Get the created user
-    created_user = users_collection.find_one({"_id": result.inserted_id})
+    created_user = await user_repository.create(user)
 
     # Convert ObjectId to string
     created_user["id"] = str(created_user["_id"])
@@ -58,15 +54,23 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     OAuth2 compatible token login, get an access token for future requests
     """
     # Find user by username
-    user = users_collection.find_one({"username": form_data.username})
+    user = await user_repository.get_by_username(form_data.username)
+
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password(form_data.password, user["hashed_password"])
 
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Upgrade the stored hash if the work factor has changed
+    if new_hash:
+        await user_repository.update(user["_id"], {"hashed_password": new_hash})
+
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -1,91 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Any, List, Optional
-import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import time
 
 # Use absolute imports when running as a module
-from app.core.database import chat_messages_collection, sessions_collection, memories_collection
+from app.repositories.session import session_repository
+from app.repositories.chat import chat_message_repository
+from app.repositories.pagination import encode_cursor
 from app.schemas.chat import ChatMessageCreate, ChatMessageResponse, ChatHistoryResponse
+from app.schemas.memory import MemoryType
 from app.api.endpoints.dependencies import get_current_active_user
 from app.models.chat import ChatMessageModel, MessageType
 from app.core.config import settings
-from bson import ObjectId
+from app.services.memory_cache import get_memory_index
+from app.services.memory_index import UserMemoryIndex
+from app.services.embeddings import get_embedder
+from app.services.prompt import estimate_tokens, prompt_assembler
+from app.services.session_summary import session_preview
+from app.services.search import get_search_backend
+from app.services.llm import get_llm
+from app.services.memory_extraction import memory_extractor
+from app.services.ndjson import GZIP_MEDIA_TYPE, NDJSON_MEDIA_TYPE, chunked, dumps_line, gzipped
+from app.services.metrics import StageTimer, record_llm_usage, record_prompt
+from app.services.admission import AdmissionRejected, llm_admission
+from app.services.serialization import DocumentSerializer, FastJSONResponse, dumps
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-def get_memory_from_mongo(user_id: str, memo_type: str) -> List[dict]:
-    """
-    Retrieve memories from MongoDB for a specific user and memory type
-    """
-    memories = list(memories_collection.find({
-        "user_id": user_id,
-        "memo_type": memo_type
-    }).sort("created_at", -1))
+LLM_ERROR_MESSAGE = "I'm sorry, I encountered an error while processing your request. Please try again later."
 
-    return memories
+# Encodes chat history pages without re-validating every message
+message_serializer = DocumentSerializer(ChatMessageResponse)
 
-def format_core_memories(memories: List[dict]) -> str:
-    """
-    Format core memories into a string for the system prompt
+# Saves that must outlive the request that started them; kept referenced until they finish
+pending_saves: Set[asyncio.Task] = set()
+
+def select_memories(
+    index: UserMemoryIndex, query: str
+) -> Tuple[List[Tuple[dict, float]], List[Tuple[dict, float]]]:
     """
-    if not memories:
-        return ""
+    Pick the candidate core and environment memories for the prompt
 
-    formatted_memories = []
-    for memory in memories:
-        created_at = memory.get("created_at")
-        if isinstance(created_at, datetime.datetime):
-            created_at_str = created_at.isoformat()
-        else:
-            created_at_str = str(created_at)
+    Returns (memory, relevance) pairs for the top MEMORY_TOP_K memories of
+    each type ranked by cosine similarity to the user's message, or for
+    every memory if MEMORY_TOP_K is 0.
+    """
+    top_k = settings.MEMORY_TOP_K if settings.MEMORY_TOP_K > 0 else len(index)
 
-        formatted_memories.append(f"- {memory.get('content', '')} (Recorded: {created_at_str})")
+    query_vector = get_embedder().embed_one(query)
+    core_candidates = index.search(query_vector, top_k, MemoryType.CORE)
+    environment_candidates = index.search(query_vector, top_k, MemoryType.ENVIRONMENT)
 
-    return "Core Memories:\n" + "\n".join(formatted_memories)
+    return core_candidates, environment_candidates
 
-def format_environment_memories(memories: List[dict]) -> str:
+@router.get("/admission/stats")
+async def get_admission_stats(current_user: dict = Depends(get_current_active_user)) -> Any:
     """
-    Format environment memories into a string for context
+    Get this worker's LLM concurrency, queue depth and rejection counters
     """
-    if not memories:
-        return ""
-
-    formatted_memories = []
-    for memory in memories:
-        created_at = memory.get("created_at")
-        if isinstance(created_at, datetime.datetime):
-            created_at_str = created_at.isoformat()
-        else:
-            created_at_str = str(created_at)
-
-        formatted_memories.append(f"- {memory.get('content', '')} (Recorded: {created_at_str})")
-
-    return "Environment/Event Memories:\n" + "\n".join(formatted_memories)
+    return llm_admission.stats()
 
 @router.get("/{session_id}/messages", response_model=ChatHistoryResponse)
 async def get_chat_history(
     session_id: str,
     limit: int = Query(50, ge=1, le=100),
-    skip: int = Query(0, ge=0),
+    before: Optional[str] = Query(None, description="Cursor; get messages older than this position"),
+    after: Optional[str] = Query(None, description="Cursor; get messages newer than this position"),
     current_user: dict = Depends(get_current_active_user)
 ) -> Any:
     """
     Get chat history for a specific session
+
+    Returns the most recent messages first. Pass `next_cursor` back as
+    `before` to page further into the past, or as `after` when paging
+    forwards with `after`. Messages within a page are always in
+    chronological order.
     """
-    # Check if session exists and belongs to the user
-    try:
-        session = sessions_collection.find_one({
-            "_id": ObjectId(session_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
+    if before and after:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only one of before and after can be given",
         )
 
+    # Check if session exists and belongs to the user
+    session = await session_repository.get_for_user(session_id, str(current_user["_id"]))
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -93,148 +99,427 @@ async def get_chat_history(
         )
 
     # Get chat messages
-    messages = list(
-        chat_messages_collection.find({"session_id": session_id})
-        .sort("timestamp", 1)
-        .skip(skip)
-        .limit(limit)
+    try:
+        messages, has_more = await chat_message_repository.list_page(
+            session_id, limit, before=before, after=after, projection=message_serializer.projection
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+    # The next page continues from the oldest message when walking
+    # backwards, or from the newest one when walking forwards
+    next_cursor = None
+    if has_more:
+        edge = messages[-1] if after else messages[0]
+        next_cursor = encode_cursor(edge["timestamp"], edge["_id"])
+
+    # Encode directly rather than validating each message against the response model
+    return FastJSONResponse(dumps({
+        "messages": message_serializer.items(messages),
+        "session_id": session_id,
+        "next_cursor": next_cursor,
+    }))
+
+async def transcript_lines(sessions: List[dict]):
+    """
+    Stream the messages of the given sessions as JSON lines, session by session
+
+    Each session's messages come from their own cursor over the
+    (session_id, timestamp, _id) index, one batch at a time.
+    """
+    for session in sessions:
+        session_id = str(session["_id"])
+        messages = chat_message_repository.iterate_for_session(session_id, settings.EXPORT_CURSOR_BATCH_SIZE)
+        async for message in messages:
+            yield dumps_line({
+                "id": str(message["_id"]),
+                "session_id": session_id,
+                "session_name": session.get("name"),
+                "message_type": message["message_type"],
+                "content": message["content"],
+                "timestamp": message["timestamp"],
+                "model_used": message.get("model_used"),
+                "reasoning": message.get("reasoning"),
+                "metadata": message.get("metadata"),
+            })
+
+def transcript_response(sessions: List[dict], filename: str, compress: bool) -> StreamingResponse:
+    """
+    Build a streamed JSON Lines transcript download, optionally gzipped
+    """
+    body = chunked(transcript_lines(sessions))
+    if compress:
+        body = gzipped(body)
+        filename += ".gz"
+
+    return StreamingResponse(
+        body,
+        media_type=GZIP_MEDIA_TYPE if compress else NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
-    # Convert ObjectId to string
-    for message in messages:
-        message["id"] = str(message["_id"])
+@router.get("/export")
+async def export_all_transcripts(
+    gzip: bool = Query(False, description="Compress the transcript with gzip"),
+    current_user: dict = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """
+    Export the messages of all of the current user's sessions as JSON Lines
 
-    return {"messages": messages, "session_id": session_id}
+    The transcript is streamed straight from database cursors, so it is
+    never held in memory in full.
+    """
+    sessions = await session_repository.list_for_user(str(current_user["_id"]))
+    return transcript_response(sessions, "transcripts.jsonl", gzip)
 
-@router.post("/{session_id}/messages", response_model=ChatMessageResponse)
-async def send_message(
+@router.get("/{session_id}/export")
+async def export_transcript(
     session_id: str,
-    message_data: ChatMessageCreate,
+    gzip: bool = Query(False, description="Compress the transcript with gzip"),
     current_user: dict = Depends(get_current_active_user)
-) -> Any:
+) -> StreamingResponse:
     """
-    Send a message in a chat session and get a response
+    Export every message of a session as JSON Lines, oldest first
     """
     # Check if session exists and belongs to the user
-    try:
-        session = sessions_collection.find_one({
-            "_id": ObjectId(session_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
+    session = await session_repository.get_for_user(session_id, str(current_user["_id"]))
+    if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found",
         )
 
+    return transcript_response([session], f"transcript-{session_id}.jsonl", gzip)
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Format a single Server-Sent Events frame
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    """
+    Answer a rejected chat request with 429 if the user is over their rate, else 503
+    """
+    if e.reason == "user_rate":
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="You are sending messages too quickly. Please wait a moment.",
+            headers={"Retry-After": e.retry_after_header},
+        )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The assistant is busy right now. Please try again shortly.",
+        headers={"Retry-After": e.retry_after_header},
+    )
+
+def check_chat_rate(current_user: dict) -> None:
+    """
+    Turn away a user over their message rate before the turn's real work is done
+
+    Raises:
+        HTTPException: 429 if the user is over their rate
+    """
+    try:
+        llm_admission.check_user(str(current_user["_id"]))
+    except AdmissionRejected as e:
+        raise admission_error(e)
+
+async def acquire_llm_slot(turn: "ChatTurn") -> Callable[[], None]:
+    """
+    Wait for a free LLM slot for a chat turn
+
+    If the turn is shed, the user's rate token taken by `check_chat_rate`
+    is given back.
+
+    Returns:
+        A function releasing the slot
+
+    Raises:
+        HTTPException: 503 if the worker is overloaded
+    """
+    try:
+        with turn.timer.stage("llm_queue"):
+            return await llm_admission.acquire(turn.model_name, turn.user_message.user_id)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+
+class ChatTurn(NamedTuple):
+    user_message: ChatMessageModel
+    model_name: str
+    messages: list
+    metadata: dict
+    timer: StageTimer
+
+async def prepare_chat_turn(
+    session_id: str, message_data: ChatMessageCreate, current_user: dict, endpoint: str
+) -> ChatTurn:
+    """
+    Build the user's message and the LLM prompt for a chat turn
+
+    Nothing is written here; the user's message is stored together with the
+    bot's reply by `save_chat_turn` once the response has been generated,
+    or, for a streamed turn, on its own by `save_user_message` before the
+    stream starts.
+    Each stage is timed under `endpoint`.
+
+    Raises:
+        HTTPException: 404 if the session doesn't exist or belongs to another
+            user, 429 if the user is over their message rate
+    """
+    timer = StageTimer(endpoint)
+
+    # Check if session exists and belongs to the user
+    with timer.stage("session_lookup"):
+        session = await session_repository.get_for_user(session_id, str(current_user["_id"]))
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found",
         )
 
+    # Charge the user's rate only for a valid request, so 404s don't drain it
+    check_chat_rate(current_user)
+
     # Create user message
     user_message = ChatMessageModel(
         session_id=session_id,
         user_id=str(current_user["_id"]),
         content=message_data.content,
         message_type=MessageType.USER,
+        reasoning=message_data.reasoning,
     )
 
-    # Insert user message into database
-    user_message_result = chat_messages_collection.insert_one(user_message.model_dump(by_alias=True))
+    # Get the memories relevant to this message
+    with timer.stage("memory_fetch"):
+        memory_index = await get_memory_index(str(current_user["_id"]))
+    with timer.stage("memory_select"):
+        core_candidates, environment_candidates = select_memories(memory_index, message_data.content)
 
-    # Update session's last_message_at
-    now = datetime.datetime.now(datetime.timezone.utc)
-    sessions_collection.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$set": {"last_message_at": now, "updated_at": now}}
-    )
+    # Determine which model to use based on reasoning flag
+    model_name = settings.REASONING_LLM_MODEL if message_data.reasoning else settings.NON_REASONING_LLM_MODEL
 
-    # Get memories for context
-    core_memories = get_memory_from_mongo(str(current_user["_id"]), "core_memory")
-    environment_memories = get_memory_from_mongo(str(current_user["_id"]), "environment_memory")
+    # Fit the system prompt, memories and user query into the token budget
+    with timer.stage("prompt_assembly"):
+        prompt = prompt_assembler.assemble(message_data.content, core_candidates, environment_candidates)
 
-    # Format memories
-    core_memories_text = format_core_memories(core_memories)
-    environment_memories_text = format_environment_memories(environment_memories)
+        # Create messages for LLM
+        messages = [
+            SystemMessage(content=prompt.system_prompt),
+            HumanMessage(content=prompt.human_message)
+        ]
+    record_prompt(endpoint, prompt.metadata)
 
-    # Determine which model to use based on reasoning flag
-    model_name = settings.REASONING_LLM_MODEL if message_data.reasoning else settings.NON_REASONING_LLM_MODEL
+    return ChatTurn(user_message, model_name, messages, {"prompt": prompt.metadata}, timer)
 
-    # Initialize LLM
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=0.7,
-            max_output_tokens=2048,
-            top_k=40,
-            top_p=0.95,
-            google_api_key=settings.GEMINI_API_KEY or settings.GOOGLE_API_KEY
-        )
-    except Exception as e:
-        # If there's an error initializing the LLM, return an error message
-        bot_message = ChatMessageModel(
-            session_id=session_id,
-            user_id=str(current_user["_id"]),
-            content=f"I'm sorry, I couldn't initialize the language model. Error: {str(e)}",
-            message_type=MessageType.BOT,
-            model_used="error",
-            reasoning=message_data.reasoning,
-        )
+async def store_messages(messages: List[ChatMessageModel], preview: str) -> List[dict]:
+    """
+    Insert messages of one session and record them on the session's summary
 
-        # Insert bot message into database
-        bot_message_result = chat_messages_collection.insert_one(bot_message.model_dump(by_alias=True))
+    The summary is updated only once the insert has finished, and skips a
+    session that is being deleted. If the session was deleted meanwhile,
+    the reaper may already have gone past these messages, so they are
+    removed again rather than left behind without a session.
+    """
+    first = messages[0]
+    documents = await chat_message_repository.create_many(messages)
+    touched = await session_repository.touch(
+        first.session_id,
+        first.timestamp,
+        preview=preview,
+        messages=len(messages),
+        tokens=sum(estimate_tokens(message.content) for message in messages),
+    )
+    if not touched:
+        await chat_message_repository.delete_by_ids([document["_id"] for document in documents])
+        return documents
+
+    # Make the messages searchable where the search index is kept locally
+    get_search_backend().index_messages(first.user_id, documents)
+    return documents
+
+async def save_chat_turn(
+    turn: ChatTurn,
+    content: str,
+    model_used: str,
+    metadata: Optional[dict] = None,
+    include_user_message: bool = True,
+) -> dict:
+    """
+    Store both messages of a chat turn and return the bot's reply as a response document
+
+    The two messages go in one `insert_many`, followed by one update of the
+    session's summary (last_message_at, preview, message and token totals),
+    and the reply is built from the local model rather than read back from
+    the database. The bot message's metadata carries the turn's stage
+    timings up to this point under `timings_ms`. With `include_user_message`
+    off only the reply is stored, for a turn whose user message was saved
+    by `save_user_message`.
+    """
+    user_message = turn.user_message
+    metadata = {**(metadata or {}), "timings_ms": turn.timer.milliseconds()}
+    bot_message = ChatMessageModel(
+        session_id=user_message.session_id,
+        user_id=user_message.user_id,
+        content=content,
+        message_type=MessageType.BOT,
+        model_used=model_used,
+        reasoning=user_message.reasoning,
+        metadata=metadata,
+    )
 
-        # Get the created bot message
-        created_bot_message = chat_messages_collection.find_one({"_id": bot_message_result.inserted_id})
+    # Insert both messages and update the session's summary
+    with turn.timer.stage("save"):
+        messages = [user_message, bot_message] if include_user_message else [bot_message]
+        documents = await store_messages(messages, session_preview(content))
 
-        # Convert ObjectId to string
-        if created_bot_message:
-            created_bot_message["id"] = str(created_bot_message["_id"])
+    # Convert ObjectId to string
+    bot_document = documents[-1]
+    bot_document["id"] = str(bot_document["_id"])
 
-        return created_bot_message
+    return bot_document
 
-    # Create system prompt with core memories
-    system_prompt = "You are a personalized AI assistant that remembers details about the user and provides helpful, accurate responses."
-    if core_memories_text:
-        system_prompt += f"\n\n{core_memories_text}"
+async def save_user_message(turn: ChatTurn) -> None:
+    """
+    Store only the user's message of a turn, ahead of its reply
+    """
+    await store_messages([turn.user_message], session_preview(turn.user_message.content))
 
-    # Create human message with environment memories and user query
-    human_message_content = message_data.content
-    if environment_memories_text:
-        human_message_content = f"{environment_memories_text}\n\nUser Query: {message_data.content}"
+def start_save(save: Awaitable[Any]) -> "asyncio.Task[Any]":
+    """
+    Run a save as its own task, so it completes even if the request that
+    started it is cancelled
+    """
+    task = asyncio.ensure_future(save)
+    pending_saves.add(task)
+    task.add_done_callback(pending_saves.discard)
+    return task
 
-    # Create messages for LLM
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=human_message_content)
-    ]
+@router.post("/{session_id}/messages", response_model=ChatMessageResponse)
+async def send_message(
+    session_id: str,
+    message_data: ChatMessageCreate,
+    current_user: dict = Depends(get_current_active_user)
+) -> Any:
+    """
+    Send a message in a chat session and get a response
+    """
+    turn = await prepare_chat_turn(session_id, message_data, current_user, "send_message")
 
-    # Generate response
+    # Get the shared LLM client
     try:
-        ai_response = llm.invoke(messages)
-        bot_response_text = ai_response.content
+        llm = get_llm(turn.model_name)
     except Exception as e:
-        bot_response_text = f"I'm sorry, I encountered an error while processing your request. Please try again later."
+        # If there's an error initializing the LLM, return an error message
+        return await save_chat_turn(
+            turn, f"I'm sorry, I couldn't initialize the language model. Error: {str(e)}", "error"
+        )
 
-    # Create bot message
-    bot_message = ChatMessageModel(
-        session_id=session_id,
-        user_id=str(current_user["_id"]),
-        content=bot_response_text,
-        message_type=MessageType.BOT,
-        model_used=model_name,
-        reasoning=message_data.reasoning,
+    # Generate response once a slot is free
+    prompt_tokens = turn.metadata["prompt"]["estimated_tokens"]
+    release_slot = await acquire_llm_slot(turn)
+    try:
+        with turn.timer.stage("llm"):
+            ai_response = await llm.ainvoke(turn.messages)
+        bot_response_text = ai_response.content
+    except Exception:
+        logger.warning(f"Generating a reply with {turn.model_name} failed", exc_info=True)
+        record_llm_usage(turn.model_name, None, prompt_tokens, "", failed=True)
+        bot_response_text = LLM_ERROR_MESSAGE
+    else:
+        record_llm_usage(turn.model_name, getattr(ai_response, "usage_metadata", None), prompt_tokens, bot_response_text)
+        memory_extractor.enqueue(turn.user_message.user_id, message_data.content, bot_response_text)
+    finally:
+        release_slot()
+
+    return await save_chat_turn(turn, bot_response_text, turn.model_name, turn.metadata)
+
+@router.post("/{session_id}/messages/stream")
+async def stream_message(
+    session_id: str,
+    message_data: ChatMessageCreate,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """
+    Send a message in a chat session and stream the response as Server-Sent Events
+
+    Emits a `token` event for each chunk as the model produces it, then a
+    single `message` event carrying the saved bot message. The user's message
+    is saved as the stream starts, so it is kept however the stream ends; if
+    the client disconnects, generation is cancelled and no reply is saved.
+    Rate limiting and load shedding happen before the stream starts, so they
+    are answered with a plain 429 or 503.
+    """
+    turn = await prepare_chat_turn(session_id, message_data, current_user, "stream_message")
+    release_slot = await acquire_llm_slot(turn)
+    # Saved alongside generation rather than after it, so a stream that is
+    # cancelled, closed or never iterated still keeps what the user sent
+    user_message_saved = start_save(save_user_message(turn))
+
+    async def event_stream():
+        # Get the shared LLM client
+        try:
+            llm = get_llm(turn.model_name)
+        except Exception as e:
+            await asyncio.shield(user_message_saved)
+            bot_message = await save_chat_turn(
+                turn, f"I'm sorry, I couldn't initialize the language model. Error: {str(e)}", "error",
+                include_user_message=False,
+            )
+            yield format_sse("message", ChatMessageResponse(**bot_message).model_dump(mode="json"))
+            return
+
+        # Generate response, forwarding chunks as they arrive
+        chunks: List[str] = []
+        # Token counts arrive as per-chunk deltas
+        usage: dict = {}
+        prompt_tokens = turn.metadata["prompt"]["estimated_tokens"]
+        started = time.perf_counter()
+        stream = llm.astream(turn.messages)
+        try:
+            async for chunk in stream:
+                if await request.is_disconnected():
+                    return
+                for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                    if isinstance(value, int):
+                        usage[key] = usage.get(key, 0) + value
+                if chunk.content:
+                    if not chunks:
+                        turn.timer.add("first_token", time.perf_counter() - started)
+                    chunks.append(chunk.content)
+                    yield format_sse("token", {"content": chunk.content})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning(f"Streaming a reply from {turn.model_name} failed", exc_info=True)
+            record_llm_usage(turn.model_name, None, prompt_tokens, "", failed=True)
+            chunks = [LLM_ERROR_MESSAGE]
+            yield format_sse("error", {"detail": LLM_ERROR_MESSAGE})
+        else:
+            record_llm_usage(turn.model_name, usage, prompt_tokens, "".join(chunks))
+            memory_extractor.enqueue(turn.user_message.user_id, message_data.content, "".join(chunks))
+        finally:
+            # Closing the model stream cancels generation if we stopped early
+            await stream.aclose()
+            release_slot()
+            # Includes the time spent sending tokens to the client
+            turn.timer.add("llm", time.perf_counter() - started)
+
+        # The reply must follow the user's message in the session's summary
+        await asyncio.shield(user_message_saved)
+        bot_message = await save_chat_turn(
+            turn, "".join(chunks), turn.model_name, turn.metadata, include_user_message=False
+        )
+        yield format_sse("message", ChatMessageResponse(**bot_message).model_dump(mode="json"))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Frees the slot if the stream never got to run
+        background=BackgroundTask(release_slot),
     )
-
-    # Insert bot message into database
-    bot_message_result = chat_messages_collection.insert_one(bot_message.model_dump(by_alias=True))
-
-    # Get the created bot message
-    created_bot_message = chat_messages_collection.find_one({"_id": bot_message_result.inserted_id})
-
-    # Convert ObjectId to string
-    created_bot_message["id"] = str(created_bot_message["_id"])
-
-    return created_bot_message
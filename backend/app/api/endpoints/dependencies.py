@@ -2,12 +2,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from typing import Optional
-from bson import ObjectId
+import time
 
 # Use absolute imports when running as a module
 from app.core.config import settings
-from app.core.database import users_collection
+from app.repositories.user import user_repository
 from app.schemas.token import TokenPayload
+from app.services.auth_cache import token_cache, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -30,22 +31,36 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    # Decode the token unless this worker has already verified it
+    user_id = token_cache.get(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+            )
+            user_id: str = payload.get("sub")
+            if user_id is None:
+                raise credentials_exception
+            token_data = TokenPayload(sub=user_id)
+        except JWTError:
             raise credentials_exception
-        token_data = TokenPayload(sub=user_id)
-    except JWTError:
-        raise credentials_exception
 
-    user = users_collection.find_one({"_id": ObjectId(token_data.sub)})
+        user_id = token_data.sub
+        expires_at = payload.get("exp")
+        ttl_seconds = expires_at - time.time() if expires_at is not None else None
+        token_cache.set(token, user_id, ttl_seconds=ttl_seconds)
+
+    # Look up the user, allowing at most USER_CACHE_TTL_SECONDS of staleness
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        version = user_cache.version()
+        user = await user_repository.get_by_id(user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user, version)
 
-    return user
+    # Handlers may annotate the document, so never hand out the cached one
+    return dict(user)
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
     """
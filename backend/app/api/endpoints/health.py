@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from typing import Any
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+# Use absolute imports when running as a module
+from app.core.config import settings
+from app.core.database import database
+from app.core.migrations import LATEST_VERSION, applied_version
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/live")
+async def live() -> Any:
+    """
+    Liveness: the worker is up and its event loop is responding
+
+    Never touches the database, so an outage there does not get healthy
+    workers restarted. Only connection counts are returned, since the
+    endpoint is unauthenticated.
+    """
+    return {"status": "alive", "pool": database.pool_counts()}
+
+@router.get("/ready")
+async def ready() -> Any:
+    """
+    Readiness: the database answers and its indexes are up to date
+
+    Answers 503 when the database does not respond within
+    HEALTH_PING_TIMEOUT_SECONDS or index migrations are pending, so the
+    load balancer stops routing to the worker until it recovers. The
+    endpoint is unauthenticated, so the response carries only the status
+    and connection counts; the reason for a 503 is logged instead.
+    """
+    content = {"status": "ready", "pool": database.pool_counts()}
+    try:
+        _, version = await asyncio.wait_for(
+            asyncio.gather(database.ping(), applied_version(database)),
+            settings.HEALTH_PING_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Readiness check failed: {str(e) or type(e).__name__}; pool: {database.pool_state()}")
+        content["status"] = "unavailable"
+        return JSONResponse(content, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if version < LATEST_VERSION:
+        logger.warning(f"Readiness check failed: index migrations at version {version} of {LATEST_VERSION}")
+        content["status"] = "migrations_pending"
+        return JSONResponse(content, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return content
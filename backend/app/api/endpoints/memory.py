@@ -1,49 +1,282 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Any, List, Optional, Tuple
+import asyncio
+import json
 
 # Use absolute imports when running as a module
-from app.core.database import memories_collection
-from app.schemas.memory import MemoryCreate, MemoryUpdate, MemoryResponse, MemoryType
+from app.repositories.memory import memory_repository
+from app.schemas.memory import (
+    MemoryCreate, MemoryCreateResponse, MemoryUpdate, MemoryResponse, MemoryType,
+    MemoryImportLine, MemoryImportError, MemoryImportResponse, MemoryListItem,
+)
+from app.repositories.pagination import encode_cursor
 from app.api.endpoints.dependencies import get_current_active_user
 from app.models.memory import MemoryModel
-from bson import ObjectId
+from app.services.memory_cache import memory_context_cache
+from app.services.embeddings import embedding_fields, embedding_fields_many
+from app.services.ndjson import NDJSON_MEDIA_TYPE, chunked, dumps_line, iter_lines
+from app.services.dedup import BatchDuplicateFilter, consolidate_user_memories, dedup_fields, find_near_duplicate
+from app.services.serialization import DocumentSerializer
+from app.core.config import settings
 from datetime import datetime
 
 router = APIRouter()
 
-@router.get("/", response_model=List[MemoryResponse])
+# Fields a memory listing can be projected to; `id` is always included
+MEMORY_LIST_FIELDS = ("user_id", "content", "memo_type", "created_at")
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Page size when a cursor is given without a limit
+DEFAULT_PAGE_SIZE = 50
+
+# Encodes memory pages without re-validating every memory; like
+# response_model_exclude_unset, fields that weren't fetched are left out
+memory_serializer = DocumentSerializer(MemoryListItem, exclude_missing=True)
+
+def import_fields(contents: List[str]) -> List[dict]:
+    """
+    Compute the embedding and deduplication fields of a batch of imported memories
+    """
+    return [
+        {**embeddings, **dedup_fields(content)}
+        for content, embeddings in zip(contents, embedding_fields_many(contents))
+    ]
+
+@router.get("/", response_model=List[MemoryListItem], response_model_exclude_unset=True)
 async def get_memories(
     memo_type: str = Query(None, description="Filter by memory type (core_memory or environment_memory)"),
+    since: Optional[datetime] = Query(None, description="Only memories created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only memories created before this time"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; without it and a cursor, every memory is returned"),
+    cursor: Optional[str] = Query(None, description="Value of the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated fields to return: {', '.join(MEMORY_LIST_FIELDS)}"),
     current_user: dict = Depends(get_current_active_user)
 ) -> Any:
     """
-    Get all memories for the current user, optionally filtered by type
+    Get the current user's memories, newest first
+
+    Without `limit` or `cursor` every memory is returned, as before
+    pagination existed. With either, one page is returned, of `limit` or
+    DEFAULT_PAGE_SIZE memories, and when more memories follow the cursor
+    for the next page is in the X-Next-Cursor response header. With
+    `fields`, each memory only carries `id` and the listed fields.
     """
-    query = {"user_id": str(current_user["_id"])}
+    # Validate memo_type filter if provided
+    if memo_type and memo_type not in [MemoryType.CORE, MemoryType.ENVIRONMENT]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid memory type. Must be one of: {MemoryType.CORE}, {MemoryType.ENVIRONMENT}",
+        )
 
-    # Add memo_type filter if provided
-    if memo_type:
-        if memo_type not in [MemoryType.CORE, MemoryType.ENVIRONMENT]:
+    # Validate the projection if provided
+    projected_fields = None
+    if fields:
+        projected_fields = [field.strip() for field in fields.split(",") if field.strip() and field.strip() != "id"]
+        unknown = [field for field in projected_fields if field not in MEMORY_LIST_FIELDS]
+        if unknown:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid memory type. Must be one of: {MemoryType.CORE}, {MemoryType.ENVIRONMENT}",
+                detail=f"Unknown fields: {', '.join(unknown)}. Must be among: {', '.join(MEMORY_LIST_FIELDS)}",
             )
-        query["memo_type"] = memo_type
 
-    memories = list(memories_collection.find(query).sort("created_at", -1))
+    try:
+        memories, has_more = await memory_repository.list_page(
+            str(current_user["_id"]),
+            limit if limit is not None or cursor is None else DEFAULT_PAGE_SIZE,
+            memo_type=memo_type,
+            since=since,
+            until=until,
+            cursor=cursor,
+            fields=projected_fields if projected_fields is not None else MEMORY_LIST_FIELDS,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+    headers = {}
+    if has_more:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(memories[-1]["created_at"], memories[-1]["_id"])
 
-    # Convert ObjectId to string
-    for memory in memories:
-        memory["id"] = str(memory["_id"])
+    # Drop the sort key if it was only fetched for the cursor
+    if projected_fields is not None and "created_at" not in projected_fields:
+        for memory in memories:
+            del memory["created_at"]
+
+    # Encode directly rather than validating each memory against the response model
+    return memory_serializer.response(memories, headers=headers)
+
+@router.get("/export")
+async def export_memories(current_user: dict = Depends(get_current_active_user)) -> StreamingResponse:
+    """
+    Export all of the current user's memories as NDJSON, oldest first
+
+    Memories are streamed from a database cursor one batch at a time, so
+    memory use stays flat however many the user has. The output can be
+    loaded back with `POST /import`.
+    """
+    memories = memory_repository.iterate_for_user(str(current_user["_id"]), settings.EXPORT_CURSOR_BATCH_SIZE)
+
+    async def lines():
+        async for memory in memories:
+            yield dumps_line({
+                "id": str(memory["_id"]),
+                "content": memory["content"],
+                "memo_type": memory["memo_type"],
+                "created_at": memory["created_at"],
+            })
+
+    return StreamingResponse(
+        chunked(lines()),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="memories.ndjson"'},
+    )
+
+@router.post("/import", response_model=MemoryImportResponse)
+async def import_memories(
+    request: Request, current_user: dict = Depends(get_current_active_user)
+) -> Any:
+    """
+    Import memories from an NDJSON request body
+
+    Each line is a JSON object with `content`, `memo_type` and optionally
+    `created_at`, as written by `GET /export`. The body is parsed as it
+    arrives and valid lines are stored in `insert_many` batches of
+    MEMORY_IMPORT_BATCH_SIZE. Invalid lines are skipped and reported by
+    line number; they don't stop the import. With DEDUP_ON_WRITE, lines
+    that nearly duplicate a stored memory or an earlier line are skipped
+    and counted, so importing an export twice does not double it.
+    """
+    user_id = str(current_user["_id"])
+    imported = 0
+    failed = 0
+    duplicates = 0
+    errors: List[MemoryImportError] = []
+    batch: List[Tuple[int, MemoryImportLine]] = []
+    seen = BatchDuplicateFilter(settings.DEDUP_THRESHOLD)
+
+    def fail(line_number: int, error: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.MEMORY_IMPORT_MAX_ERRORS:
+            errors.append(MemoryImportError(line=line_number, error=error))
+
+    async def flush() -> None:
+        nonlocal imported, duplicates
+        lines = list(batch)
+        batch.clear()
+        # Embedding and MinHash signing are CPU-bound, so keep them off the event loop
+        fields = await asyncio.get_running_loop().run_in_executor(
+            None, import_fields, [item.content for _, item in lines]
+        )
+        pending = [(line_number, item, item_fields) for (line_number, item), item_fields in zip(lines, fields)]
+
+        # Skip near-duplicates of stored memories, found the way create_memory finds them, and of earlier lines
+        if settings.DEDUP_ON_WRITE:
+            stored = await asyncio.gather(*(
+                find_near_duplicate(user_id, item.memo_type, item.content, item_fields)
+                for _, item, item_fields in pending
+            ))
+            unique = [
+                line for line, duplicate in zip(pending, stored)
+                if not duplicate and seen.add(line[1].content, line[1].memo_type, line[2])
+            ]
+            duplicates += len(pending) - len(unique)
+            pending = unique
+        if not pending:
+            return
+
+        memories = [
+            MemoryModel(
+                user_id=user_id,
+                content=item.content,
+                memo_type=item.memo_type,
+                **({"created_at": item.created_at} if item.created_at else {}),
+                **item_fields,
+            )
+            for _, item, item_fields in pending
+        ]
+        try:
+            await memory_repository.create_many(memories)
+        except Exception as e:
+            for line_number, _, _ in pending:
+                fail(line_number, f"Failed to store memory: {e}")
+        else:
+            imported += len(memories)
+
+    async for line_number, line in iter_lines(request.stream(), settings.MEMORY_IMPORT_MAX_LINE_BYTES):
+        if line is None:
+            fail(line_number, f"Line is longer than {settings.MEMORY_IMPORT_MAX_LINE_BYTES} bytes")
+            continue
+        try:
+            item = MemoryImportLine.model_validate(json.loads(line))
+        except ValueError as e:
+            # Covers invalid JSON as well as pydantic validation errors
+            if isinstance(e, ValidationError):
+                error = e.errors()[0]
+                location = ".".join(str(part) for part in error["loc"])
+                fail(line_number, f"{location}: {error['msg']}" if location else error["msg"])
+            else:
+                fail(line_number, "Invalid JSON")
+            continue
+        if item.memo_type not in [MemoryType.CORE, MemoryType.ENVIRONMENT]:
+            fail(line_number, f"Invalid memory type. Must be one of: {MemoryType.CORE}, {MemoryType.ENVIRONMENT}")
+            continue
+
+        batch.append((line_number, item))
+        if len(batch) >= settings.MEMORY_IMPORT_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+    if imported:
+        memory_context_cache.invalidate(user_id)
+
+    return MemoryImportResponse(
+        imported=imported, failed=failed, duplicates=duplicates, errors=errors, errors_truncated=failed > len(errors)
+    )
+
+@router.get("/cache/stats")
+async def get_memory_cache_stats(current_user: dict = Depends(get_current_active_user)) -> Any:
+    """
+    Get hit/miss counters for this worker's memory context cache
+    """
+    return memory_context_cache.stats()
 
-    return memories
+@router.post("/consolidate")
+async def consolidate_memories(
+    dry_run: bool = Query(False, description="Only report what would be deleted"),
+    current_user: dict = Depends(get_current_active_user)
+) -> Any:
+    """
+    Delete near-duplicate memories of the current user
+
+    Unlike `POST /`, which only flags a duplicate, this keeps one memory of
+    each group of near-duplicates and permanently deletes the others; there
+    is no undo, so run it with `dry_run` first to see what would go.
+
+    Returns how many duplicates were found and removed, and the estimated
+    prompt tokens saved when every memory is sent to the model.
+    """
+    report = await consolidate_user_memories(str(current_user["_id"]), dry_run=dry_run)
+    if not dry_run:
+        memory_context_cache.invalidate(str(current_user["_id"]))
 
-@router.post("/", response_model=MemoryResponse)
+    return report
+
+@router.post("/", response_model=MemoryCreateResponse)
 async def create_memory(
     memory_data: MemoryCreate, current_user: dict = Depends(get_current_active_user)
 ) -> Any:
     """
     Create a new memory
+
+    If DEDUP_ON_WRITE is enabled and the user already has a near-duplicate
+    memory of the same type, the memory is still created and the id of the
+    existing one is returned in `duplicate_of`, so the client can decide
+    whether to keep both. Nothing is merged automatically.
     """
     # Validate memory type
     if memory_data.memo_type not in [MemoryType.CORE, MemoryType.ENVIRONMENT]:
@@ -52,20 +285,30 @@ async def create_memory(
             detail=f"Invalid memory type. Must be one of: {MemoryType.CORE}, {MemoryType.ENVIRONMENT}",
         )
 
+    user_id = str(current_user["_id"])
+    fields = dedup_fields(memory_data.content)
+
+    # Look for a stored near-duplicate to report
+    duplicate = None
+    if settings.DEDUP_ON_WRITE:
+        duplicate = await find_near_duplicate(user_id, memory_data.memo_type, memory_data.content, fields)
+
     memory = MemoryModel(
-        user_id=str(current_user["_id"]),
+        user_id=user_id,
         content=memory_data.content,
         memo_type=memory_data.memo_type,
+        **embedding_fields(memory_data.content),
+        **fields,
     )
 
     # Insert memory into database
-    result = memories_collection.insert_one(memory.model_dump(by_alias=True))
-
-    # Get the created memory
-    created_memory = memories_collection.find_one({"_id": result.inserted_id})
+    created_memory = await memory_repository.create(memory)
+    memory_context_cache.invalidate(user_id)
 
     # Convert ObjectId to string
     created_memory["id"] = str(created_memory["_id"])
+    if duplicate:
+        created_memory["duplicate_of"] = str(duplicate["_id"])
 
     return created_memory
 
@@ -76,17 +319,7 @@ async def get_memory(
     """
     Get a specific memory
     """
-    try:
-        memory = memories_collection.find_one({
-            "_id": ObjectId(memory_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memory not found",
-        )
-
+    memory = await memory_repository.get_for_user(memory_id, str(current_user["_id"]))
     if not memory:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -107,23 +340,6 @@ async def update_memory(
     """
     Update a memory
     """
-    try:
-        memory = memories_collection.find_one({
-            "_id": ObjectId(memory_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memory not found",
-        )
-
-    if not memory:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memory not found",
-        )
-
     update_data = memory_data.model_dump(exclude_unset=True)
 
     # Validate memory type if provided
@@ -133,14 +349,19 @@ async def update_memory(
             detail=f"Invalid memory type. Must be one of: {MemoryType.CORE}, {MemoryType.ENVIRONMENT}",
         )
 
-    # Update memory in database
-    if update_data:
-        memories_collection.update_one(
-            {"_id": ObjectId(memory_id)}, {"$set": update_data}
-        )
+    # Re-embed and re-sign the memory if its content changed
+    if "content" in update_data:
+        update_data.update(embedding_fields(update_data["content"]))
+        update_data.update(dedup_fields(update_data["content"]))
 
-    # Get updated memory
-    updated_memory = memories_collection.find_one({"_id": ObjectId(memory_id)})
+    # Update memory in database and get updated memory
+    updated_memory = await memory_repository.update_for_user(memory_id, str(current_user["_id"]), update_data)
+    if not updated_memory:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Memory not found",
+        )
+    memory_context_cache.invalidate(str(current_user["_id"]))
 
     # Convert ObjectId to string
     updated_memory["id"] = str(updated_memory["_id"])
@@ -154,22 +375,11 @@ async def delete_memory(
     """
     Delete a memory
     """
-    try:
-        memory = memories_collection.find_one({
-            "_id": ObjectId(memory_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memory not found",
-        )
-
-    if not memory:
+    # Delete memory from database
+    deleted = await memory_repository.delete_for_user(memory_id, str(current_user["_id"]))
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Memory not found",
         )
-
-    # Delete memory from database
-    memories_collection.delete_one({"_id": ObjectId(memory_id)})
+    memory_context_cache.invalidate(str(current_user["_id"]))
@@ -2,11 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Any
 
 # Use absolute imports when running as a module
-from app.core.security import get_password_hash
-from app.core.database import users_collection
+from app.core.security import hash_password
+from app.repositories.user import user_repository
 from app.schemas.user import UserUpdate, UserResponse
 from app.api.endpoints.dependencies import get_current_active_user
-from bson import ObjectId
+from app.services.auth_cache import user_cache
 from datetime import datetime, timezone
 
 router = APIRouter()
@@ -31,11 +31,11 @@ async def update_my_profile(
 
     # If password is being updated, hash it
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = await hash_password(update_data.pop("password"))
 
     # Check if username is being updated and if it's already taken
     if "username" in update_data and update_data["username"] != current_user["username"]:
-        if users_collection.find_one({"username": update_data["username"]}):
+        if await user_repository.get_by_username(update_data["username"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken",
@@ -43,7 +43,7 @@ async def update_my_profile(
 
     # Check if email is being updated and if it's already taken
     if "email" in update_data and update_data["email"] != current_user["email"]:
-        if users_collection.find_one({"email": update_data["email"]}):
+        if await user_repository.get_by_email(update_data["email"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
@@ -52,14 +52,9 @@ async def update_my_profile(
     # Add updated_at timestamp
     update_data["updated_at"] = datetime.now(timezone.utc)
 
-    # Update user in database
-    if update_data:
-        users_collection.update_one(
-            {"_id": current_user["_id"]}, {"$set": update_data}
-        )
-
-    # Get updated user
-    updated_user = users_collection.find_one({"_id": current_user["_id"]})
+    # Update user in database and get updated user
+    updated_user = await user_repository.update(current_user["_id"], update_data)
+    user_cache.invalidate(str(current_user["_id"]))
 
     # Convert ObjectId to string
     updated_user["id"] = str(updated_user["_id"])
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any
+
+# Use absolute imports when running as a module
+from app.api.endpoints.dependencies import get_current_active_user
+from app.schemas.search import SearchResponse, SearchScope
+from app.services.search import make_snippet, search_user_content
+
+router = APIRouter()
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to search for"),
+    scope: str = Query(SearchScope.ALL, description="all, messages or memories"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_active_user)
+) -> Any:
+    """
+    Search the current user's chat messages and memories
+
+    Results are ranked by relevance across both, and each carries a
+    snippet around the first match. Message results include their
+    session ID so the conversation can be opened.
+    """
+    # Validate scope
+    if scope not in [SearchScope.ALL, SearchScope.MESSAGES, SearchScope.MEMORIES]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid scope. Must be one of: {SearchScope.ALL}, {SearchScope.MESSAGES}, {SearchScope.MEMORIES}",
+        )
+
+    hits = await search_user_content(str(current_user["_id"]), q, scope, limit)
+
+    results = []
+    for hit in hits:
+        document = hit.document
+        results.append({
+            "kind": hit.kind,
+            "id": str(document["_id"]),
+            "score": hit.score,
+            "snippet": make_snippet(document.get("content", ""), q),
+            "session_id": document.get("session_id"),
+            "message_type": document.get("message_type"),
+            "memo_type": document.get("memo_type"),
+            "created_at": document.get("timestamp") or document.get("created_at"),
+        })
+
+    return {"query": q, "results": results}
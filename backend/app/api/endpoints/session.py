@@ -2,28 +2,57 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Any, List
 
 # Use absolute imports when running as a module
-from app.core.database import sessions_collection, chat_messages_collection
-from app.schemas.session import SessionCreate, SessionUpdate, SessionResponse
+from app.repositories.session import session_repository
+from app.repositories.chat import chat_message_repository
+from app.schemas.session import SessionCreate, SessionUpdate, SessionResponse, SessionDeletionResponse
 from app.api.endpoints.dependencies import get_current_active_user
 from app.models.session import SessionModel
-from bson import ObjectId
+from app.services.session_reaper import session_reaper
+from app.services.session_summary import backfill_session_summaries
+from app.services.serialization import DocumentSerializer
 from datetime import datetime, timezone
 
 router = APIRouter()
 
+# Encodes the session list without re-validating every session
+session_serializer = DocumentSerializer(SessionResponse)
+
 @router.get("/", response_model=List[SessionResponse])
 async def get_sessions(current_user: dict = Depends(get_current_active_user)) -> Any:
     """
     Get all sessions for the current user
+
+    Each session carries its message count, token total and a preview of
+    the last message, so the list needs no per-session history calls.
     """
-    sessions = list(sessions_collection.find({"user_id": str(current_user["_id"])}).sort("updated_at", -1))
+    sessions = await session_repository.list_for_user(
+        str(current_user["_id"]), projection=session_serializer.projection
+    )
 
-    # Convert ObjectId to string
+    # Encode directly rather than validating each session against the response model
+    return session_serializer.response(sessions)
+
+@router.get("/deletions", response_model=List[SessionDeletionResponse])
+async def get_session_deletions(current_user: dict = Depends(get_current_active_user)) -> Any:
+    """
+    Get the progress of the current user's session deletions still in progress
+    """
+    sessions = await session_repository.list_tombstoned_for_user(str(current_user["_id"]))
+
+    # Convert ObjectId to string and count what's left to delete
     for session in sessions:
         session["id"] = str(session["_id"])
+        session["messages_remaining"] = await chat_message_repository.count_for_session(session["id"])
 
     return sessions
 
+@router.post("/summaries/repair")
+async def repair_session_summaries(current_user: dict = Depends(get_current_active_user)) -> Any:
+    """
+    Recompute the current user's session summaries from their messages
+    """
+    return await backfill_session_summaries(str(current_user["_id"]))
+
 @router.post("/", response_model=SessionResponse)
 async def create_session(
     session_data: SessionCreate, current_user: dict = Depends(get_current_active_user)
@@ -37,10 +66,7 @@ async def create_session(
     )
 
     # Insert session into database
-    result = sessions_collection.insert_one(session.model_dump(by_alias=True))
-
-    # Get the created session
-    created_session = sessions_collection.find_one({"_id": result.inserted_id})
+    created_session = await session_repository.create(session)
 
     # Convert ObjectId to string
     created_session["id"] = str(created_session["_id"])
@@ -54,17 +80,7 @@ async def get_session(
     """
     Get a specific session
     """
-    try:
-        session = sessions_collection.find_one({
-            "_id": ObjectId(session_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found",
-        )
-
+    session = await session_repository.get_for_user(session_id, str(current_user["_id"]))
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,37 +101,19 @@ async def update_session(
     """
     Update a session
     """
-    try:
-        session = sessions_collection.find_one({
-            "_id": ObjectId(session_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found",
-        )
-
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found",
-        )
-
     update_data = session_data.model_dump(exclude_unset=True)
 
     # Add updated_at timestamp
     update_data["updated_at"] = datetime.now(timezone.utc)
 
-    # Update session in database
-    if update_data:
-        sessions_collection.update_one(
-            {"_id": ObjectId(session_id)}, {"$set": update_data}
+    # Update session in database and get updated session
+    updated_session = await session_repository.update_for_user(session_id, str(current_user["_id"]), update_data)
+    if not updated_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found",
         )
 
-    # Get updated session
-    updated_session = sessions_collection.find_one({"_id": ObjectId(session_id)})
-
     # Convert ObjectId to string
     updated_session["id"] = str(updated_session["_id"])
 
@@ -127,26 +125,19 @@ async def delete_session(
 ) -> None:
     """
     Delete a session
-    """
-    try:
-        session = sessions_collection.find_one({
-            "_id": ObjectId(session_id),
-            "user_id": str(current_user["_id"])
-        })
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found",
-        )
 
-    if not session:
+    The session is hidden immediately and its messages are removed in the
+    background by the session reaper; see `GET /deletions` for progress.
+    """
+    # Tombstone the session
+    deleted = await session_repository.tombstone_for_user(
+        session_id, str(current_user["_id"]), datetime.now(timezone.utc)
+    )
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found",
         )
 
-    # Delete session from database
-    sessions_collection.delete_one({"_id": ObjectId(session_id)})
-
-    # Delete all chat messages for this session
-    chat_messages_collection.delete_many({"session_id": session_id})
+    # Let the reaper delete its messages
+    session_reaper.wake()
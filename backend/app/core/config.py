@@ -14,6 +14,15 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 # 1 day
 
+    # Caches used to resolve the current user from a JWT
+    TOKEN_CACHE_SIZE: int = 10000 # Max number of decoded tokens kept
+    USER_CACHE_SIZE: int = 10000 # Max number of user documents kept
+    USER_CACHE_TTL_SECONDS: int = 30 # Max staleness of a cached user, e.g. after deactivation
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12 # Work factor; existing hashes are upgraded on next login
+    PASSWORD_HASH_WORKERS: int = 4 # Max number of concurrent hash/verify operations
+
     # Gemini API Key
     GEMINI_API_KEY: Optional[str] = None
 
@@ -21,11 +30,92 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
     MONGO_DB_CONNECTION_STRING: str = os.getenv("MONGO_DB_CONNECTION_STRING")
 
+    # MongoDB client, created on first use and checked when a worker starts
+    DATABASE_BACKEND: str = "mongo" # "memory" keeps data in process, indexed, for development and load tests; lost on exit
+    MONGO_MAX_POOL_SIZE: int = 100 # Connections per worker to each server
+    MONGO_MIN_POOL_SIZE: int = 0 # Connections kept open while idle
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000 # How long an operation waits for a reachable server before failing
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000 # Timeout for opening one connection
+    DB_MIGRATE_ON_STARTUP: bool = True # Apply pending index migrations when a worker starts
+    HEALTH_PING_TIMEOUT_SECONDS: float = 2 # Readiness fails if the database takes longer to answer
+
     # Default LLM models - only using gemini-2.0-flash-lite
     DEFAULT_LLM_MODEL: str = "gemini-2.0-flash-lite" # Default model
     REASONING_LLM_MODEL: str = "gemini-2.0-flash-lite" # Always use flash-lite
     NON_REASONING_LLM_MODEL: str = "gemini-2.0-flash-lite" # Default model
 
+    # Per-user cache of rendered memory context used on every chat turn
+    MEMORY_CACHE_SIZE: int = 1024 # Max number of users kept in the cache
+    MEMORY_CACHE_TTL_SECONDS: int = 300 # Max staleness for writes made by other workers
+
+    # Semantic memory retrieval
+    EMBEDDING_BACKEND: str = "hashing" # Local feature-hashing embedder, works offline
+    EMBEDDING_DIMENSION: int = 512
+    MEMORY_TOP_K: int = 8 # Memories of each type put in the prompt; 0 includes every memory
+
+    # Prompt assembly
+    PROMPT_TOKEN_BUDGET: int = 4000 # Hard ceiling on estimated LLM input tokens per turn
+    PROMPT_RECENCY_WEIGHT: float = 0.2 # Ranking bonus for a memory recorded just now
+    PROMPT_RECENCY_HALF_LIFE_DAYS: float = 30 # Age at which the recency bonus halves
+
+    # Background extraction of memories from chat turns
+    MEMORY_EXTRACTION_ENABLED: bool = True
+    EXTRACTION_LLM_MODEL: str = "gemini-2.0-flash-lite" # Cheap model used for extraction
+    EXTRACTION_TURNS_PER_CALL: int = 5 # Turns batched into one extraction call per user
+    EXTRACTION_MAX_DELAY_SECONDS: float = 120 # Max time a turn waits for its batch to fill
+    EXTRACTION_QUEUE_SIZE: int = 10000 # Turns beyond this backlog are dropped
+    EXTRACTION_CONCURRENCY: int = 2 # Max extraction calls in flight
+
+    # Near-duplicate memory detection (MinHash signatures with LSH banding)
+    DEDUP_ON_WRITE: bool = True # Check new memories for a stored near-duplicate
+    DEDUP_NUM_PERM: int = 128 # MinHash signature length
+    DEDUP_BANDS: int = 16 # LSH bands; each covers DEDUP_NUM_PERM / DEDUP_BANDS rows
+    DEDUP_THRESHOLD: float = 0.7 # Min estimated Jaccard similarity of word shingles
+
+    # Session summaries shown in the sidebar
+    SESSION_PREVIEW_CHARS: int = 120 # Length of last_message_preview
+
+    # Background deletion of the messages of deleted sessions
+    SESSION_REAPER_ENABLED: bool = True
+    SESSION_REAPER_BATCH_SIZE: int = 1000 # Messages removed per delete_many
+    SESSION_REAPER_BATCH_INTERVAL_SECONDS: float = 0.1 # Pause between batches to spare the primary
+    SESSION_REAPER_POLL_SECONDS: float = 60 # How often to look for sessions deleted by other workers
+
+    # Full-text search over chat messages and memories
+    SEARCH_BACKEND: str = "mongo" # "mongo" uses text indexes; "local" keeps inverted indexes in-process
+    SEARCH_INDEX_CACHE_SIZE: int = 256 # Users whose message index the local backend keeps
+    SEARCH_INDEX_TTL_SECONDS: int = 300 # Max staleness for messages written by other workers
+
+    # Bulk import and export
+    EXPORT_CURSOR_BATCH_SIZE: int = 1000 # Documents fetched per cursor round trip
+    MEMORY_IMPORT_BATCH_SIZE: int = 500 # Memories written per insert_many
+    MEMORY_IMPORT_MAX_LINE_BYTES: int = 65536 # Longer NDJSON lines are rejected
+    MEMORY_IMPORT_MAX_ERRORS: int = 1000 # Line errors reported in the import summary
+
+    # Prometheus metrics
+    METRICS_ENABLED: bool = True # Serve request and chat pipeline metrics at /metrics
+
+    # Admission control for chat requests that call the LLM (per worker)
+    LLM_MAX_CONCURRENCY: int = 32 # Chat model calls in flight at once
+    LLM_MAX_QUEUE: int = 64 # Requests waiting for a free slot; more are rejected with 503
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10 # Longest wait for a slot before a 503
+    LLM_MODEL_RATE_PER_MINUTE: float = 0 # Calls per model, e.g. the provider quota; 0 disables
+    LLM_MODEL_BURST: int = 20 # Calls per model allowed back to back
+    CHAT_USER_RATE_PER_MINUTE: float = 20 # Messages a user can send per minute on average; 0 disables
+    CHAT_USER_BURST: int = 10 # Messages a user can send back to back
+    RATE_LIMIT_MAX_USERS: int = 10000 # Users whose rate is tracked; the least recently active are dropped
+
+    # Sampling profiler for slow requests
+    PROFILER_ENABLED: bool = False # Sample every request; keep profiles of slow or randomly picked ones
+    PROFILER_SLOW_MS: float = 1000 # Keep the profile of any request taking at least this long
+    PROFILER_SAMPLE_RATE: float = 0.0 # Fraction of requests whose profile is kept regardless of latency
+    PROFILER_HEADER_SECRET: str = "" # When set, requests sending it in X-Profile are always profiled
+    PROFILER_INTERVAL_MS: float = 5 # Time between stack samples
+    PROFILER_MAX_CONCURRENT: int = 4 # Requests sampled at once; any others go unprofiled
+    PROFILER_DIR: str = "profiles" # Where profiles are written
+    PROFILER_MAX_FILES: int = 200 # Oldest profiles are deleted beyond this many
+    PROFILER_FORMAT: str = "speedscope" # "speedscope" JSON or "collapsed" stacks
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
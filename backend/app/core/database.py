@@ -1,85 +1,245 @@
-from pymongo import MongoClient
-from pymongo.server_api import ServerApi
 import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import motor.motor_asyncio
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.server_api import ServerApi
+from pymongo.topology_description import TopologyDescription
+
 from .config import settings
+from .document_store import InMemoryClient
+from .migrations import migrate
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Default MongoDB connection string for local development
-
-try:
-    # Get MongoDB connection details
-    mongo_uri = settings.MONGO_DB_CONNECTION_STRING
-    db_name = settings.DATABASE_NAME or "chatbot_db"
-
-    logger.info(f"Connecting to MongoDB at {mongo_uri}")
-
-    # Create a MongoDB client
-    client = MongoClient(mongo_uri, server_api=ServerApi('1'))
-
-    # Test the connection
-    client.admin.command('ping')
-    logger.info("MongoDB connection successful!")
-
-    # Get the database
-    db = client[db_name]
-
-    # Define collections
-    users_collection = db["users"]
-    sessions_collection = db["sessions"]
-    memories_collection = db["memories"]
-    chat_messages_collection = db["chat_messages"]
-
-    # Create indexes
-    users_collection.create_index("email", unique=True)
-    users_collection.create_index("username", unique=True)
-    sessions_collection.create_index("user_id")
-    memories_collection.create_index("user_id")
-    memories_collection.create_index([("user_id", 1), ("memo_type", 1)])
-    chat_messages_collection.create_index([("session_id", 1), ("timestamp", 1)])
-
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
-    # Create dummy collections for development/testing
-    client = None
-    db = None
-
-    class DummyCollection:
-        def __init__(self, name):
-            self.name = name
-            logger.warning(f"Using dummy collection for {name}")
-
-        def find_one(self, *args, **kwargs):
-            logger.warning(f"Dummy find_one called on {self.name}")
-            return None
-
-        def find(self, *args, **kwargs):
-            logger.warning(f"Dummy find called on {self.name}")
-            return []
-
-        def insert_one(self, *args, **kwargs):
-            logger.warning(f"Dummy insert_one called on {self.name}")
-            return None
-
-        def update_one(self, *args, **kwargs):
-            logger.warning(f"Dummy update_one called on {self.name}")
-            return None
-
-        def delete_one(self, *args, **kwargs):
-            logger.warning(f"Dummy delete_one called on {self.name}")
-            return None
-
-        def delete_many(self, *args, **kwargs):
-            logger.warning(f"Dummy delete_many called on {self.name}")
-            return None
-
-        def create_index(self, *args, **kwargs):
-            logger.warning(f"Dummy create_index called on {self.name}")
-            return None
-
-    users_collection = DummyCollection("users")
-    sessions_collection = DummyCollection("sessions")
-    memories_collection = DummyCollection("memories")
-    chat_messages_collection = DummyCollection("chat_messages")
+class PoolMonitor(ConnectionPoolListener):
+    """
+    Tracks the driver's connection pools from its CMAP events
+
+    The driver publishes these events from its own threads, so the counts
+    are guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.servers: Dict[str, Dict[str, int]] = {}
+
+    def _bump(self, address, **changes: int) -> None:
+        key = "%s:%s" % address if isinstance(address, tuple) else str(address)
+        with self._lock:
+            counts = self.servers.setdefault(key, {
+                "open": 0, "checked_out": 0, "waiting": 0, "created_total": 0, "closed_total": 0, "cleared_total": 0,
+            })
+            for name, change in changes.items():
+                counts[name] += change
+
+    def pool_created(self, event):
+        self._bump(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump(event.address, cleared_total=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._bump(event.address, open=1, created_total=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump(event.address, open=-1, closed_total=1)
+
+    def connection_check_out_started(self, event):
+        self._bump(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._bump(event.address, waiting=-1)
+
+    def connection_checked_out(self, event):
+        self._bump(event.address, waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._bump(event.address, checked_out=-1)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {address: dict(counts) for address, counts in self.servers.items()}
+
+    def total(self, name: str) -> int:
+        with self._lock:
+            return sum(counts[name] for counts in self.servers.values())
+
+class Database:
+    """
+    The MongoDB client, created on first use rather than at import
+
+    Creating the client does no I/O, so importing the app, a CLI tool or a
+    repository costs nothing; the first operation opens connections. The
+    application lifespan calls `connect`, which also checks that the server
+    answers and fails startup if it does not, so a worker never serves
+    requests against a database it cannot reach. With DATABASE_BACKEND set
+    to "memory" the client is the in-process InMemoryClient instead.
+    """
+
+    def __init__(self, uri: Optional[str], name: str):
+        self.uri = uri
+        self.name = name
+        self.client = None
+        self.db = None
+        self.pool_monitor = PoolMonitor()
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None
+
+    def _create_client(self):
+        if settings.DATABASE_BACKEND == "memory":
+            logger.warning(f"Using the in-memory database {self.name}; data is lost when the worker exits")
+            return InMemoryClient()
+        if settings.DATABASE_BACKEND != "mongo":
+            raise RuntimeError(f"Unknown DATABASE_BACKEND: {settings.DATABASE_BACKEND}")
+        if not self.uri:
+            raise RuntimeError("MONGO_DB_CONNECTION_STRING is not set")
+        logger.info(f"Creating MongoDB client for database {self.name}")
+        # Looked up at call time so a replacement client can be patched in
+        return motor.motor_asyncio.AsyncIOMotorClient(
+            self.uri,
+            server_api=ServerApi('1'),
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            event_listeners=[self.pool_monitor],
+        )
+
+    def get_db(self):
+        if self.db is None:
+            with self._lock:
+                if self.db is None:
+                    self.client = self._create_client()
+                    self.db = self.client[self.name]
+        return self.db
+
+    def collection(self, name: str):
+        return self.get_db()[name]
+
+    async def ping(self) -> float:
+        """
+        Round trip a ping to the server
+
+        Returns:
+            Round trip time in seconds
+
+        Raises:
+            pymongo.errors.PyMongoError: If no server answered within the selection timeout
+        """
+        self.get_db()
+        start = time.perf_counter()
+        await self.client.admin.command('ping')
+        return time.perf_counter() - start
+
+    async def connect(self) -> None:
+        """
+        Create the client and check that the server answers
+        """
+        try:
+            elapsed = await self.ping()
+        except Exception as e:
+            logger.error(f"Failed to connect to MongoDB: {e}")
+            raise
+        logger.info(f"MongoDB connection successful ({elapsed * 1e3:.1f} ms)")
+
+    def pool_counts(self) -> Dict[str, int]:
+        """
+        Connections open, in use and waited for, summed over every server
+        """
+        return {name: self.pool_monitor.total(name) for name in ("open", "checked_out", "waiting")}
+
+    def pool_state(self) -> dict:
+        """
+        Pool options, connection counts per server and the driver's view of the topology
+        """
+        state = {
+            "backend": settings.DATABASE_BACKEND,
+            "connected": self.connected,
+            "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+            "servers": self.pool_monitor.snapshot(),
+        }
+        topology = getattr(self.client, "topology_description", None)
+        # Only the real driver has one; stand-in clients used in tests do not
+        if isinstance(topology, TopologyDescription):
+            state["topology_type"] = topology.topology_type_name
+            state["server_types"] = {
+                "%s:%s" % address: description.server_type_name
+                for address, description in topology.server_descriptions().items()
+            }
+        return state
+
+    def close(self) -> None:
+        with self._lock:
+            if self.client is not None:
+                self.client.close()
+            self.client = None
+            self.db = None
+
+class LazyCollection:
+    """
+    Handle to a collection that resolves it on first use
+
+    Lets repositories be built at import time without creating the client.
+    The resolved collection is kept until the client is replaced.
+    """
+
+    def __init__(self, database: Database, name: str):
+        self._database = database
+        self._name = name
+        self._client = None
+        self._collection = None
+
+    def resolve(self):
+        if self._collection is None or self._client is not self._database.client:
+            self._collection = self._database.collection(self._name)
+            self._client = self._database.client
+        return self._collection
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.resolve(), attribute)
+
+    def __repr__(self) -> str:
+        return f"LazyCollection({self._name!r})"
+
+database = Database(settings.MONGO_DB_CONNECTION_STRING, settings.DATABASE_NAME or "chatbot_db")
+
+# Define collections
+users_collection = LazyCollection(database, "users")
+sessions_collection = LazyCollection(database, "sessions")
+memories_collection = LazyCollection(database, "memories")
+chat_messages_collection = LazyCollection(database, "chat_messages")
+
+async def init_db() -> None:
+    """
+    Connect to MongoDB and apply pending index migrations
+
+    Called once from the application lifespan. Errors are raised, so a
+    worker that cannot reach the database fails to start.
+    """
+    await database.connect()
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await migrate(database)
+
+def close_db() -> None:
+    """
+    Close the MongoDB client and its connection pool
+    """
+    database.close()
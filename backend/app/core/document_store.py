@@ -0,0 +1,1056 @@
+import asyncio
+import bisect
+import datetime
+import itertools
+import math
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from app.core.text import tokenize
+
+MISSING = object()
+# Max equality combinations ($in values multiplied across fields) looked up in one index
+MAX_INDEX_LOOKUPS = 1024
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+def _normalize(value: Any) -> Any:
+    """
+    Store values the way BSON round-trips them: datetimes become naive UTC
+    with millisecond precision and tuples become lists
+    """
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+def _copy(value: Any) -> Any:
+    # Scalars stored in documents are immutable, so only containers are copied
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+def _get(document: dict, path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+def _set(document: dict, path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[last] = value
+
+def _unset(document: dict, path: str) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(last, None)
+
+def sort_key(value: Any) -> tuple:
+    """
+    Order values of any type the way MongoDB does: null, numbers, strings,
+    objects, arrays, binary, ObjectIds, booleans, dates
+    """
+    if value is MISSING or value is None:
+        return (1,)
+    if isinstance(value, bool):
+        return (9, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, dict):
+        return (4, tuple((key, sort_key(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return (5, tuple(sort_key(item) for item in value))
+    if isinstance(value, bytes):
+        return (6, value)
+    if isinstance(value, ObjectId):
+        return (8, value.binary)
+    if isinstance(value, datetime.datetime):
+        return (10, value)
+    return (11, repr(value))
+
+class _Top:
+    """
+    Sorts after every index key; bounds a prefix range
+    """
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+TOP = _Top()
+
+class _Descending:
+    """
+    Inverts the order of a key, for descending index and sort fields
+    """
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return isinstance(other, _Descending) and self.key == other.key
+
+    def __lt__(self, other):
+        return other is TOP or self.key > other.key
+
+    def __gt__(self, other):
+        return other is not TOP and self.key < other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+def _directed(key: tuple, direction: Any) -> Any:
+    return _Descending(key) if direction == -1 else key
+
+# Query matching
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(item == expected for item in value)
+    return value == expected
+
+def _compare(value: Any, bound: Any, op: str) -> bool:
+    values = value if isinstance(value, list) else [value]
+    for item in values:
+        if item is MISSING or item is None:
+            continue
+        try:
+            if (
+                (op == "$gt" and item > bound) or (op == "$gte" and item >= bound)
+                or (op == "$lt" and item < bound) or (op == "$lte" and item <= bound)
+            ):
+                return True
+        except TypeError:
+            # Like MongoDB, only values of comparable types match a range
+            continue
+    return False
+
+def _is_operator_condition(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if not _is_operator_condition(condition):
+        return _equals(value, _normalize(condition))
+    for op, argument in condition.items():
+        argument = _normalize(argument)
+        if op == "$eq":
+            if not _equals(value, argument):
+                return False
+        elif op == "$ne":
+            if _equals(value, argument):
+                return False
+        elif op == "$in":
+            if not any(_equals(value, item) for item in argument):
+                return False
+        elif op == "$nin":
+            if any(_equals(value, item) for item in argument):
+                return False
+        elif op == "$exists":
+            if (value is not MISSING) != bool(argument):
+                return False
+        elif op in RANGE_OPERATORS:
+            if not _compare(value, argument, op):
+                return False
+        elif op == "$not":
+            if _matches_condition(value, argument):
+                return False
+        else:
+            raise OperationFailure(f"Query operator {op} is not supported by the in-memory store")
+    return True
+
+def matches(document: dict, query: dict) -> bool:
+    """
+    Check a document against a query filter
+    """
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$text":
+            # Resolved by the text index before documents are matched
+            continue
+        elif not _matches_condition(_get(document, key), condition):
+            return False
+    return True
+
+# Updates
+
+def _apply_update(document: dict, update: dict, inserting: bool = False) -> None:
+    if not update or not all(op.startswith("$") for op in update):
+        raise OperationFailure("Update documents must contain only update operators")
+    for op, values in update.items():
+        values = _normalize(values)
+        for path, value in values.items():
+            if path == "_id" and op != "$setOnInsert":
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+            current = _get(document, path)
+            if op == "$set":
+                _set(document, path, value)
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set(document, path, value)
+            elif op == "$unset":
+                _unset(document, path)
+            elif op == "$inc":
+                _set(document, path, value if current is MISSING else current + value)
+            elif op == "$max":
+                if current is MISSING or sort_key(value) > sort_key(current):
+                    _set(document, path, value)
+            elif op == "$min":
+                if current is MISSING or sort_key(value) < sort_key(current):
+                    _set(document, path, value)
+            elif op in ("$push", "$addToSet"):
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                array = [] if current is MISSING else current
+                if not isinstance(array, list):
+                    raise OperationFailure(f"The field '{path}' must be an array")
+                for item in items:
+                    if op == "$push" or item not in array:
+                        array.append(item)
+                _set(document, path, array)
+            elif op == "$pull":
+                if isinstance(current, list):
+                    _set(document, path, [item for item in current if not _matches_condition(item, value)])
+            else:
+                raise OperationFailure(f"Update operator {op} is not supported by the in-memory store")
+
+def _upsert_seed(query: dict) -> dict:
+    # The new document starts from the filter's equality conditions
+    document: dict = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if _is_operator_condition(condition):
+            if "$eq" in condition:
+                _set(document, key, _normalize(condition["$eq"]))
+            continue
+        _set(document, key, _normalize(condition))
+    return document
+
+# Aggregation
+
+def _evaluate(expression: Any, document: dict) -> Any:
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(document, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        op, argument = next(iter(expression.items()))
+        if op == "$strLenCP":
+            return len(_evaluate(argument, document) or "")
+        if op == "$divide":
+            numerator, denominator = (_evaluate(item, document) for item in argument)
+            return numerator / denominator
+        if op == "$ceil":
+            return math.ceil(_evaluate(argument, document))
+        if op == "$toString":
+            return str(_evaluate(argument, document))
+        if op.startswith("$"):
+            raise OperationFailure(f"Expression {op} is not supported by the in-memory store")
+    return expression
+
+def _group(documents: Iterable[dict], spec: dict) -> List[dict]:
+    groups: Dict[tuple, dict] = {}
+    for document in documents:
+        key = _evaluate(spec["_id"], document)
+        group = groups.setdefault(sort_key(key), {"_id": key})
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, argument), = accumulator.items()
+            value = _evaluate(argument, document)
+            if op == "$sum":
+                group[field] = group.get(field, 0) + (value or 0)
+            elif op == "$last":
+                group[field] = value
+            elif op == "$first":
+                group.setdefault(field, value)
+            elif op == "$max":
+                if field not in group or sort_key(value) > sort_key(group[field]):
+                    group[field] = value
+            elif op == "$min":
+                if field not in group or sort_key(value) < sort_key(group[field]):
+                    group[field] = value
+            elif op == "$push":
+                group.setdefault(field, []).append(value)
+            else:
+                raise OperationFailure(f"Accumulator {op} is not supported by the in-memory store")
+    return list(groups.values())
+
+def _sort_spec(keys: Any, direction: Any = None) -> List[Tuple[str, Any]]:
+    if isinstance(keys, str):
+        return [(keys, 1 if direction is None else direction)]
+    if isinstance(keys, dict):
+        return list(keys.items())
+    return [tuple(item) for item in keys]
+
+def _sort_documents(documents: List[dict], spec: List[Tuple[str, Any]]) -> List[dict]:
+    documents.sort(key=lambda document: tuple(_directed(sort_key(_get(document, field)), direction) for field, direction in spec))
+    return documents
+
+def _project(document: dict, projection: Optional[dict], score: Optional[float] = None) -> dict:
+    if not projection:
+        return _copy(document)
+    fields = {key: value for key, value in projection.items() if not isinstance(value, dict)}
+    included = [key for key, value in fields.items() if value and key != "_id"]
+    if included or fields == {"_id": fields.get("_id")} and fields["_id"]:
+        projected = {}
+        for key in included:
+            value = _get(document, key)
+            if value is not MISSING:
+                _set(projected, key, _copy(value))
+        if fields.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        # Keep the document's field order, as the server does
+        projected = {key: projected[key] for key in document if key in projected}
+    else:
+        projected = _copy(document)
+        for key, value in fields.items():
+            if not value:
+                _unset(projected, key)
+    for key, value in projection.items():
+        if isinstance(value, dict) and value.get("$meta") == "textScore" and score is not None:
+            projected[key] = score
+    return projected
+
+# Indexes
+
+def _key_spec(keys: Any) -> List[Tuple[str, Any]]:
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [tuple(item) for item in keys]
+
+def _index_name(spec: List[Tuple[str, Any]]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in spec)
+
+class SortedIndex:
+    """
+    Secondary index over one or more fields, kept both ordered and hashed
+
+    Entries are (key, _id key, _id) tuples in a sorted list, so a query
+    with equality on a prefix of the fields finds its documents by binary
+    search and reads them already sorted by the remaining fields, in
+    either direction. A hash of the full key to its _ids answers equality
+    on every field in constant time, and enforces `unique`. Array values
+    are indexed per element, like a multikey index. A `sparse` index
+    leaves out documents that lack all of its fields.
+    """
+
+    def __init__(self, name: str, spec: List[Tuple[str, Any]], unique: bool = False, sparse: bool = False):
+        self.name = name
+        self.spec = spec
+        self.fields = [field for field, _ in spec]
+        self.directions = [direction for _, direction in spec]
+        self.unique = unique
+        self.sparse = sparse
+        self.multikey = False
+        self.entries: List[tuple] = []
+        self.hashed: Dict[tuple, Set[Any]] = {}
+
+    def keys(self, document: dict) -> List[tuple]:
+        values = [_get(document, field) for field in self.fields]
+        if self.sparse and all(value is MISSING for value in values):
+            return []
+        options = []
+        for value in values:
+            if isinstance(value, list) and value:
+                self.multikey = True
+                options.append({sort_key(item): None for item in value})
+            else:
+                options.append({sort_key(value): None})
+        return list(itertools.product(*options))
+
+    def _entry(self, key: tuple, doc_id: Any) -> tuple:
+        return (tuple(_directed(part, direction) for part, direction in zip(key, self.directions)), sort_key(doc_id), doc_id)
+
+    def conflicts(self, document: dict, doc_id: Any) -> Optional[tuple]:
+        """
+        Get a key of the document already held by another document, if the index is unique
+        """
+        if not self.unique:
+            return None
+        for key in self.keys(document):
+            if self.hashed.get(key, set()) - {doc_id}:
+                return key
+        return None
+
+    def add(self, document: dict, doc_id: Any) -> None:
+        for key in self.keys(document):
+            self.hashed.setdefault(key, set()).add(doc_id)
+            bisect.insort(self.entries, self._entry(key, doc_id))
+
+    def remove(self, document: dict, doc_id: Any) -> None:
+        for key in self.keys(document):
+            ids = self.hashed.get(key)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.hashed[key]
+            entry = self._entry(key, doc_id)
+            position = bisect.bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    def lookup(self, keys: Iterable[tuple]) -> Iterator[Any]:
+        for key in keys:
+            yield from self.hashed.get(key, ())
+
+    def scan(self, prefix: tuple, lower: Any = None, upper: Any = None, reverse: bool = False) -> Iterator[Any]:
+        """
+        Read the _ids under a key prefix in index order
+
+        `lower` and `upper` bound the field after the prefix, already
+        directed; both are inclusive, and exact bounds are left to the
+        query filter.
+        """
+        directed = tuple(_directed(part, direction) for part, direction in zip(prefix, self.directions))
+        start = bisect.bisect_left(self.entries, ((*directed, lower),) if lower is not None else (directed,))
+        stop = bisect.bisect_left(self.entries, ((*directed, upper, TOP),) if upper is not None else ((*directed, TOP),))
+        positions = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        entries = self.entries
+        for position in positions:
+            yield entries[position][2]
+
+    def describe(self) -> dict:
+        info = {"key": [list(item) for item in self.spec]}
+        if self.unique:
+            info["unique"] = True
+        if self.sparse:
+            info["sparse"] = True
+        return info
+
+class TextIndex:
+    """
+    Inverted index over the words of one or more string fields
+
+    Like a MongoDB text index it may be prefixed by equality fields, which
+    every $text query must then constrain, and it drops stopwords. Unlike
+    MongoDB it does not stem words. A document's score is the number of
+    query words it contains plus how densely they occur in it.
+    """
+
+    def __init__(self, name: str, spec: List[Tuple[str, Any]]):
+        self.name = name
+        self.spec = spec
+        self.prefix = [field for field, direction in spec if direction != "text"]
+        self.text_fields = [field for field, direction in spec if direction == "text"]
+        self.postings: Dict[str, Dict[Any, int]] = {}
+        self.lengths: Dict[Any, int] = {}
+
+    def _tokens(self, document: dict) -> List[str]:
+        tokens: List[str] = []
+        for field in self.text_fields:
+            value = _get(document, field)
+            if isinstance(value, str):
+                tokens += tokenize(value)
+        return tokens
+
+    def conflicts(self, document: dict, doc_id: Any) -> None:
+        return None
+
+    def add(self, document: dict, doc_id: Any) -> None:
+        tokens = self._tokens(document)
+        for token in tokens:
+            postings = self.postings.setdefault(token, {})
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+        self.lengths[doc_id] = len(tokens)
+
+    def remove(self, document: dict, doc_id: Any) -> None:
+        for token in set(self._tokens(document)):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[token]
+        self.lengths.pop(doc_id, None)
+
+    def search(self, text: str) -> Dict[Any, float]:
+        """
+        Score the documents containing any word of `text`; words prefixed
+        with "-" exclude the documents containing them
+        """
+        include = {token for word in text.split() if not word.startswith("-") for token in tokenize(word)}
+        exclude = {token for word in text.split() if word.startswith("-") for token in tokenize(word[1:])}
+        scores: Dict[Any, float] = {}
+        for token in include:
+            for doc_id, count in self.postings.get(token, {}).items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1 + count / max(self.lengths.get(doc_id, 1), 1)
+        for token in exclude:
+            for doc_id in self.postings.get(token, {}):
+                scores.pop(doc_id, None)
+        return scores
+
+    def describe(self) -> dict:
+        return {"key": [list(item) for item in self.spec], "text": True}
+
+class _Plan:
+    """
+    How a query reads its candidate documents
+    """
+
+    def __init__(self, kind: str, index: Any = None, keys: Sequence[tuple] = (), prefixes: Sequence[tuple] = (),
+                 lower: Any = None, upper: Any = None, reverse: bool = False, sorted_by_index: bool = False):
+        self.kind = kind  # "id", "hash", "scan", "text" or "collection"
+        self.index = index
+        self.keys = keys
+        self.prefixes = prefixes
+        self.lower = lower
+        self.upper = upper
+        self.reverse = reverse
+        self.sorted_by_index = sorted_by_index
+
+    def describe(self) -> dict:
+        return {"stage": self.kind, "index": getattr(self.index, "name", None), "sorted_by_index": self.sorted_by_index}
+
+def _equality_values(condition: Any) -> Optional[List[Any]]:
+    """
+    Get the values an indexed field must equal under `condition`, if it only allows specific ones
+    """
+    if _is_operator_condition(condition):
+        if set(condition) == {"$eq"}:
+            values = [condition["$eq"]]
+        elif set(condition) == {"$in"}:
+            values = list(condition["$in"])
+        else:
+            return None
+    else:
+        values = [condition]
+    values = _normalize(values)
+    # Whole-array and subdocument equality can't be read from per-element index keys
+    if any(isinstance(value, (list, dict)) for value in values):
+        return None
+    return values
+
+def _range_bounds(condition: Any) -> Optional[Tuple[Any, Any]]:
+    if not _is_operator_condition(condition) or not set(condition) & set(RANGE_OPERATORS):
+        return None
+    lower = upper = None
+    for op, argument in condition.items():
+        argument = _normalize(argument)
+        if op in ("$gt", "$gte"):
+            lower = sort_key(argument)
+        elif op in ("$lt", "$lte"):
+            upper = sort_key(argument)
+    if lower is not None and upper is None:
+        # Ranges only match values of the bound's type
+        upper = (lower[0], TOP)
+    if upper is not None and lower is None:
+        lower = (upper[0],)
+    return lower, upper
+
+def _excludes_missing(condition: Any) -> bool:
+    if _is_operator_condition(condition):
+        return condition.get("$exists") is True or bool(set(condition) & set(RANGE_OPERATORS))
+    return condition is not None
+
+class InMemoryCursor:
+    """
+    Lazy cursor over a query's results, run when first read
+    """
+
+    def __init__(self, run: Callable[["InMemoryCursor"], List[dict]]):
+        self._run = run
+        self.sort_spec: Optional[List[Tuple[str, Any]]] = None
+        self.skip_count = 0
+        self.limit_count = 0
+        self._results: Optional[Iterator[dict]] = None
+
+    def sort(self, keys, direction=None) -> "InMemoryCursor":
+        self.sort_spec = _sort_spec(keys, direction)
+        return self
+
+    def skip(self, count: int) -> "InMemoryCursor":
+        self.skip_count = count
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        self.limit_count = abs(count)
+        return self
+
+    def batch_size(self, size: int) -> "InMemoryCursor":
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await asyncio.sleep(0)
+        if self._results is None:
+            self._results = iter(self._run(self))
+        return list(itertools.islice(self._results, length)) if length else list(self._results)
+
+    def __aiter__(self) -> "InMemoryCursor":
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._results is None:
+            await asyncio.sleep(0)
+            self._results = iter(self._run(self))
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class InMemoryCollection:
+    """
+    A collection held in process memory, queried through real indexes
+
+    Implements the part of Motor's collection API the app uses. Documents
+    are kept by _id, which is always indexed and unique. `create_index`
+    builds a SortedIndex, or a TextIndex for "text" keys, and the query
+    planner reads candidates from the index matching the most equality
+    conditions, preferring one that also returns them in the requested
+    order so sorted, limited queries stop early; only queries no index
+    covers scan the collection. Every operation runs without awaiting
+    in between, so each is atomic on the event loop. Returned documents
+    are copies.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: Dict[Any, dict] = {}
+        self.indexes: Dict[str, Any] = {}
+        self.text_index: Optional[TextIndex] = None
+        self.last_plan: Optional[_Plan] = None
+
+    # Planning
+
+    def _plan(self, query: dict, sort: Optional[List[Tuple[str, Any]]]) -> _Plan:
+        if "$text" in query:
+            if self.text_index is None:
+                raise OperationFailure("text index required for $text query", code=27)
+            return _Plan("text", self.text_index)
+
+        if "_id" in query:
+            ids = _equality_values(query["_id"])
+            if ids is not None:
+                return _Plan("id", keys=ids)
+
+        best, best_rank = None, None
+        for index in self.indexes.values():
+            if not isinstance(index, SortedIndex):
+                continue
+            plan, rank = self._plan_index(index, query, sort)
+            if plan is not None and (best_rank is None or rank > best_rank):
+                best, best_rank = plan, rank
+        return best or _Plan("collection")
+
+    def _plan_index(self, index: SortedIndex, query: dict, sort: Optional[List[Tuple[str, Any]]]):
+        candidates: List[List[Any]] = []
+        for field in index.fields:
+            values = _equality_values(query[field]) if field in query else None
+            if values is None:
+                break
+            candidates.append(values)
+        equal = len(candidates)
+        combinations = math.prod(len(values) for values in candidates) if candidates else 1
+        if combinations > MAX_INDEX_LOOKUPS:
+            return None, None
+        # A sparse index lacks documents without its fields, so it only serves queries excluding them
+        if index.sparse and not any(_excludes_missing(query.get(field)) for field in index.fields if field in query):
+            return None, None
+
+        bounds = None
+        if equal < len(index.fields) and index.fields[equal] in query:
+            bounds = _range_bounds(query[index.fields[equal]])
+
+        sorted_by_index, reverse = False, False
+        if sort and not index.multikey and combinations == 1:
+            # Sort fields fixed by equality don't change the order
+            remaining = [(field, direction) for field, direction in sort if field not in index.fields[:equal]]
+            spec = list(zip(index.fields[equal:], index.directions[equal:]))[:len(remaining)]
+            if remaining and len(spec) == len(remaining) and all(field == name for (field, _), (name, _) in zip(remaining, spec)):
+                same = [direction == own for (_, direction), (_, own) in zip(remaining, spec)]
+                if all(same) or not any(same):
+                    sorted_by_index, reverse = True, not same[0]
+
+        if not equal and bounds is None and not sorted_by_index:
+            return None, None
+
+        prefixes = [tuple(sort_key(value) for value in values) for values in itertools.product(*candidates)]
+        if equal == len(index.fields) and not sorted_by_index:
+            plan = _Plan("hash", index, keys=prefixes)
+        else:
+            lower = upper = None
+            if bounds is not None:
+                lower, upper = bounds
+                if index.directions[equal] == -1:
+                    lower, upper = _Descending(upper), _Descending(lower)
+            plan = _Plan("scan", index, prefixes=prefixes, lower=lower, upper=upper, reverse=reverse, sorted_by_index=sorted_by_index)
+        # Prefer more equality fields, then index order for the sort, then a narrowing range, then fewer fields
+        return plan, (equal, sorted_by_index, bounds is not None, -len(index.fields))
+
+    def _candidate_ids(self, plan: _Plan, query: dict) -> Iterable[Any]:
+        if plan.kind == "id":
+            return plan.keys
+        if plan.kind == "hash":
+            return plan.index.lookup(plan.keys)
+        if plan.kind == "scan":
+            return itertools.chain.from_iterable(
+                plan.index.scan(prefix, plan.lower, plan.upper, plan.reverse) for prefix in plan.prefixes
+            )
+        return list(self.documents)
+
+    def _select(self, query: Optional[dict], sort: Optional[List[Tuple[str, Any]]] = None,
+                skip: int = 0, limit: int = 0) -> List[Tuple[dict, Optional[float]]]:
+        """
+        Get the stored documents matching `query` in order, with their text scores
+        """
+        query = query or {}
+        plan = self._plan(query, sort)
+        self.last_plan = plan
+
+        if plan.kind == "text":
+            scores = plan.index.search(query["$text"].get("$search", ""))
+            found = [(self.documents[doc_id], score) for doc_id, score in scores.items()
+                     if doc_id in self.documents and matches(self.documents[doc_id], query)]
+            if sort:
+                found = self._sort_scored(found, sort)
+            return found[skip:skip + limit] if limit else found[skip:]
+
+        seen: Set[Any] = set()
+        found = []
+        wanted = skip + limit if limit and (plan.sorted_by_index or not sort) else 0
+        for doc_id in self._candidate_ids(plan, query):
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            document = self.documents.get(doc_id)
+            if document is not None and matches(document, query):
+                found.append((document, None))
+                if wanted and len(found) >= wanted:
+                    break
+        if sort and not plan.sorted_by_index:
+            found = self._sort_scored(found, sort)
+        return found[skip:skip + limit] if limit else found[skip:]
+
+    @staticmethod
+    def _sort_scored(found: List[Tuple[dict, Optional[float]]], sort: List[Tuple[str, Any]]):
+        def key(item):
+            document, score = item
+            return tuple(
+                _Descending(sort_key(score or 0.0)) if isinstance(direction, dict)
+                else _directed(sort_key(_get(document, field)), direction)
+                for field, direction in sort
+            )
+        return sorted(found, key=key)
+
+    # Writes
+
+    def _check_unique(self, document: dict, doc_id: Any) -> None:
+        for index in self.indexes.values():
+            key = index.conflicts(document, doc_id)
+            if key is not None:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name}",
+                    code=11000,
+                    details={"keyPattern": dict(index.spec)},
+                )
+
+    def _store(self, document: dict) -> Any:
+        document = _normalize(document)
+        doc_id = document["_id"]
+        if doc_id in self.documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", code=11000)
+        self._check_unique(document, doc_id)
+        self.documents[doc_id] = document
+        for index in self.indexes.values():
+            index.add(document, doc_id)
+        return doc_id
+
+    def _replace(self, old: dict, new: dict) -> None:
+        doc_id = old["_id"]
+        self._check_unique(new, doc_id)
+        for index in self.indexes.values():
+            index.remove(old, doc_id)
+            index.add(new, doc_id)
+        self.documents[doc_id] = new
+
+    def _delete(self, document: dict) -> None:
+        doc_id = document["_id"]
+        for index in self.indexes.values():
+            index.remove(document, doc_id)
+        del self.documents[doc_id]
+
+    def _update_document(self, document: dict, update: dict) -> bool:
+        updated = _copy(document)
+        _apply_update(updated, update)
+        if updated == document:
+            return False
+        self._replace(document, updated)
+        return True
+
+    def _upsert(self, query: dict, update: dict) -> Any:
+        document = _upsert_seed(query)
+        _apply_update(document, update, inserting=True)
+        document.setdefault("_id", ObjectId())
+        return self._store(document)
+
+    # Collection API
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, sort=None,
+             skip: int = 0, limit: int = 0, **kwargs) -> InMemoryCursor:
+        def run(cursor: InMemoryCursor) -> List[dict]:
+            found = self._select(filter, cursor.sort_spec, cursor.skip_count, cursor.limit_count)
+            return [_project(document, projection, score) for document, score in found]
+
+        cursor = InMemoryCursor(run)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> Optional[dict]:
+        await asyncio.sleep(0)
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        found = self._select(filter, _sort_spec(kwargs["sort"]) if kwargs.get("sort") else None, limit=1)
+        return _project(found[0][0], projection, found[0][1]) if found else None
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        await asyncio.sleep(0)
+        return len(self._select(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self.documents)
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        await asyncio.sleep(0)
+        # Like the driver, the caller's document gets the generated _id
+        document.setdefault("_id", ObjectId())
+        self._store(document)
+        return InsertOneResult(document["_id"], True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        await asyncio.sleep(0)
+        inserted, errors = [], []
+        for position, document in enumerate(documents):
+            document.setdefault("_id", ObjectId())
+            try:
+                self._store(document)
+            except DuplicateKeyError as e:
+                errors.append({"index": position, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+                continue
+            inserted.append(document["_id"])
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(inserted, True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        await asyncio.sleep(0)
+        found = self._select(filter, limit=1)
+        if found:
+            modified = self._update_document(found[0][0], update)
+            return UpdateResult({"n": 1, "nModified": int(modified)}, True)
+        if upsert:
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": self._upsert(filter, update)}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        await asyncio.sleep(0)
+        found = self._select(filter)
+        if not found and upsert:
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": self._upsert(filter, update)}, True)
+        modified = sum(self._update_document(document, update) for document, _ in found)
+        return UpdateResult({"n": len(found), "nModified": modified}, True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None, sort=None,
+                                  upsert: bool = False, return_document: bool = ReturnDocument.BEFORE, **kwargs) -> Optional[dict]:
+        await asyncio.sleep(0)
+        found = self._select(filter, _sort_spec(sort) if sort else None, limit=1)
+        if not found:
+            if not upsert:
+                return None
+            doc_id = self._upsert(filter, update)
+            return _project(self.documents[doc_id], projection) if return_document == ReturnDocument.AFTER else None
+        document = found[0][0]
+        self._update_document(document, update)
+        if return_document == ReturnDocument.AFTER:
+            return _project(self.documents[document["_id"]], projection)
+        return _project(document, projection)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None, **kwargs) -> Optional[dict]:
+        await asyncio.sleep(0)
+        found = self._select(filter, _sort_spec(sort) if sort else None, limit=1)
+        if not found:
+            return None
+        self._delete(found[0][0])
+        return _project(found[0][0], projection)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        await asyncio.sleep(0)
+        found = self._select(filter, limit=1)
+        for document, _ in found:
+            self._delete(document)
+        return DeleteResult({"n": len(found)}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        await asyncio.sleep(0)
+        found = self._select(filter)
+        for document, _ in found:
+            self._delete(document)
+        return DeleteResult({"n": len(found)}, True)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> InMemoryCursor:
+        def run(cursor: InMemoryCursor) -> List[dict]:
+            stages = list(pipeline)
+            # A leading $match, and a $sort after it, are answered by the query planner
+            query = stages.pop(0)["$match"] if stages and "$match" in stages[0] else {}
+            sort = _sort_spec(stages.pop(0)["$sort"]) if stages and "$sort" in stages[0] else None
+            documents = [_copy(document) for document, _ in self._select(query, sort)]
+            for stage in stages:
+                (name, spec), = stage.items()
+                if name == "$match":
+                    documents = [document for document in documents if matches(document, spec)]
+                elif name == "$sort":
+                    documents = _sort_documents(documents, _sort_spec(spec))
+                elif name == "$group":
+                    documents = _group(documents, spec)
+                elif name == "$limit":
+                    documents = documents[:spec]
+                elif name == "$skip":
+                    documents = documents[spec:]
+                elif name == "$project":
+                    documents = [_project(document, spec) for document in documents]
+                elif name == "$count":
+                    documents = [{spec: len(documents)}] if documents else []
+                else:
+                    raise OperationFailure(f"Pipeline stage {name} is not supported by the in-memory store")
+            return documents
+
+        return InMemoryCursor(run)
+
+    async def create_index(self, keys, unique: bool = False, sparse: bool = False, name: Optional[str] = None, **kwargs) -> str:
+        await asyncio.sleep(0)
+        spec = _key_spec(keys)
+        name = name or _index_name(spec)
+        existing = self.indexes.get(name)
+        if existing is not None:
+            if existing.spec != spec:
+                raise OperationFailure(f"An index named {name} already exists with different keys", code=86)
+            return name
+
+        if any(direction == "text" for _, direction in spec):
+            if self.text_index is not None:
+                raise OperationFailure(f"Collection {self.name} already has text index {self.text_index.name}", code=85)
+            index = TextIndex(name, spec)
+        else:
+            index = SortedIndex(name, spec, unique=unique, sparse=sparse)
+        for doc_id, document in self.documents.items():
+            index.add(document, doc_id)
+            if isinstance(index, SortedIndex) and index.conflicts(document, doc_id) is not None:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}", code=11000)
+        self.indexes[name] = index
+        if isinstance(index, TextIndex):
+            self.text_index = index
+        return name
+
+    async def drop_index(self, name: str) -> None:
+        index = self.indexes.pop(name, None)
+        if index is None:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        if index is self.text_index:
+            self.text_index = None
+
+    async def index_information(self) -> Dict[str, dict]:
+        info = {"_id_": {"key": [["_id", 1]]}}
+        info.update({name: index.describe() for name, index in self.indexes.items()})
+        return info
+
+    def explain(self, filter: Optional[dict] = None, sort=None) -> dict:
+        """
+        Describe how the planner would read the documents for a query
+        """
+        return self._plan(filter or {}, _sort_spec(sort) if sort else None).describe()
+
+    async def drop(self) -> None:
+        self.documents.clear()
+        self.indexes.clear()
+        self.text_index = None
+
+class InMemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self.collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = InMemoryCollection(name)
+        return collection
+
+    def get_collection(self, name: str, **kwargs) -> InMemoryCollection:
+        return self[name]
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return list(self.collections)
+
+    async def drop_collection(self, name: str) -> None:
+        self.collections.pop(name, None)
+
+    async def command(self, command: Any, *args, **kwargs) -> dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Command {name} is not supported by the in-memory store")
+
+class InMemoryClient:
+    """
+    Stand-in for AsyncIOMotorClient that keeps every database in process memory
+
+    Selected with DATABASE_BACKEND=memory for local development, tests and
+    load tests without a MongoDB server. Data is per worker process and is
+    lost when it exits. Connection options are accepted and ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.databases: Dict[str, InMemoryDatabase] = {}
+        self.admin = InMemoryDatabase("admin")
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        database = self.databases.get(name)
+        if database is None:
+            database = self.databases[name] = InMemoryDatabase(name)
+        return database
+
+    def get_database(self, name: str, **kwargs) -> InMemoryDatabase:
+        return self[name]
+
+    async def list_database_names(self) -> List[str]:
+        return list(self.databases)
+
+    async def drop_database(self, name: str) -> None:
+        self.databases.pop(name, None)
+
+    def close(self) -> None:
+        pass
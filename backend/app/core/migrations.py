@@ -0,0 +1,100 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Awaitable, Callable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Collection recording which migrations have been applied to the database
+MIGRATIONS_COLLECTION = "schema_migrations"
+# Document in MIGRATIONS_COLLECTION tracking the index migrations
+INDEXES_DOCUMENT_ID = "indexes"
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[object], Awaitable[None]]
+
+async def _initial_indexes(database) -> None:
+    users = database.collection("users")
+    sessions = database.collection("sessions")
+    memories = database.collection("memories")
+    chat_messages = database.collection("chat_messages")
+
+    await users.create_index("email", unique=True)
+    await users.create_index("username", unique=True)
+    await sessions.create_index("user_id")
+    await sessions.create_index([("user_id", 1), ("updated_at", -1)])
+    await sessions.create_index("deleted_at", sparse=True)
+    await memories.create_index("user_id")
+    await memories.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    await memories.create_index([("user_id", 1), ("memo_type", 1), ("created_at", -1), ("_id", -1)])
+    await memories.create_index([("user_id", 1), ("memo_type", 1), ("lsh_bands", 1)])
+    await chat_messages.create_index([("session_id", 1), ("timestamp", 1), ("_id", 1)])
+    # Text indexes for search; the user_id prefix scopes every lookup to one user
+    await chat_messages.create_index([("user_id", 1), ("content", "text")])
+    await memories.create_index([("user_id", 1), ("content", "text")])
+
+# Append new index changes as a new version; never edit an applied one
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Initial indexes", _initial_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+async def applied_version(database) -> int:
+    """
+    Get the version of the last index migration applied to the database
+    """
+    document = await database.collection(MIGRATIONS_COLLECTION).find_one({"_id": INDEXES_DOCUMENT_ID})
+    return document["version"] if document else 0
+
+async def migrate(database) -> int:
+    """
+    Apply the index migrations the database has not seen yet
+
+    A worker that finds the database up to date only pays for one
+    `find_one`. Migrations are applied in version order and each is
+    recorded as soon as it succeeds; a failure is raised, leaving the
+    version at the last one that succeeded. Workers starting together
+    may apply the same migration twice, which is harmless because
+    `create_index` does nothing when the index already exists.
+
+    Returns:
+        The version the database is at
+    """
+    version = await applied_version(database)
+    records = database.collection(MIGRATIONS_COLLECTION)
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logger.info(f"Applying index migration {migration.version}: {migration.description}")
+        start = time.perf_counter()
+        await migration.apply(database)
+        await records.update_one(
+            {"_id": INDEXES_DOCUMENT_ID},
+            {
+                "$max": {"version": migration.version},
+                "$push": {"applied": {
+                    "version": migration.version,
+                    "description": migration.description,
+                    "applied_at": datetime.datetime.now(datetime.timezone.utc),
+                    "duration_ms": round((time.perf_counter() - start) * 1e3, 1),
+                }},
+            },
+            upsert=True,
+        )
+        version = migration.version
+    return version
+
+if __name__ == "__main__":
+    # Apply pending migrations, e.g. before a deploy with DB_MIGRATE_ON_STARTUP off:
+    # python -m app.core.migrations
+    from app.core.database import database
+
+    async def main() -> None:
+        print(f"Index migrations at version {await migrate(database)}")
+        database.close()
+
+    asyncio.run(main())
@@ -1,11 +1,38 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any
+from typing import Optional, Tuple, Union, Any
 from jose import jwt
 from passlib.context import CryptContext
 from .config import settings
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# bcrypt is deliberately slow CPU work that releases the GIL, so it runs on a
+# small dedicated pool instead of the event loop. The pool size bounds how
+# many hashes run at once; further requests queue without blocking the loop.
+_password_executor: Optional[ThreadPoolExecutor] = None
+
+def get_password_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool used for password hashing, creating it on first use
+    """
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+        )
+    return _password_executor
+
+def shutdown_password_executor() -> None:
+    """
+    Shut down the password hashing pool
+    """
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False)
+        _password_executor = None
 
 # JWT token functions
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -52,3 +79,33 @@ def get_password_hash(password: str) -> str:
         Hashed password
     """
     return pwd_context.hash(password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop, rehashing it if its hash is outdated
+
+    Args:
+        plain_password: The plain-text password
+        hashed_password: The hashed password
+
+    Returns:
+        Whether the password matches, and a new hash to store if the stored
+        one uses a deprecated scheme or a different work factor (else None)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_password_executor(), pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password off the event loop
+
+    Args:
+        password: The plain-text password
+
+    Returns:
+        Hashed password
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), pwd_context.hash, password)
@@ -1,11 +1,43 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+import time
+from typing import Dict
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # Use absolute imports when running as a module
-from app.api.endpoints import auth, profile, session, memory, chat
+from app.api.endpoints import auth, profile, session, memory, chat, search, health
 from app.core.config import settings
+from app.core.database import init_db, close_db
+from app.core.security import shutdown_password_executor
+from app.services.llm import llm_registry
+from app.services.metrics import http_request_seconds, metrics_registry
+from app.services.profiler import ProfilingMiddleware
+from app.services.memory_extraction import memory_extractor
+from app.services.session_reaper import session_reaper
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    llm_registry.warm([settings.REASONING_LLM_MODEL, settings.NON_REASONING_LLM_MODEL])
+    if settings.MEMORY_EXTRACTION_ENABLED:
+        memory_extractor.start()
+    if settings.SESSION_REAPER_ENABLED:
+        session_reaper.start()
+    yield
+    await session_reaper.stop()
+    await memory_extractor.stop()
+    # Let saves started by streams reach the database
+    if chat.pending_saves:
+        await asyncio.gather(*chat.pending_saves, return_exceptions=True)
+    close_db()
+    shutdown_password_executor()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+
+# Innermost, so route handlers run in the task it profiles
+app.add_middleware(ProfilingMiddleware)
 
 # Set up CORS middleware
 app.add_middleware(
@@ -14,19 +46,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor of the memory list
 )
 
+# Full path templates of the API routes, by id of the route object
+route_templates: Dict[int, str] = {}
+
+def route_template(request: Request) -> str:
+    """
+    Get the path template the matched route was declared with, e.g. /api/chat/{session_id}/messages
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    # Depending on the FastAPI version, an included router's routes are
+    # copied with the prefix in their path, or matched as declared
+    return route_templates.get(id(route), route.path)
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so IDs in paths don't create a series each
+    http_request_seconds.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route_template(request),
+        status=str(response.status_code),
+    )
+    return response
+
 # Include API routers
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(profile.router, prefix="/api/profile", tags=["Profile"])
-app.include_router(session.router, prefix="/api/sessions", tags=["Sessions"])
-app.include_router(memory.router, prefix="/api/memory", tags=["Memory"])
-app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
+for router, prefix, tags in [
+    (auth.router, "/api/auth", ["Authentication"]),
+    (profile.router, "/api/profile", ["Profile"]),
+    (session.router, "/api/sessions", ["Sessions"]),
+    (memory.router, "/api/memory", ["Memory"]),
+    (chat.router, "/api/chat", ["Chat"]),
+    (search.router, "/api/search", ["Search"]),
+    (health.router, "/health", ["Health"]),
+]:
+    app.include_router(router, prefix=prefix, tags=tags)
+    route_templates.update((id(route), prefix + route.path) for route in router.routes)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Personalized Chat Bot API"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """
+        Metrics of this worker in the Prometheus text format
+        """
+        return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from .user import PyObjectId, utc_now
@@ -10,6 +10,10 @@ class MemoryModel(BaseModel):
     content: str = Field(..., description="The content of the memory")
     created_at: datetime = Field(default_factory=utc_now, description="The creation date of the memory")
     memo_type: str = Field(..., description="The type of the memory (core or environment)")
+    embedding: Optional[bytes] = Field(None, description="float32 embedding of the content")
+    embedding_model: Optional[str] = Field(None, description="Name of the embedder that produced the embedding")
+    minhash: Optional[bytes] = Field(None, description="uint32 MinHash signature of the content")
+    lsh_bands: Optional[List[str]] = Field(None, description="LSH band keys of the MinHash signature")
 
     model_config = {
         "populate_by_name": True,
@@ -11,6 +11,9 @@ class SessionModel(BaseModel):
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
     last_message_at: Optional[datetime] = None
+    message_count: int = 0  # Kept up to date on every chat turn
+    last_message_preview: Optional[str] = None  # Start of the most recent message
+    total_tokens: int = 0  # Estimated tokens across all messages
 
     model_config = {
         "populate_by_name": True,
@@ -0,0 +1,126 @@
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+def to_object_id(value: Any) -> Optional[ObjectId]:
+    """
+    Convert a value to an ObjectId
+
+    Args:
+        value: ObjectId or its string representation
+
+    Returns:
+        ObjectId, or None if the value is not a valid ObjectId
+    """
+    if isinstance(value, ObjectId):
+        return value
+    if not ObjectId.is_valid(value):
+        return None
+    return ObjectId(value)
+
+class BaseRepository:
+    """
+    Thin async data-access wrapper around a single collection
+
+    Every method awaits the underlying driver, so handlers never block
+    the event loop while waiting on MongoDB.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.collection.find_one(query, projection)
+
+    async def find(
+        self,
+        query: dict,
+        sort: Optional[Sequence[Tuple[str, int]]] = None,
+        skip: int = 0,
+        limit: int = 0,
+        projection: Optional[dict] = None,
+    ) -> List[dict]:
+        cursor = self.collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def iterate(
+        self,
+        query: dict,
+        sort: Optional[Sequence[Tuple[str, int]]] = None,
+        projection: Optional[dict] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream matching documents from a server-side cursor
+
+        Only one batch of `batch_size` documents is held in memory at a time.
+        """
+        cursor = self.collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        cursor = cursor.batch_size(batch_size)
+        async for document in cursor:
+            yield document
+
+    async def aggregate(self, pipeline: List[dict], batch_size: int = 1000) -> AsyncIterator[dict]:
+        """
+        Stream the results of an aggregation pipeline
+        """
+        async for document in self.collection.aggregate(pipeline, batchSize=batch_size):
+            yield document
+
+    async def count(self, query: dict) -> int:
+        return await self.collection.count_documents(query)
+
+    async def insert_one(self, document: dict) -> Any:
+        result = await self.collection.insert_one(document)
+        return result.inserted_id
+
+    async def insert_many(self, documents: List[dict]) -> List[Any]:
+        result = await self.collection.insert_many(documents)
+        return result.inserted_ids
+
+    async def update_one(self, query: dict, values: dict, increments: Optional[dict] = None) -> int:
+        """
+        Apply `$set` of `values`, and `$inc` of `increments` if given, to the
+        first matching document in one atomic update
+
+        Returns:
+            Number of documents matched, 0 or 1
+        """
+        update = {"$set": values} if values else {}
+        if increments:
+            update["$inc"] = increments
+        result = await self.collection.update_one(query, update)
+        return result.matched_count
+
+    async def update_many(self, query: dict, values: dict) -> int:
+        result = await self.collection.update_many(query, {"$set": values})
+        return result.modified_count
+
+    async def find_one_and_update(
+        self, query: dict, values: dict, projection: Optional[dict] = None
+    ) -> Optional[dict]:
+        """
+        Apply `$set` to the first matching document and return it as updated,
+        in a single round trip
+        """
+        if not values:
+            return await self.find_one(query, projection)
+        return await self.collection.find_one_and_update(
+            query, {"$set": values}, projection=projection, return_document=ReturnDocument.AFTER
+        )
+
+    async def delete_one(self, query: dict) -> int:
+        result = await self.collection.delete_one(query)
+        return result.deleted_count
+
+    async def delete_many(self, query: dict) -> int:
+        result = await self.collection.delete_many(query)
+        return result.deleted_count
@@ -0,0 +1,126 @@
+from typing import AsyncIterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.database import chat_messages_collection
+from app.models.chat import ChatMessageModel
+from app.repositories.base import BaseRepository
+from app.repositories.pagination import keyset_filter
+
+class ChatMessageRepository(BaseRepository):
+    async def list_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        projection: Optional[dict] = None,
+    ) -> Tuple[List[dict], bool]:
+        """
+        Get a page of a session's messages by keyset pagination
+
+        Without `after`, pages walk backwards from the most recent message
+        (or from `before`); with `after`, they walk forwards. Either way the
+        query is a single range scan on (session_id, timestamp, _id).
+
+        Returns:
+            The page in chronological order, and whether more messages
+            exist in the direction of travel
+
+        Raises:
+            ValueError: If a cursor is malformed
+        """
+        query = {"session_id": session_id}
+        direction = 1 if after else -1
+        cursor = after or before
+        if cursor:
+            query.update(keyset_filter("timestamp", cursor, direction))
+
+        # Fetch one extra message to tell whether another page exists
+        messages = await self.find(
+            query,
+            sort=[("timestamp", direction), ("_id", direction)],
+            limit=limit + 1,
+            projection=projection,
+        )
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if direction < 0:
+            messages.reverse()
+
+        return messages, has_more
+
+    def iterate_for_session(self, session_id: str, batch_size: int) -> AsyncIterator[dict]:
+        """
+        Stream a session's messages in chronological order
+        """
+        return self.iterate(
+            {"session_id": session_id}, sort=[("timestamp", 1), ("_id", 1)], batch_size=batch_size
+        )
+
+    async def create_many(self, messages: List[ChatMessageModel]) -> List[dict]:
+        documents = [message.model_dump(by_alias=True) for message in messages]
+        await self.insert_many(documents)
+        return documents
+
+    def summarize_sessions(self, user_id: Optional[str], chars_per_token: int) -> AsyncIterator[dict]:
+        """
+        Stream per-session message count, estimated tokens and last message content
+
+        Without `user_id` the pipeline covers every session and sorts on the
+        (session_id, timestamp, _id) index.
+        """
+        pipeline = [{"$match": {"user_id": user_id}}] if user_id else []
+        pipeline += [
+            {"$sort": {"session_id": 1, "timestamp": 1, "_id": 1}},
+            {"$group": {
+                "_id": "$session_id",
+                "message_count": {"$sum": 1},
+                "total_tokens": {"$sum": {"$ceil": {"$divide": [{"$strLenCP": "$content"}, chars_per_token]}}},
+                "last_content": {"$last": "$content"},
+            }},
+        ]
+        return self.aggregate(pipeline)
+
+    async def text_search(self, user_id: str, query: str, limit: int, session_ids: List[str]) -> List[dict]:
+        """
+        Get a user's chat messages in the given sessions matching a text
+        query, best first, with a `score` field
+        """
+        score = {"$meta": "textScore"}
+        return await self.find(
+            {"user_id": user_id, "session_id": {"$in": session_ids}, "$text": {"$search": query}},
+            sort=[("score", score)],
+            limit=limit,
+            projection={"metadata": 0, "score": score},
+        )
+
+    def iterate_for_user(self, user_id: str, batch_size: int) -> AsyncIterator[dict]:
+        """
+        Stream all of a user's messages in chronological order, without metadata
+        """
+        return self.iterate(
+            {"user_id": user_id}, sort=[("timestamp", 1), ("_id", 1)],
+            projection={"metadata": 0}, batch_size=batch_size,
+        )
+
+    async def count_for_session(self, session_id: str) -> int:
+        return await self.count({"session_id": session_id})
+
+    async def list_ids_for_session(self, session_id: str, limit: int) -> List[ObjectId]:
+        """
+        Get the IDs of a session's oldest messages, walking the
+        (session_id, timestamp, _id) index
+        """
+        messages = await self.find(
+            {"session_id": session_id},
+            sort=[("timestamp", 1), ("_id", 1)],
+            limit=limit,
+            projection={"_id": 1},
+        )
+        return [message["_id"] for message in messages]
+
+    async def delete_by_ids(self, message_ids: List[ObjectId]) -> int:
+        return await self.delete_many({"_id": {"$in": message_ids}})
+
+chat_message_repository = ChatMessageRepository(chat_messages_collection)
@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+from app.core.database import memories_collection
+from app.models.memory import MemoryModel
+from app.repositories.base import BaseRepository, to_object_id
+from app.repositories.pagination import keyset_filter
+
+# Embeddings and MinHash signatures are only needed for retrieval and
+# deduplication, so keep them out of documents returned to API handlers
+WITHOUT_EMBEDDING = {"embedding": 0, "minhash": 0, "lsh_bands": 0}
+WITHOUT_DEDUP_FIELDS = {"minhash": 0, "lsh_bands": 0}
+# Cap on candidates fetched for a single near-duplicate lookup
+MAX_DUPLICATE_CANDIDATES = 50
+
+class MemoryRepository(BaseRepository):
+    async def get_for_user(self, memory_id: str, user_id: str) -> Optional[dict]:
+        object_id = to_object_id(memory_id)
+        if object_id is None:
+            return None
+        return await self.find_one({"_id": object_id, "user_id": user_id}, WITHOUT_EMBEDDING)
+
+    async def list_for_user(
+        self, user_id: str, memo_type: Optional[str] = None, include_embeddings: bool = False
+    ) -> List[dict]:
+        query = {"user_id": user_id}
+        if memo_type:
+            query["memo_type"] = memo_type
+        projection = WITHOUT_DEDUP_FIELDS if include_embeddings else WITHOUT_EMBEDDING
+        return await self.find(query, sort=[("created_at", -1)], projection=projection)
+
+    async def list_page(
+        self,
+        user_id: str,
+        limit: Optional[int],
+        memo_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], bool]:
+        """
+        Get a page of a user's memories, newest first, by keyset pagination
+
+        The query is a range scan on the (user_id, memo_type, created_at, _id)
+        index, or (user_id, created_at, _id) without a type filter.
+
+        Args:
+            limit: Page size; None returns every matching memory as one page
+            since: Only memories created at or after this time
+            until: Only memories created before this time
+            cursor: Cursor of the last memory of the previous page
+            fields: Fields to return besides `_id`; all API fields if None
+
+        Returns:
+            The page, and whether more memories follow it
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = {"user_id": user_id}
+        if memo_type:
+            query["memo_type"] = memo_type
+        if since or until:
+            query["created_at"] = {}
+            if since:
+                query["created_at"]["$gte"] = since
+            if until:
+                query["created_at"]["$lt"] = until
+        if cursor:
+            query.update(keyset_filter("created_at", cursor, -1))
+
+        projection = {field: 1 for field in fields} if fields is not None else WITHOUT_EMBEDDING
+        if fields is not None:
+            # The sort key is needed to build the next cursor
+            projection["created_at"] = 1
+
+        sort = [("created_at", -1), ("_id", -1)]
+        if limit is None:
+            return await self.find(query, sort=sort, projection=projection), False
+
+        # Fetch one extra memory to tell whether another page exists
+        memories = await self.find(query, sort=sort, limit=limit + 1, projection=projection)
+        return memories[:limit], len(memories) > limit
+
+    def iterate_for_user(self, user_id: str, batch_size: int) -> AsyncIterator[dict]:
+        """
+        Stream a user's memories oldest first, without embeddings
+        """
+        return self.iterate(
+            {"user_id": user_id}, sort=[("created_at", 1), ("_id", 1)],
+            projection=WITHOUT_EMBEDDING, batch_size=batch_size,
+        )
+
+    async def text_search(self, user_id: str, query: str, limit: int) -> List[dict]:
+        """
+        Get a user's memories matching a text query, best first, with a `score` field
+        """
+        score = {"$meta": "textScore"}
+        return await self.find(
+            {"user_id": user_id, "$text": {"$search": query}},
+            sort=[("score", score)],
+            limit=limit,
+            projection={**WITHOUT_EMBEDDING, "score": score},
+        )
+
+    async def list_for_dedup(self, user_id: str) -> List[dict]:
+        return await self.find(
+            {"user_id": user_id}, sort=[("created_at", -1)], projection={"embedding": 0, "lsh_bands": 0}
+        )
+
+    async def find_by_lsh_bands(self, user_id: str, memo_type: str, lsh_bands: List[str]) -> List[dict]:
+        """
+        Get a user's memories of a type that share at least one LSH band key
+        """
+        return await self.find(
+            {"user_id": user_id, "memo_type": memo_type, "lsh_bands": {"$in": lsh_bands}},
+            limit=MAX_DUPLICATE_CANDIDATES,
+            projection={"embedding": 0, "lsh_bands": 0},
+        )
+
+    async def create(self, memory: MemoryModel) -> dict:
+        document = memory.model_dump(by_alias=True)
+        await self.insert_one(document)
+        return document
+
+    async def create_many(self, memories: List[MemoryModel]) -> List[dict]:
+        documents = [memory.model_dump(by_alias=True) for memory in memories]
+        await self.insert_many(documents)
+        return documents
+
+    async def update_for_user(self, memory_id: str, user_id: str, values: dict) -> Optional[dict]:
+        object_id = to_object_id(memory_id)
+        if object_id is None:
+            return None
+        return await self.find_one_and_update(
+            {"_id": object_id, "user_id": user_id}, values, WITHOUT_EMBEDDING
+        )
+
+    async def delete_for_user(self, memory_id: str, user_id: str) -> bool:
+        object_id = to_object_id(memory_id)
+        if object_id is None:
+            return False
+        return await self.delete_one({"_id": object_id, "user_id": user_id}) > 0
+
+    async def delete_many_for_user(self, user_id: str, memory_ids: List[ObjectId]) -> int:
+        return await self.delete_many({"_id": {"$in": memory_ids}, "user_id": user_id})
+
+memory_repository = MemoryRepository(memories_collection)
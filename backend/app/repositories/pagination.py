@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+def encode_cursor(sort_value: datetime, object_id: ObjectId) -> str:
+    """
+    Encode a keyset position as an opaque, URL-safe cursor
+
+    Args:
+        sort_value: Value of the sort field of the last document returned
+        object_id: `_id` of that document, used to break ties
+
+    Returns:
+        Cursor string
+    """
+    payload = json.dumps([sort_value.isoformat(), str(object_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a cursor produced by `encode_cursor`
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, object_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), ObjectId(object_id)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+def keyset_filter(field: str, cursor: str, direction: int) -> dict:
+    """
+    Build a filter matching documents strictly after a cursor position
+
+    Args:
+        field: Sort field, paired with `_id` as a tiebreaker
+        cursor: Cursor of the last document already returned
+        direction: 1 for ascending order, -1 for descending order
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    sort_value, object_id = decode_cursor(cursor)
+    op = "$gt" if direction > 0 else "$lt"
+    return {
+        "$or": [
+            {field: {op: sort_value}},
+            {field: sort_value, "_id": {op: object_id}},
+        ]
+    }
@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+
+from app.core.database import sessions_collection
+from app.models.session import SessionModel
+from app.repositories.base import BaseRepository, to_object_id
+
+# Sessions being deleted keep a deleted_at tombstone until their messages
+# are gone; every user-facing query hides them
+NOT_DELETED = {"deleted_at": {"$exists": False}}
+
+class SessionRepository(BaseRepository):
+    async def get_for_user(self, session_id: str, user_id: str) -> Optional[dict]:
+        object_id = to_object_id(session_id)
+        if object_id is None:
+            return None
+        return await self.find_one({"_id": object_id, "user_id": user_id, **NOT_DELETED})
+
+    async def list_for_user(self, user_id: str, projection: Optional[dict] = None) -> List[dict]:
+        return await self.find({"user_id": user_id, **NOT_DELETED}, sort=[("updated_at", -1)], projection=projection)
+
+    async def create(self, session: SessionModel) -> dict:
+        document = session.model_dump(by_alias=True)
+        await self.insert_one(document)
+        return document
+
+    async def update_for_user(self, session_id: str, user_id: str, values: dict) -> Optional[dict]:
+        object_id = to_object_id(session_id)
+        if object_id is None:
+            return None
+        return await self.find_one_and_update({"_id": object_id, "user_id": user_id, **NOT_DELETED}, values)
+
+    async def touch(
+        self, session_id: str, when: datetime, preview: str, messages: int, tokens: int
+    ) -> bool:
+        """
+        Record new messages on a session: activity time, preview, and the
+        message and token totals, in one atomic update
+
+        Returns:
+            False if the session is gone or being deleted
+        """
+        matched = await self.update_one(
+            {"_id": to_object_id(session_id), **NOT_DELETED},
+            {"last_message_at": when, "updated_at": when, "last_message_preview": preview},
+            increments={"message_count": messages, "total_tokens": tokens},
+        )
+        return matched > 0
+
+    async def initialize_missing_summaries(self, user_id: Optional[str] = None) -> int:
+        """
+        Give sessions created before summaries existed an empty summary
+        """
+        query = {"message_count": {"$exists": False}}
+        if user_id:
+            query["user_id"] = user_id
+        return await self.update_many(query, {"message_count": 0, "total_tokens": 0, "last_message_preview": None})
+
+    async def set_summary(self, session_id: ObjectId, message_count: int, total_tokens: int, preview: Optional[str]) -> None:
+        await self.update_one(
+            {"_id": session_id},
+            {"message_count": message_count, "total_tokens": total_tokens, "last_message_preview": preview},
+        )
+
+    async def tombstone_for_user(self, session_id: str, user_id: str, when: datetime) -> bool:
+        """
+        Hide a session and queue it for the reaper
+
+        Returns:
+            False if the session doesn't exist, belongs to another user or
+            is already being deleted
+        """
+        object_id = to_object_id(session_id)
+        if object_id is None:
+            return False
+        tombstoned = await self.find_one_and_update(
+            {"_id": object_id, "user_id": user_id, **NOT_DELETED},
+            {"deleted_at": when, "messages_deleted": 0},
+            projection={"_id": 1},
+        )
+        return tombstoned is not None
+
+    async def list_tombstoned(self, limit: int) -> List[dict]:
+        return await self.find({"deleted_at": {"$exists": True}}, sort=[("deleted_at", 1)], limit=limit)
+
+    async def list_tombstoned_for_user(self, user_id: str) -> List[dict]:
+        return await self.find({"user_id": user_id, "deleted_at": {"$exists": True}}, sort=[("deleted_at", 1)])
+
+    async def record_messages_deleted(self, session_id: ObjectId, count: int) -> None:
+        await self.update_one({"_id": session_id}, {}, increments={"messages_deleted": count})
+
+    async def purge(self, session_id: ObjectId) -> None:
+        await self.delete_one({"_id": session_id})
+
+session_repository = SessionRepository(sessions_collection)
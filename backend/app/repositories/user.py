@@ -0,0 +1,28 @@
+from typing import Optional
+
+from app.core.database import users_collection
+from app.models.user import UserModel
+from app.repositories.base import BaseRepository, to_object_id
+
+class UserRepository(BaseRepository):
+    async def get_by_id(self, user_id) -> Optional[dict]:
+        object_id = to_object_id(user_id)
+        if object_id is None:
+            return None
+        return await self.find_one({"_id": object_id})
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return await self.find_one({"email": email})
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        return await self.find_one({"username": username})
+
+    async def create(self, user: UserModel) -> dict:
+        document = user.model_dump(by_alias=True)
+        await self.insert_one(document)
+        return document
+
+    async def update(self, user_id, values: dict) -> Optional[dict]:
+        return await self.find_one_and_update({"_id": to_object_id(user_id)}, values)
+
+user_repository = UserRepository(users_collection)
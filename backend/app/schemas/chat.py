@@ -1,7 +1,8 @@
-from datetime import datetime
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 
+from app.schemas.types import UTCDateTime
+
 # Chat message creation schema
 class ChatMessageCreate(BaseModel):
     content: str = Field(..., min_length=1)
@@ -14,7 +15,7 @@ class ChatMessageResponse(BaseModel):
     user_id: str
     content: str
     message_type: str
-    timestamp: datetime
+    timestamp: UTCDateTime
     model_used: Optional[str] = None
     reasoning: Optional[bool] = False
     metadata: Optional[Dict[str, Any]] = None
@@ -23,3 +24,4 @@ class ChatMessageResponse(BaseModel):
 class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessageResponse]
     session_id: str
+    next_cursor: Optional[str] = None  # Opaque cursor for the next page, if there is one
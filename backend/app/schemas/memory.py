@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
+from app.schemas.types import UTCDateTime
+
 class MemoryType:
     CORE = "core_memory"
     ENVIRONMENT = "environment_memory"
@@ -16,10 +18,40 @@ class MemoryUpdate(BaseModel):
     content: Optional[str] = Field(None, min_length=1)
     memo_type: Optional[str] = None
 
+# One line of a bulk NDJSON memory import
+class MemoryImportLine(BaseModel):
+    content: str = Field(..., min_length=1)
+    memo_type: str = Field(..., description="Type of memory: core_memory or environment_memory")
+    created_at: Optional[datetime] = None  # Kept when restoring an export
+
+# Bulk memory import summary schema
+class MemoryImportError(BaseModel):
+    line: int
+    error: str
+
+class MemoryImportResponse(BaseModel):
+    imported: int
+    failed: int
+    duplicates: int = 0  # Lines skipped as near-duplicates of a stored memory or an earlier line
+    errors: List[MemoryImportError]
+    errors_truncated: bool = False  # More lines failed than are listed in errors
+
 # Memory response schema
 class MemoryResponse(BaseModel):
     id: str
     user_id: str
     content: str
-    created_at: datetime
+    created_at: UTCDateTime
     memo_type: str
+
+# Created memory schema; duplicate_of is the id of a stored near-duplicate, if any
+class MemoryCreateResponse(MemoryResponse):
+    duplicate_of: Optional[str] = None
+
+# Memory list item schema; only the requested fields are present
+class MemoryListItem(BaseModel):
+    id: str
+    user_id: Optional[str] = None
+    content: Optional[str] = None
+    created_at: Optional[UTCDateTime] = None
+    memo_type: Optional[str] = None
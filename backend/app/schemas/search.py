@@ -0,0 +1,25 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.schemas.types import UTCDateTime
+
+class SearchScope:
+    ALL = "all"
+    MESSAGES = "messages"
+    MEMORIES = "memories"
+
+# Search result schema
+class SearchResult(BaseModel):
+    kind: str  # "message" or "memory"
+    id: str
+    score: float
+    snippet: str
+    session_id: Optional[str] = None  # Set for messages
+    message_type: Optional[str] = None  # Set for messages
+    memo_type: Optional[str] = None  # Set for memories
+    created_at: UTCDateTime
+
+# Search response schema
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
@@ -1,7 +1,8 @@
-from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
+from app.schemas.types import UTCDateTime
+
 # Session creation schema
 class SessionCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -15,6 +16,17 @@ class SessionResponse(BaseModel):
     id: str
     user_id: str
     name: str
-    created_at: datetime
-    updated_at: datetime
-    last_message_at: Optional[datetime] = None
+    created_at: UTCDateTime
+    updated_at: UTCDateTime
+    last_message_at: Optional[UTCDateTime] = None
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    total_tokens: int = 0
+
+# Progress of a session deletion still in progress
+class SessionDeletionResponse(BaseModel):
+    id: str
+    name: str
+    deleted_at: UTCDateTime
+    messages_deleted: int = 0
+    messages_remaining: int
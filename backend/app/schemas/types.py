@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Convert a datetime to timezone-aware UTC
+
+    Naive datetimes, as MongoDB returns them, are already in UTC.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+# Datetime of a response model; written to JSON in UTC with a "Z" suffix,
+# the same format `services.serialization.dumps` writes
+UTCDateTime = Annotated[datetime, AfterValidator(as_utc)]
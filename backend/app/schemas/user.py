@@ -1,7 +1,8 @@
-from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 
+from app.schemas.types import UTCDateTime
+
 # User creation schema
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -22,7 +23,7 @@ class UserResponse(BaseModel):
     username: str
     email: EmailStr
     full_name: str
-    created_at: datetime
+    created_at: UTCDateTime
     is_active: bool
 
 # User in DB schema
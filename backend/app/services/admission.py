@@ -0,0 +1,288 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Optional
+
+from app.core.config import settings
+from app.services.metrics import metrics_registry
+
+llm_queue_wait_seconds = metrics_registry.histogram(
+    "llm_queue_wait_seconds",
+    "Time chat requests waited for a concurrency slot",
+)
+admission_rejections_total = metrics_registry.counter(
+    "chat_admission_rejections_total",
+    "Chat requests turned away, by reason",
+    ("reason",),
+)
+
+class AdmissionRejected(Exception):
+    """
+    A request was not admitted
+
+    `reason` is one of "user_rate" (the user is over their rate, answered
+    with 429), "model_rate", "queue_full" or "queue_timeout" (the worker is
+    overloaded, answered with 503). `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+class TokenBucket:
+    """
+    Allows `rate_per_second` on average, with bursts of up to `burst`
+    """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take a token if one is available
+
+        Returns:
+            0 if a token was taken, otherwise the seconds until one will be
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate_per_second
+
+    def refund(self) -> None:
+        """
+        Give back a token taken for a request that was then turned away
+        """
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class TokenBuckets:
+    """
+    A token bucket per key, keeping the `max_keys` most recently used
+
+    A dropped bucket would have refilled to `burst` anyway unless its key
+    was active within the last `burst / rate` seconds, so evicting the
+    least recently used ones loses next to nothing.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int):
+        self.rate_per_second = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    def take(self, key: str) -> float:
+        if not self.enabled:
+            return 0.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate_per_second, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take()
+
+    def refund(self, key: str) -> None:
+        bucket = self._buckets.get(key)
+        # An evicted bucket starts full again anyway
+        if bucket is not None:
+            bucket.refund()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class ConcurrencyLimiter:
+    """
+    Caps concurrent work at `max_concurrent`, with a bounded FIFO wait queue
+
+    A request that finds every slot taken waits its turn, unless
+    `max_queue` requests are already waiting or it waits longer than
+    `queue_timeout_seconds`; either way it is rejected rather than left to
+    pile up. Released slots are handed directly to the longest waiter.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout_seconds: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """
+        Take a slot, waiting for one if needed
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("queue_full", self.queue_timeout_seconds)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            raise AdmissionRejected("queue_timeout", self.queue_timeout_seconds)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+    def _abandon(self, future: asyncio.Future) -> None:
+        if future.done() and not future.cancelled():
+            # The slot was handed over just as we gave up; pass it on
+            self.release()
+        else:
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot goes to the waiter, so `active` stays the same
+                future.set_result(None)
+                return
+        self.active -= 1
+
+class AdmissionController:
+    """
+    Admission control for chat requests that call the LLM
+
+    Per user, a token bucket limits how fast messages can be sent; it is
+    checked once the request is known to be valid, before any real work is
+    done for it. Per model, an optional token bucket keeps calls under the
+    provider's quota. Across the worker, a concurrency limiter caps
+    in-flight model calls so that a spike queues briefly or is shed with a
+    503, instead of slowing every request down. A shed request gets its
+    user and model tokens back, since the model was never called.
+    All limits apply per worker process.
+    """
+
+    def __init__(
+        self,
+        user_buckets: TokenBuckets,
+        model_buckets: TokenBuckets,
+        limiter: ConcurrencyLimiter,
+    ):
+        self.user_buckets = user_buckets
+        self.model_buckets = model_buckets
+        self.limiter = limiter
+        self.admitted = 0
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        admission_rejections_total.inc(reason=reason)
+        return AdmissionRejected(reason, retry_after)
+
+    def check_user(self, user_id: str) -> None:
+        """
+        Count a chat request against the user's rate
+
+        Raises:
+            AdmissionRejected: If the user is over their rate
+        """
+        wait = self.user_buckets.take(user_id)
+        if wait:
+            raise self._reject("user_rate", wait)
+
+    async def acquire(self, model_name: str, user_id: Optional[str] = None) -> Callable[[], None]:
+        """
+        Wait for a slot to call `model_name`
+
+        Args:
+            user_id: The user charged by `check_user` for this request, refunded if it is shed
+
+        Returns:
+            A function that releases the slot; calling it again does nothing
+
+        Raises:
+            AdmissionRejected: If the model is over its rate or the worker is overloaded
+        """
+        wait = self.model_buckets.take(model_name)
+        if wait:
+            self._refund_user(user_id)
+            raise self._reject("model_rate", wait)
+
+        start = time.perf_counter()
+        try:
+            await self.limiter.acquire()
+        except BaseException as e:
+            # Shed or cancelled while queued; the model was never called
+            self.model_buckets.refund(model_name)
+            self._refund_user(user_id)
+            if isinstance(e, AdmissionRejected):
+                raise self._reject(e.reason, e.retry_after)
+            raise
+        llm_queue_wait_seconds.observe(time.perf_counter() - start)
+        self.admitted += 1
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.limiter.release()
+
+        return release
+
+    def _refund_user(self, user_id: Optional[str]) -> None:
+        if user_id is not None:
+            self.user_buckets.refund(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.limiter.active,
+            "queue_depth": self.limiter.waiting,
+            "max_concurrency": self.limiter.max_concurrent,
+            "max_queue": self.limiter.max_queue,
+            "admitted": self.admitted,
+            "rejected": {
+                reason: int(admission_rejections_total.get(reason=reason))
+                for reason in ("user_rate", "model_rate", "queue_full", "queue_timeout")
+            },
+            "tracked_users": len(self.user_buckets),
+        }
+
+llm_admission = AdmissionController(
+    user_buckets=TokenBuckets(settings.CHAT_USER_RATE_PER_MINUTE, settings.CHAT_USER_BURST, settings.RATE_LIMIT_MAX_USERS),
+    model_buckets=TokenBuckets(settings.LLM_MODEL_RATE_PER_MINUTE, settings.LLM_MODEL_BURST, max_keys=64),
+    limiter=ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE, settings.LLM_QUEUE_TIMEOUT_SECONDS),
+)
+
+metrics_registry.gauge(
+    "llm_inflight_requests",
+    "Chat model calls holding a concurrency slot",
+    function=lambda: llm_admission.limiter.active,
+)
+metrics_registry.gauge(
+    "llm_queue_depth",
+    "Chat requests waiting for a concurrency slot",
+    function=lambda: llm_admission.limiter.waiting,
+)
@@ -0,0 +1,16 @@
+from app.core.config import settings
+from app.services.cache import TTLCache
+
+# Decoded JWT subject (user ID) by token string. Entries never outlive the
+# token's own expiry, so an expired token is always decoded and rejected.
+token_cache = TTLCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+# User documents by user ID. The TTL is the staleness window: a change made
+# by another worker, such as deactivating the user, takes effect within it.
+user_cache = TTLCache(
+    max_size=settings.USER_CACHE_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
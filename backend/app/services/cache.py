@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a TTL
+
+    Entries expire after `ttl_seconds` so that writes made by other workers
+    become visible within a bounded window; writes made by this worker
+    invalidate the entry immediately. All access happens on the event loop
+    thread, so no locking is needed.
+
+    A load that raced with an invalidation must not repopulate the cache
+    with stale data, so callers take a `version()` before reading from the
+    database and pass it back to `set()`.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def version(self) -> int:
+        return self._version
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        version: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to store
+            version: `version()` taken before the value was loaded; the value
+                is discarded if anything was invalidated since
+            ttl_seconds: Lifetime of this entry, capped at the cache's TTL
+        """
+        if self.max_size <= 0:
+            return
+        if version is not None and version != self._version:
+            # An invalidation happened while the caller was loading
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._version += 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._version += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,379 @@
+import asyncio
+import hashlib
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.text import STOPWORDS
+from app.repositories.memory import MemoryRepository, memory_repository
+from app.services.prompt import estimate_tokens, format_memory
+
+# Largest prime below 2**32; with 32-bit inputs and coefficients the
+# universal hash a * x + b never overflows uint64
+HASH_PRIME = 4294967291
+# Backfill writes issued concurrently by the consolidation job
+BACKFILL_BATCH_SIZE = 100
+
+# Words are matched with their contraction, so "don't" is one token
+DEDUP_TOKEN_PATTERN = re.compile(r"\w+(?:['\u2019]\w+)*")
+# Words that reverse a statement. Search can ignore them, but "User eats
+# meat" and "User does not eat meat" must never be taken for duplicates
+NEGATIONS = frozenset("""
+no nor not never neither none nobody nothing nowhere without cannot against
+""".split())
+DEDUP_STOPWORDS = STOPWORDS - NEGATIONS
+
+def dedup_tokens(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens for deduplication
+
+    Unlike `text.tokenize`, negations are kept, and contractions
+    such as "isn't" or "can't" become "not".
+    """
+    tokens = []
+    for token in DEDUP_TOKEN_PATTERN.findall(text.lower()):
+        token = token.replace("\u2019", "'")
+        if token.endswith("n't"):
+            token = "not"
+        elif "'" in token:
+            # Possessives and other clitics: "user's" is "user"
+            token = token.split("'", 1)[0]
+        if token not in DEDUP_STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+def is_negated(text: str) -> bool:
+    """
+    Whether a text states the opposite of its words, by an odd number of negations
+    """
+    return sum(token in NEGATIONS for token in dedup_tokens(text)) % 2 == 1
+
+def shingles(text: str) -> Set[str]:
+    """
+    Get the word unigrams and bigrams of a text, ignoring stopwords but not negations
+    """
+    tokens = dedup_tokens(text)
+    return set(tokens) | {f"{first} {second}" for first, second in zip(tokens, tokens[1:])}
+
+class MinHasher:
+    """
+    MinHash signatures with LSH banding for near-duplicate detection
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the texts' shingle sets. Signatures are split into
+    `bands` bands; texts sharing any band key are candidate duplicates,
+    which finds pairs above roughly (1 / bands) ** (1 / rows) similarity
+    without comparing every pair.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, HASH_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, HASH_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Get the uint32 signature of a text, or None if it has no shingles
+        """
+        features = shingles(text)
+        if not features:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in features),
+            dtype=np.uint64,
+            count=len(features),
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % HASH_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        """
+        Get one key per band; equal keys mean equal bands
+        """
+        return [
+            f"{band}:{hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """
+        Estimate the Jaccard similarity of two signed texts
+        """
+        return float(np.mean(first == second))
+
+def decode_signature(data: bytes) -> np.ndarray:
+    """
+    Unpack a signature stored by `dedup_fields`
+    """
+    return np.frombuffer(data, dtype=np.uint32)
+
+minhasher = MinHasher(num_perm=settings.DEDUP_NUM_PERM, bands=settings.DEDUP_BANDS)
+
+def dedup_fields(content: str) -> dict:
+    """
+    Compute the deduplication fields stored on a memory document for its content
+    """
+    signature = minhasher.signature(content)
+    if signature is None:
+        return {"minhash": None, "lsh_bands": []}
+    return {"minhash": signature.tobytes(), "lsh_bands": minhasher.band_keys(signature)}
+
+def memory_signature(memory: dict) -> Optional[np.ndarray]:
+    """
+    Get a memory's stored signature, computing it if the document predates deduplication
+    """
+    stored = memory.get("minhash")
+    if stored is not None and len(stored) == minhasher.num_perm * 4:
+        return decode_signature(stored)
+    return minhasher.signature(memory.get("content", ""))
+
+def memory_prompt_tokens(memories: Iterable[dict]) -> int:
+    """
+    Estimate the prompt tokens taken by memory lines
+    """
+    # One extra token per line for the newline separator
+    return sum(estimate_tokens(format_memory(memory)) + 1 for memory in memories)
+
+def survivor_key(memory: dict) -> tuple:
+    """
+    Rank a memory for `pick_survivor`; the highest ranked memory is kept
+    """
+    created_at = memory.get("created_at")
+    # Compare the flag first so None is never compared with a datetime
+    return len(memory.get("content", "")), created_at is not None, created_at or datetime.min
+
+def pick_survivor(group: List[dict]) -> dict:
+    """
+    Choose the memory kept from a group of near-duplicates
+
+    The longest wording usually carries the most detail; ties go to the
+    most recently recorded memory, and memories without a creation time
+    lose to those with one.
+    """
+    return max(group, key=survivor_key)
+
+async def find_near_duplicate(
+    user_id: str,
+    memo_type: str,
+    content: str,
+    fields: Optional[dict] = None,
+    repository: MemoryRepository = memory_repository,
+) -> Optional[dict]:
+    """
+    Find a stored memory of the same user and type that nearly duplicates `content`
+
+    Only memories sharing an LSH band with the content are fetched, through
+    the (user_id, memo_type, lsh_bands) index, and their signatures are
+    compared to confirm the match. A memory that negates the content is
+    never a duplicate of it, however many words they share.
+
+    Returns:
+        The most similar memory at or above DEDUP_THRESHOLD, or None
+    """
+    fields = fields if fields is not None else dedup_fields(content)
+    if not fields["lsh_bands"]:
+        return None
+    signature = decode_signature(fields["minhash"])
+    negated = is_negated(content)
+
+    best, best_similarity = None, settings.DEDUP_THRESHOLD
+    for candidate in await repository.find_by_lsh_bands(user_id, memo_type, fields["lsh_bands"]):
+        candidate_signature = memory_signature(candidate)
+        if candidate_signature is None or is_negated(candidate.get("content", "")) != negated:
+            continue
+        similarity = MinHasher.similarity(signature, candidate_signature)
+        if similarity >= best_similarity:
+            best, best_similarity = candidate, similarity
+    return best
+
+class BatchDuplicateFilter:
+    """
+    Near-duplicate check among memories written together, before any is stored
+
+    Signatures of the memories accepted so far are bucketed by memory type,
+    polarity and LSH band key, so each new memory is only compared with
+    the ones it shares a bucket with.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._buckets: Dict[tuple, List[np.ndarray]] = {}
+
+    def add(self, content: str, memo_type: str, fields: dict) -> bool:
+        """
+        Accept a memory unless it nearly duplicates one accepted before
+
+        Args:
+            fields: The memory's fields from `dedup_fields`
+
+        Returns:
+            False if the memory is a near-duplicate; it is then not added
+        """
+        if not fields["lsh_bands"]:
+            return True
+        signature = decode_signature(fields["minhash"])
+        keys = [(memo_type, is_negated(content), key) for key in fields["lsh_bands"]]
+        for key in keys:
+            for other in self._buckets.get(key, ()):
+                if MinHasher.similarity(signature, other) >= self.threshold:
+                    return False
+        for key in keys:
+            self._buckets.setdefault(key, []).append(signature)
+        return True
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first: int, second: int) -> None:
+        self.parent[self.find(first)] = self.find(second)
+
+def find_duplicate_groups(memories: List[dict], threshold: float) -> List[List[dict]]:
+    """
+    Group near-duplicate memories of the same type around the memory each group keeps
+
+    Memories are bucketed by LSH band key. Each bucket member is compared
+    with the bucket's first member only and matches are joined transitively,
+    so the work is linear in the number of memories times bands rather
+    than quadratic, even for large buckets of repeats. A memory is only
+    bucketed with others of the same polarity, so a statement and its
+    negation are never grouped.
+
+    Joining transitively chains rewordings: A may match B and B match C
+    while A and C have little in common. Each candidate group is therefore
+    split around its `pick_survivor`, keeping only members at or above
+    `threshold` similarity to it; the rest are grouped again among
+    themselves.
+
+    Returns:
+        Groups of two or more memories, each a near-duplicate of the group's `pick_survivor`
+    """
+    signatures = [memory_signature(memory) for memory in memories]
+    negated = [is_negated(memory.get("content", "")) for memory in memories]
+    buckets: Dict[tuple, int] = {}
+    candidates = _DisjointSet(len(memories))
+
+    for position, (memory, signature) in enumerate(zip(memories, signatures)):
+        if signature is None:
+            continue
+        for key in minhasher.band_keys(signature):
+            anchor = buckets.setdefault((memory.get("memo_type"), negated[position], key), position)
+            if anchor != position and MinHasher.similarity(signatures[anchor], signature) >= threshold:
+                candidates.union(position, anchor)
+
+    members: Dict[int, List[int]] = {}
+    for position in range(len(memories)):
+        members.setdefault(candidates.find(position), []).append(position)
+
+    groups = []
+    for positions in members.values():
+        while len(positions) > 1:
+            survivor = max(positions, key=lambda position: survivor_key(memories[position]))
+            group, rest = [survivor], []
+            for position in positions:
+                if position == survivor:
+                    continue
+                if MinHasher.similarity(signatures[survivor], signatures[position]) >= threshold:
+                    group.append(position)
+                else:
+                    rest.append(position)
+            if len(group) > 1:
+                groups.append([memories[position] for position in group])
+            positions = rest
+    return groups
+
+class ConsolidationPlan(NamedTuple):
+    backfill: List[dict]
+    groups: List[List[dict]]
+    removed: List[dict]
+    tokens_before: int
+    tokens_saved: int
+
+def plan_consolidation(memories: List[dict], threshold: float) -> ConsolidationPlan:
+    """
+    Work out what consolidating a user's memories would change, without touching the database
+
+    Memories with no signature, or one from a different DEDUP_NUM_PERM,
+    are signed and get their new fields set in place, so the grouping
+    and the backfill written afterwards agree. CPU-bound; run it off the
+    event loop.
+    """
+    backfill = []
+    for memory in memories:
+        stored = memory.get("minhash")
+        if not memory.get("content") or (stored is not None and len(stored) == minhasher.num_perm * 4):
+            continue
+        fields = dedup_fields(memory["content"])
+        if fields["minhash"] is not None:
+            memory.update(fields)
+            backfill.append(memory)
+
+    groups = find_duplicate_groups(memories, threshold)
+    removed = []
+    for group in groups:
+        survivor = pick_survivor(group)
+        removed.extend(memory for memory in group if memory is not survivor)
+
+    return ConsolidationPlan(
+        backfill, groups, removed, memory_prompt_tokens(memories), memory_prompt_tokens(removed)
+    )
+
+async def consolidate_user_memories(
+    user_id: str, dry_run: bool = False, repository: MemoryRepository = memory_repository
+) -> dict:
+    """
+    Reduce every group of near-duplicate memories a user has to one memory
+
+    Each group keeps the memory chosen by `pick_survivor` and the rest are
+    permanently deleted. Memories stored before deduplication existed get
+    their signatures backfilled so the on-write check can find them later.
+    Signing and grouping run in the default executor, so a user with tens
+    of thousands of memories does not stall the event loop. A dry run
+    computes the same signatures and groups but writes nothing, so its
+    report matches what a real run would do on the same memories.
+
+    Returns:
+        A report of the groups found and the prompt tokens saved
+    """
+    memories = await repository.list_for_dedup(user_id)
+    plan = await asyncio.get_running_loop().run_in_executor(
+        None, plan_consolidation, memories, settings.DEDUP_THRESHOLD
+    )
+
+    if not dry_run:
+        for start in range(0, len(plan.backfill), BACKFILL_BATCH_SIZE):
+            await asyncio.gather(*(
+                repository.update_for_user(
+                    str(memory["_id"]), user_id, {"minhash": memory["minhash"], "lsh_bands": memory["lsh_bands"]}
+                )
+                for memory in plan.backfill[start:start + BACKFILL_BATCH_SIZE]
+            ))
+        if plan.removed:
+            await repository.delete_many_for_user(user_id, [memory["_id"] for memory in plan.removed])
+
+    return {
+        "dry_run": dry_run,
+        "memories_scanned": len(memories),
+        "signatures_backfilled": 0 if dry_run else len(plan.backfill),
+        "duplicate_groups": len(plan.groups),
+        "memories_removed": len(plan.removed),
+        "prompt_tokens_before": plan.tokens_before,
+        "prompt_tokens_after": plan.tokens_before - plan.tokens_saved,
+        "prompt_tokens_saved": plan.tokens_saved,
+    }
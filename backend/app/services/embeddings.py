@@ -0,0 +1,116 @@
+import math
+import zlib
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.text import tokenize
+
+class Embedder:
+    """
+    Base class for embedding backends
+
+    Implementations return one L2-normalized float32 row per input text, so
+    cosine similarity between two embeddings is a plain dot product.
+    """
+
+    name: str = "base"
+    dimension: int = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+class HashingEmbedder(Embedder):
+    """
+    Local embedder using signed feature hashing of unigrams and bigrams
+
+    Needs no model download or network access. Term frequencies are
+    log-scaled so that repeated words don't dominate short memories.
+    """
+
+    def __init__(self, dimension: int = 512):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> Dict[str, int]:
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for first, second in zip(tokens, tokens[1:]):
+            bigram = f"{first} {second}"
+            counts[bigram] = counts.get(bigram, 0) + 1
+        return counts
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dimension] += sign * (1.0 + math.log(count))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+EMBEDDER_FACTORIES: Dict[str, Callable[[], Embedder]] = {
+    "hashing": lambda: HashingEmbedder(settings.EMBEDDING_DIMENSION),
+}
+
+_embedder: Optional[Embedder] = None
+
+def register_embedder(name: str, factory: Callable[[], Embedder]) -> None:
+    """
+    Register an embedding backend selectable through EMBEDDING_BACKEND
+    """
+    EMBEDDER_FACTORIES[name] = factory
+
+def get_embedder() -> Embedder:
+    """
+    Get the process-wide embedder configured by EMBEDDING_BACKEND
+    """
+    global _embedder
+    if _embedder is None:
+        try:
+            factory = EMBEDDER_FACTORIES[settings.EMBEDDING_BACKEND]
+        except KeyError:
+            raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
+        _embedder = factory()
+    return _embedder
+
+def encode_embedding(vector: np.ndarray) -> bytes:
+    """
+    Pack an embedding into compact float32 bytes for storage on a document
+    """
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """
+    Unpack an embedding stored with `encode_embedding`
+    """
+    return np.frombuffer(data, dtype=np.float32)
+
+def embedding_fields(content: str) -> dict:
+    """
+    Compute the embedding fields stored on a memory document for its content
+    """
+    embedder = get_embedder()
+    return {
+        "embedding": encode_embedding(embedder.embed_one(content)),
+        "embedding_model": embedder.name,
+    }
+
+def embedding_fields_many(contents: List[str]) -> List[dict]:
+    """
+    Compute the embedding fields for many memories with one batched embed call
+    """
+    embedder = get_embedder()
+    return [
+        {"embedding": encode_embedding(vector), "embedding_model": embedder.name}
+        for vector in embedder.embed(contents)
+    ]
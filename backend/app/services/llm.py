@@ -0,0 +1,90 @@
+import logging
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Generation parameters used for chat responses
+DEFAULT_GENERATION_PARAMS = {
+    "temperature": 0.7,
+    "max_output_tokens": 2048,
+    "top_k": 40,
+    "top_p": 0.95,
+}
+
+def create_gemini_client(model_name: str, **params: Any) -> ChatGoogleGenerativeAI:
+    """
+    Construct a Gemini chat model client
+    """
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        google_api_key=settings.GEMINI_API_KEY or settings.GOOGLE_API_KEY,
+        **params,
+    )
+
+class LLMRegistry:
+    """
+    Process-wide registry of chat model clients
+
+    Constructing a client resolves credentials and builds a new HTTP
+    session, which costs tens of milliseconds and throws away pooled
+    connections to the provider. Clients are instead created once per
+    (model name, generation parameters) and shared by every request.
+    """
+
+    def __init__(self, factory: Callable[..., Any] = create_gemini_client):
+        self.factory = factory
+        self._clients: Dict[Tuple, Any] = {}
+
+    @staticmethod
+    def _key(model_name: str, params: Dict[str, Any]) -> Tuple:
+        return (model_name, tuple(sorted(params.items())))
+
+    def get(self, model_name: str, **params: Any) -> Any:
+        """
+        Get the shared client for a model, creating it on first use
+
+        Args:
+            model_name: Provider model name
+            **params: Generation parameters; defaults to DEFAULT_GENERATION_PARAMS
+
+        Returns:
+            Chat model client
+        """
+        params = params or DEFAULT_GENERATION_PARAMS
+        key = self._key(model_name, params)
+        client = self._clients.get(key)
+        if client is None:
+            client = self.factory(model_name, **params)
+            self._clients[key] = client
+        return client
+
+    def warm(self, model_names: Iterable[str]) -> None:
+        """
+        Create clients ahead of the first request
+
+        Failures are logged rather than raised so that a missing API key
+        doesn't stop the app from starting; the error resurfaces on use.
+        """
+        for model_name in set(model_names):
+            try:
+                self.get(model_name)
+            except Exception as e:
+                logger.warning(f"Failed to initialize LLM client for {model_name}: {e}")
+
+    def clear(self) -> None:
+        self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+llm_registry = LLMRegistry()
+
+def get_llm(model_name: str) -> Any:
+    """
+    Get the shared chat model client for a model name
+    """
+    return llm_registry.get(model_name)
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from app.core.config import settings
+from app.repositories.memory import memory_repository
+from app.services.cache import TTLCache
+from app.services.embeddings import get_embedder
+from app.services.memory_index import UserMemoryIndex
+
+class MemoryContextCache(TTLCache):
+    """
+    Cache of each user's memory context, keyed by user ID
+
+    The cached context is the user's `UserMemoryIndex`: their memories plus
+    the embedding matrix used to pick the ones relevant to a chat message.
+    The memory endpoints invalidate a user's entry whenever they write.
+    """
+
+    def get(self, user_id: str) -> Optional[UserMemoryIndex]:
+        return super().get(user_id)
+
+memory_context_cache = MemoryContextCache(
+    max_size=settings.MEMORY_CACHE_SIZE,
+    ttl_seconds=settings.MEMORY_CACHE_TTL_SECONDS,
+)
+
+async def get_memory_index(user_id: str) -> UserMemoryIndex:
+    """
+    Get the vector index over a user's memories
+
+    Served from the per-user memory context cache when possible; on a miss
+    all of the user's memories are loaded in a single query and indexed.
+    """
+    index = memory_context_cache.get(user_id)
+    if index is not None:
+        return index
+
+    version = memory_context_cache.version()
+    memories = await memory_repository.list_for_user(user_id, include_embeddings=True)
+    index = UserMemoryIndex.build(memories, get_embedder())
+    memory_context_cache.set(user_id, index, version)
+
+    return index
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.core.config import settings
+from app.models.memory import MemoryModel
+from app.repositories.memory import MemoryRepository, memory_repository
+from app.schemas.memory import MemoryType
+from app.services.embeddings import embedding_fields
+from app.services.dedup import BatchDuplicateFilter, dedup_fields, find_near_duplicate
+from app.services.llm import llm_registry
+from app.services.memory_cache import memory_context_cache
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_PROMPT = """You maintain long-term memories about a user from their conversations with an assistant.
+From the conversation turns below, extract facts worth remembering about the user:
+- core_memory: lasting facts such as identity, preferences, relationships and goals
+- environment_memory: time-bound events, plans and circumstances
+Only include information the user stated. Skip small talk and anything trivial.
+Respond with only a JSON array of objects with "content" and "memo_type" keys, or [] if there is nothing to remember."""
+
+# Cap on memories accepted from a single extraction call
+MAX_MEMORIES_PER_CALL = 10
+
+class ChatTurnRecord(NamedTuple):
+    user_id: str
+    user_message: str
+    bot_message: str
+
+def default_extraction_llm() -> Any:
+    return llm_registry.get(settings.EXTRACTION_LLM_MODEL, temperature=0.0, max_output_tokens=1024)
+
+def parse_extracted_memories(text: str) -> List[dict]:
+    """
+    Parse the extraction model's reply into memory fields
+
+    Tolerates prose or code fences around the JSON array and drops any
+    entry without content or with an unknown memory type.
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        return []
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return []
+
+    memories = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        content = item.get("content")
+        memo_type = item.get("memo_type")
+        if isinstance(content, str) and content.strip() and memo_type in (MemoryType.CORE, MemoryType.ENVIRONMENT):
+            memories.append({"content": content.strip(), "memo_type": memo_type})
+    return memories[:MAX_MEMORIES_PER_CALL]
+
+class MemoryExtractor:
+    """
+    Background worker that turns chat turns into long-term memories
+
+    `enqueue` is a non-blocking put onto a bounded queue, so chat requests
+    never wait on extraction; when the queue is full the turn is dropped.
+    The worker buffers turns per user and makes one extraction LLM call
+    once a user has `turns_per_call` turns pending, or when their oldest
+    pending turn is `max_delay_seconds` old. At most `concurrency` calls
+    run at once. Extracted memories that nearly duplicate a stored one, or
+    one extracted earlier in the same call, are skipped and the rest are
+    written with a single `insert_many` per call.
+    """
+
+    def __init__(
+        self,
+        turns_per_call: int,
+        max_delay_seconds: float,
+        queue_size: int,
+        concurrency: int,
+        llm_factory: Callable[[], Any] = default_extraction_llm,
+        repository: MemoryRepository = memory_repository,
+    ):
+        self.turns_per_call = turns_per_call
+        self.max_delay_seconds = max_delay_seconds
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.llm_factory = llm_factory
+        self.repository = repository
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._pending: Dict[str, List[ChatTurnRecord]] = {}
+        self._pending_since: Dict[str, float] = {}
+        self.turns_enqueued = 0
+        self.turns_dropped = 0
+        self.llm_calls = 0
+        self.llm_failures = 0
+        self.memories_written = 0
+        self.duplicates_skipped = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the worker, extracting from whatever turns are still pending
+        """
+        if self._task is None:
+            return
+        # wait_for can swallow a cancel that races with a queue item, so the
+        # loop also checks this flag
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        self._drain_queue()
+        for user_id in list(self._pending):
+            self._flush(user_id)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def enqueue(self, user_id: str, user_message: str, bot_message: str) -> bool:
+        """
+        Queue a completed chat turn for extraction without waiting
+
+        Returns:
+            False if the worker isn't running or its queue is full
+        """
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(ChatTurnRecord(user_id, user_message, bot_message))
+        except asyncio.QueueFull:
+            self.turns_dropped += 1
+            return False
+        self.turns_enqueued += 1
+        return True
+
+    def _buffer(self, turn: ChatTurnRecord) -> None:
+        if turn.user_id not in self._pending:
+            self._pending[turn.user_id] = []
+            self._pending_since[turn.user_id] = time.monotonic()
+        self._pending[turn.user_id].append(turn)
+
+    def _drain_queue(self) -> None:
+        while self._queue is not None and not self._queue.empty():
+            self._buffer(self._queue.get_nowait())
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                turn = await asyncio.wait_for(self._queue.get(), timeout=self._next_deadline())
+                self._buffer(turn)
+                self._drain_queue()
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.monotonic()
+            for user_id in list(self._pending):
+                full = len(self._pending[user_id]) >= self.turns_per_call
+                stale = now - self._pending_since[user_id] >= self.max_delay_seconds
+                if full or stale:
+                    self._flush(user_id)
+
+    def _next_deadline(self) -> Optional[float]:
+        """
+        Seconds until the oldest pending buffer must be flushed, or None
+        """
+        if not self._pending_since:
+            return None
+        oldest = min(self._pending_since.values())
+        return max(oldest + self.max_delay_seconds - time.monotonic(), 0)
+
+    def _flush(self, user_id: str) -> None:
+        turns = self._pending.pop(user_id, [])
+        self._pending_since.pop(user_id, None)
+        if turns:
+            task = asyncio.create_task(self._extract_bounded(user_id, turns))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _extract_bounded(self, user_id: str, turns: List[ChatTurnRecord]) -> None:
+        async with self._semaphore:
+            try:
+                await self.extract(user_id, turns)
+            except Exception as e:
+                logger.warning(f"Memory extraction failed for user {user_id}: {e}")
+
+    async def extract(self, user_id: str, turns: List[ChatTurnRecord]) -> List[dict]:
+        """
+        Extract memories from a user's chat turns and store them
+
+        Returns:
+            The inserted memory documents
+        """
+        conversation = "\n\n".join(
+            f"User: {turn.user_message}\nAssistant: {turn.bot_message}" for turn in turns
+        )
+
+        self.llm_calls += 1
+        try:
+            response = await self.llm_factory().ainvoke([
+                SystemMessage(content=EXTRACTION_PROMPT),
+                HumanMessage(content=conversation),
+            ])
+        except Exception:
+            self.llm_failures += 1
+            raise
+
+        extracted = parse_extracted_memories(response.content)
+        if not extracted:
+            return []
+
+        documents = []
+        seen = BatchDuplicateFilter(settings.DEDUP_THRESHOLD)
+        for memory in extracted:
+            fields = dedup_fields(memory["content"])
+            # Users repeat themselves, so skip facts that are already stored
+            # or were just extracted from another of the turns
+            if settings.DEDUP_ON_WRITE and (
+                await find_near_duplicate(user_id, memory["memo_type"], memory["content"], fields, self.repository)
+                or not seen.add(memory["content"], memory["memo_type"], fields)
+            ):
+                self.duplicates_skipped += 1
+                continue
+            documents.append(MemoryModel(
+                user_id=user_id,
+                content=memory["content"],
+                memo_type=memory["memo_type"],
+                **embedding_fields(memory["content"]),
+                **fields,
+            ).model_dump(by_alias=True))
+        if not documents:
+            return []
+
+        await self.repository.insert_many(documents)
+        memory_context_cache.invalidate(user_id)
+        self.memories_written += len(documents)
+
+        return documents
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "pending_users": len(self._pending),
+            "pending_turns": sum(len(turns) for turns in self._pending.values()),
+            "inflight_calls": len(self._inflight),
+            "turns_enqueued": self.turns_enqueued,
+            "turns_dropped": self.turns_dropped,
+            "llm_calls": self.llm_calls,
+            "llm_failures": self.llm_failures,
+            "memories_written": self.memories_written,
+            "duplicates_skipped": self.duplicates_skipped,
+        }
+
+memory_extractor = MemoryExtractor(
+    turns_per_call=settings.EXTRACTION_TURNS_PER_CALL,
+    max_delay_seconds=settings.EXTRACTION_MAX_DELAY_SECONDS,
+    queue_size=settings.EXTRACTION_QUEUE_SIZE,
+    concurrency=settings.EXTRACTION_CONCURRENCY,
+)
@@ -0,0 +1,80 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.embeddings import Embedder, decode_embedding
+
+class UserMemoryIndex:
+    """
+    Vector index over one user's memories
+
+    Rows of `matrix` are the L2-normalized embeddings of `memories`, kept in
+    the same order (newest first), so a single matrix-vector product scores
+    every memory against a query by cosine similarity.
+    """
+
+    def __init__(self, memories: List[dict], matrix: np.ndarray):
+        self.memories = memories
+        self.matrix = matrix
+        self.memo_types = np.array([memory.get("memo_type") for memory in memories], dtype=object)
+        # Keyword index for search, built on first use by the local search backend
+        self.text_index = None
+
+    @classmethod
+    def build(cls, memories: List[dict], embedder: Embedder) -> "UserMemoryIndex":
+        """
+        Build an index, reusing embeddings stored on the documents when they
+        were produced by the same embedder and embedding the rest in one batch
+        """
+        matrix = np.zeros((len(memories), embedder.dimension), dtype=np.float32)
+        missing = []
+        for row, memory in enumerate(memories):
+            # The raw bytes are no longer needed once copied into the matrix
+            stored = memory.pop("embedding", None)
+            if stored is not None and memory.get("embedding_model") == embedder.name:
+                matrix[row] = decode_embedding(stored)
+            else:
+                missing.append(row)
+
+        if missing:
+            matrix[missing] = embedder.embed([memories[row].get("content", "") for row in missing])
+
+        return cls(memories, matrix)
+
+    def __len__(self) -> int:
+        return len(self.memories)
+
+    def by_type(self, memo_type: str) -> List[dict]:
+        """
+        Get all memories of a type, newest first
+        """
+        return [memory for memory in self.memories if memory.get("memo_type") == memo_type]
+
+    def search(
+        self, query_vector: np.ndarray, k: int, memo_type: Optional[str] = None
+    ) -> List[Tuple[dict, float]]:
+        """
+        Get the top-k memories most similar to a query, best match first
+
+        Args:
+            query_vector: L2-normalized query embedding
+            k: Number of memories to return
+            memo_type: Only consider memories of this type
+
+        Returns:
+            (memory, cosine similarity) pairs
+        """
+        candidates = np.arange(len(self.memories))
+        if memo_type is not None:
+            candidates = np.flatnonzero(self.memo_types == memo_type)
+        if k <= 0 or len(candidates) == 0:
+            return []
+
+        scores = self.matrix[candidates] @ query_vector
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(self.memories[candidates[i]], float(scores[i])) for i in top]
@@ -0,0 +1,266 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.database import database
+from app.services.prompt import estimate_tokens
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds of the prompt token histogram buckets
+TOKEN_BUCKETS = (64, 128, 256, 512, 1000, 2000, 4000, 8000, 16000)
+# Upper bounds of the memories-per-prompt histogram buckets
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    """
+    Monotonically increasing total per label set
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+class Gauge(Metric):
+    """
+    Current value per label set, either set by its owner or read from
+    `function` when the metrics are rendered
+    """
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+    def samples(self):
+        if self.function is not None:
+            yield self.name, [], self.function()
+            return
+        for key, value in sorted(self.values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed buckets per label set
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: observations per bucket (the last is +Inf), sum
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts, total = self.values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self.values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        for key, (counts, total) in sorted(self.values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*map(_format_value, self.buckets), "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + [("le", bound)], cumulative
+            yield f"{self.name}_sum", labels, total[0]
+            yield f"{self.name}_count", labels, cumulative
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format
+
+    Metrics are only updated from the event loop thread, so no locking is
+    needed. Each worker process keeps its own values; Prometheus sums them
+    across the scraped targets.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+metrics_registry = MetricsRegistry()
+
+http_request_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the response headers",
+    ("method", "route", "status"),
+)
+chat_stage_seconds = metrics_registry.histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in each stage of a chat turn",
+    ("endpoint", "stage"),
+)
+chat_prompt_tokens = metrics_registry.histogram(
+    "chat_prompt_tokens",
+    "Estimated LLM input tokens of each chat turn's prompt",
+    ("endpoint",),
+    TOKEN_BUCKETS,
+)
+chat_prompt_memories = metrics_registry.histogram(
+    "chat_prompt_memories",
+    "Memories put in (used) or left out of (dropped) each chat turn's prompt",
+    ("endpoint", "outcome"),
+    COUNT_BUCKETS,
+)
+llm_requests_total = metrics_registry.counter(
+    "llm_requests_total",
+    "Chat model calls by outcome",
+    ("model", "outcome"),
+)
+llm_tokens_total = metrics_registry.counter(
+    "llm_tokens_total",
+    "Chat model tokens in (input) and out (output), as reported by the model or else estimated",
+    ("model", "direction"),
+)
+metrics_registry.gauge(
+    "mongo_pool_open_connections",
+    "Connections open in the MongoDB pools of this worker",
+    function=lambda: database.pool_monitor.total("open"),
+)
+metrics_registry.gauge(
+    "mongo_pool_checked_out_connections",
+    "MongoDB connections in use by an operation",
+    function=lambda: database.pool_monitor.total("checked_out"),
+)
+metrics_registry.gauge(
+    "mongo_pool_wait_queue",
+    "Operations waiting to check out a MongoDB connection",
+    function=lambda: database.pool_monitor.total("waiting"),
+)
+
+class StageTimer:
+    """
+    Times the stages of one chat turn
+
+    Each stage is observed in `chat_stage_duration_seconds` as soon as it
+    ends, failed or not, and kept for the bot message's metadata.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        chat_stage_seconds.observe(seconds, endpoint=self.endpoint, stage=name)
+
+    def milliseconds(self) -> Dict[str, float]:
+        return {name: round(seconds * 1e3, 3) for name, seconds in self.stages.items()}
+
+def record_prompt(endpoint: str, prompt_metadata: dict) -> None:
+    """
+    Record the size and memory count of an assembled prompt
+    """
+    chat_prompt_tokens.observe(prompt_metadata["estimated_tokens"], endpoint=endpoint)
+    used = prompt_metadata["core_memories_used"] + prompt_metadata["environment_memories_used"]
+    dropped = prompt_metadata["core_memories_dropped"] + prompt_metadata["environment_memories_dropped"]
+    chat_prompt_memories.observe(used, endpoint=endpoint, outcome="used")
+    chat_prompt_memories.observe(dropped, endpoint=endpoint, outcome="dropped")
+
+def record_llm_usage(
+    model: str, usage: Optional[dict], prompt_tokens: int, output_text: str, failed: bool = False
+) -> None:
+    """
+    Count a chat model call and its tokens
+
+    Uses the token counts the model reported in `usage` (LangChain's
+    usage_metadata) and falls back to estimates from the prompt size and
+    the reply when it reported none.
+    """
+    llm_requests_total.inc(model=model, outcome="error" if failed else "ok")
+    if usage:
+        input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        input_tokens, output_tokens = prompt_tokens, estimate_tokens(output_text) if output_text else 0
+    llm_tokens_total.inc(input_tokens, model=model, direction="input")
+    llm_tokens_total.inc(output_tokens, model=model, direction="output")
@@ -0,0 +1,99 @@
+import datetime
+import json
+import zlib
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from bson import ObjectId
+
+from app.services.serialization import format_datetime
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_MEDIA_TYPE = "application/gzip"
+# Lines are grouped into response chunks of about this size
+STREAM_CHUNK_BYTES = 65536
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return format_datetime(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_line(record: dict) -> bytes:
+    """
+    Serialize a record as one newline-terminated JSON line
+
+    Datetimes are written in ISO 8601 in UTC, as in JSON responses, and
+    ObjectIds as strings.
+    """
+    return (json.dumps(record, default=_default, separators=(",", ":")) + "\n").encode("utf-8")
+
+async def chunked(lines: AsyncIterator[bytes], chunk_bytes: int = STREAM_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """
+    Group small lines into larger chunks so a streamed response isn't sent
+    as one tiny write per line
+    """
+    buffer = bytearray()
+    async for line in lines:
+        buffer.extend(line)
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+async def gzipped(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """
+    Gzip a byte stream incrementally, yielding compressed output as it is produced
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a stream of byte chunks into lines without buffering the whole stream
+
+    Blank lines are skipped but still counted. A line longer than
+    `max_line_bytes` is discarded as it arrives and yielded as None, so one
+    bad line can't exhaust memory.
+
+    Yields:
+        (1-based line number, line bytes or None if the line was too long)
+    """
+    buffer = bytearray()
+    line_number = 0
+    overflowed = False
+
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        while True:
+            newline = buffer.find(b"\n")
+            if newline == -1:
+                break
+            line = bytes(buffer[:newline])
+            del buffer[:newline + 1]
+            line_number += 1
+            if overflowed:
+                overflowed = False
+                yield line_number, None
+            elif len(line) > max_line_bytes:
+                yield line_number, None
+            elif line.strip():
+                yield line_number, line
+
+        if len(buffer) > max_line_bytes:
+            # Drop the rest of this line as it arrives
+            overflowed = True
+            buffer.clear()
+
+    if overflowed or buffer.strip():
+        line_number += 1
+        yield line_number, None if overflowed or len(buffer) > max_line_bytes else bytes(buffer)
@@ -0,0 +1,299 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# Frame label for samples taken while the request was waiting, e.g. on the database
+AWAITING_FRAME = "[awaiting]"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+Frame = Tuple[str, str, int]  # function, file, first line
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno
+
+def _coroutine_frame(awaitable):
+    for attribute in ("cr_frame", "ag_frame", "gi_frame"):
+        frame = getattr(awaitable, attribute, None)
+        if frame is not None:
+            return frame
+    return None
+
+def _awaited(awaitable):
+    for attribute in ("cr_await", "ag_await", "gi_yieldfrom"):
+        inner = getattr(awaitable, attribute, None)
+        if inner is not None:
+            return inner
+    return None
+
+class ProfileSession:
+    """
+    Stack samples of one request, rooted at the middleware frame that handles it
+    """
+
+    def __init__(self, root_frame, task: Optional[asyncio.Task]):
+        self.root_frame = root_frame
+        self.task = task
+        self.samples: "Counter[Tuple[Frame, ...]]" = Counter()
+        self.started = time.perf_counter()
+
+    def sample_running(self, frame) -> bool:
+        """
+        Record the stack of the loop thread if it is running this request
+        """
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            if frame is self.root_frame:
+                self.samples[tuple(_frame_key(f) for f in reversed(stack))] += 1
+                return True
+            frame = frame.f_back
+        return False
+
+    def sample_suspended(self) -> None:
+        """
+        Record the chain of coroutines the request's task is waiting in
+        """
+        if self.task is None:
+            return
+        stack: List[Frame] = []
+        rooted = False
+        awaitable = self.task.get_coro()
+        # The chain can be mutated by the loop thread while we walk it; bound the walk
+        for _ in range(256):
+            if awaitable is None:
+                break
+            frame = _coroutine_frame(awaitable)
+            if frame is None:
+                break
+            if frame is self.root_frame:
+                rooted = True
+            if rooted:
+                stack.append(_frame_key(frame))
+            awaitable = _awaited(awaitable)
+        if stack:
+            self.samples[tuple(stack) + ((AWAITING_FRAME, "", 0),)] += 1
+
+class SamplingProfiler:
+    """
+    Statistical profiler for individual requests
+
+    A daemon thread wakes every `interval_seconds` while at least one
+    request is being profiled and reads the event loop thread's current
+    stack. A sample counts towards a request when the loop is running code
+    under that request's middleware frame; when the request's task is
+    suspended instead, the chain of coroutines it is awaiting in is
+    recorded under an `[awaiting]` leaf, so the profile adds up to wall
+    time rather than only CPU time. At most `max_concurrent` requests are
+    profiled at once, which bounds the sampling cost.
+    """
+
+    def __init__(self, interval_seconds: float, max_concurrent: int):
+        self.interval_seconds = interval_seconds
+        self.max_concurrent = max_concurrent
+        self.sessions: Dict[int, ProfileSession] = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def begin(self, root_frame) -> Optional[ProfileSession]:
+        """
+        Start sampling a request, or return None if too many are being profiled
+        """
+        with self._lock:
+            if len(self.sessions) >= self.max_concurrent:
+                return None
+            session = ProfileSession(root_frame, asyncio.current_task())
+            self.sessions[id(session)] = session
+            self._loop_thread_id = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._active.set()
+        return session
+
+    def end(self, session: ProfileSession) -> None:
+        # Waits for a sample in progress, so the session is not written to afterwards
+        with self._lock:
+            self.sessions.pop(id(session), None)
+            if not self.sessions:
+                self._active.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._active.wait()
+            time.sleep(self.interval_seconds)
+            with self._lock:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                for session in self.sessions.values():
+                    try:
+                        if not session.sample_running(frame):
+                            session.sample_suspended()
+                    except Exception:
+                        # The loop thread may change a coroutine chain mid-walk; drop the sample
+                        pass
+                del frame
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "backend" + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+def collapsed_stacks(session: ProfileSession) -> str:
+    """
+    Render samples in the collapsed-stack format read by flamegraph.pl and speedscope
+    """
+    lines = []
+    for stack, count in session.samples.most_common():
+        frames = ";".join(
+            name if not filename else f"{name} ({_short_path(filename)}:{line})" for name, filename, line in stack
+        )
+        lines.append(f"{frames} {count}")
+    return "\n".join(lines) + "\n"
+
+def speedscope_profile(session: ProfileSession, name: str, interval_seconds: float) -> str:
+    """
+    Render samples as a speedscope sampled profile
+    """
+    frames: List[dict] = []
+    indexes: Dict[Frame, int] = {}
+    samples, weights = [], []
+    for stack, count in session.samples.items():
+        sample = []
+        for key in stack:
+            if key not in indexes:
+                indexes[key] = len(frames)
+                function, filename, line = key
+                frames.append({"name": function, "file": _short_path(filename), "line": line} if filename else {"name": function})
+            sample.append(indexes[key])
+        samples.append(sample)
+        weights.append(count * interval_seconds * 1e3)
+    return json.dumps({
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "exporter": "long-term-memory-companion",
+    })
+
+class ProfileWriter:
+    """
+    Writes profiles to a directory that keeps only the newest `max_files`
+    """
+
+    def __init__(self, directory: str, max_files: int, output_format: str):
+        if output_format not in ("speedscope", "collapsed"):
+            raise ValueError(f"Unknown profile format: {output_format}")
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.output_format = output_format
+        self.written = 0
+
+    def write(self, session: ProfileSession, label: str, elapsed_ms: float, interval_seconds: float) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:80]
+        base = f"{stamp}-{int(time.time() * 1e6) % 1_000_000:06d}-{slug}-{elapsed_ms:.0f}ms"
+        if self.output_format == "speedscope":
+            path = self.directory / f"{base}.speedscope.json"
+            path.write_text(speedscope_profile(session, f"{label} ({elapsed_ms:.0f} ms)", interval_seconds))
+        else:
+            path = self.directory / f"{base}.collapsed.txt"
+            path.write_text(collapsed_stacks(session))
+        self.written += 1
+        self._rotate()
+        return path
+
+    def _rotate(self) -> None:
+        profiles = sorted(
+            (path for path in self.directory.iterdir() if path.is_file()),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for path in profiles[:max(len(profiles) - self.max_files, 0)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests and keeps the interesting profiles
+
+    With PROFILER_ENABLED every request is sampled, and its profile is
+    written when it took at least PROFILER_SLOW_MS or was picked with
+    probability PROFILER_SAMPLE_RATE. A request carrying PROFILER_HEADER_SECRET
+    in its X-Profile header is always profiled and written, even when the
+    profiler is otherwise disabled. It must be the innermost middleware so
+    that the route handler, including response validation and
+    serialization, runs in its task.
+    """
+
+    def __init__(self, app, profiler: Optional[SamplingProfiler] = None, writer: Optional[ProfileWriter] = None):
+        self.app = app
+        self.profiler = profiler or SamplingProfiler(settings.PROFILER_INTERVAL_MS / 1e3, settings.PROFILER_MAX_CONCURRENT)
+        self.writer = writer or ProfileWriter(settings.PROFILER_DIR, settings.PROFILER_MAX_FILES, settings.PROFILER_FORMAT)
+
+    def _requested(self, scope) -> bool:
+        if not settings.PROFILER_HEADER_SECRET:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, settings.PROFILER_HEADER_SECRET.encode())
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = self._requested(scope)
+        if not (forced or settings.PROFILER_ENABLED):
+            await self.app(scope, receive, send)
+            return
+
+        keep = forced or random.random() < settings.PROFILER_SAMPLE_RATE
+        session = self.profiler.begin(sys._getframe())
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(session)
+            elapsed_ms = (time.perf_counter() - session.started) * 1e3
+            if (keep or elapsed_ms >= settings.PROFILER_SLOW_MS) and session.samples:
+                # Written off the event loop, without holding up the response
+                label = f"{scope['method']} {scope['path']}"
+                asyncio.get_running_loop().run_in_executor(None, self._write, session, label, elapsed_ms)
+
+    def _write(self, session: ProfileSession, label: str, elapsed_ms: float) -> None:
+        try:
+            path = self.writer.write(session, label, elapsed_ms, self.profiler.interval_seconds)
+            logger.info(f"Profiled {label} ({elapsed_ms:.0f} ms): {path}")
+        except OSError as e:
+            logger.warning(f"Failed to write profile of {label}: {e}")
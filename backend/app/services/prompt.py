@@ -0,0 +1,188 @@
+import datetime
+import math
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+SYSTEM_PROMPT = "You are a personalized AI assistant that remembers details about the user and provides helpful, accurate responses."
+CORE_MEMORIES_HEADER = "Core Memories:"
+ENVIRONMENT_MEMORIES_HEADER = "Environment/Event Memories:"
+QUERY_PREFIX = "User Query: "
+
+# Rough size of a token for Gemini-style tokenizers on English text
+CHARS_PER_TOKEN = 4
+# Role markers and separators added by the provider around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Cap on memory IDs recorded in message metadata
+MAX_DROPPED_IDS = 50
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def format_memory(memory: dict) -> str:
+    """
+    Format a single memory as a prompt line
+    """
+    created_at = memory.get("created_at")
+    if isinstance(created_at, datetime.datetime):
+        created_at_str = created_at.isoformat()
+    else:
+        created_at_str = str(created_at)
+
+    return f"- {memory.get('content', '')} (Recorded: {created_at_str})"
+
+def format_core_memories(memories: List[dict]) -> str:
+    """
+    Format core memories into a string for the system prompt
+    """
+    if not memories:
+        return ""
+
+    return CORE_MEMORIES_HEADER + "\n" + "\n".join(format_memory(memory) for memory in memories)
+
+def format_environment_memories(memories: List[dict]) -> str:
+    """
+    Format environment memories into a string for context
+    """
+    if not memories:
+        return ""
+
+    return ENVIRONMENT_MEMORIES_HEADER + "\n" + "\n".join(format_memory(memory) for memory in memories)
+
+class AssembledPrompt(NamedTuple):
+    system_prompt: str
+    human_message: str
+    metadata: dict
+
+class PromptAssembler:
+    """
+    Builds the system prompt and human message for a chat turn within a
+    fixed token budget
+
+    The budget is filled in priority order: the base system prompt and the
+    user's query first, then core memories, then environment memories.
+    Within each type, memories are ranked by relevance to the query plus a
+    recency bonus that halves every `recency_half_life_days`. Memories that
+    don't fit are dropped and reported in the returned metadata.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        recency_weight: float,
+        recency_half_life_days: float,
+        system_prompt: str = SYSTEM_PROMPT,
+    ):
+        self.token_budget = token_budget
+        self.recency_weight = recency_weight
+        self.recency_half_life_days = recency_half_life_days
+        self.system_prompt = system_prompt
+
+    def rank(
+        self, candidates: List[Tuple[dict, float]], now: Optional[datetime.datetime] = None
+    ) -> List[dict]:
+        """
+        Order (memory, relevance) pairs by relevance plus recency, best first
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+
+        def score(candidate: Tuple[dict, float]) -> float:
+            memory, relevance = candidate
+            created_at = memory.get("created_at")
+            if not isinstance(created_at, datetime.datetime) or self.recency_half_life_days <= 0:
+                return relevance
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+            age_days = max((now - created_at).total_seconds(), 0) / 86400
+            return relevance + self.recency_weight * 0.5 ** (age_days / self.recency_half_life_days)
+
+        return [memory for memory, _ in sorted(candidates, key=score, reverse=True)]
+
+    def _fill(
+        self, memories: List[dict], header_tokens: int, used: int
+    ) -> Tuple[List[dict], List[dict], int]:
+        """
+        Greedily take memories in rank order while they fit in the budget
+        """
+        kept, dropped = [], []
+        for memory in memories:
+            # Each line costs its text plus a newline; the first also pays for the header
+            cost = estimate_tokens(format_memory(memory)) + 1
+            if not kept:
+                cost += header_tokens
+            if used + cost <= self.token_budget:
+                kept.append(memory)
+                used += cost
+            else:
+                dropped.append(memory)
+        return kept, dropped, used
+
+    def assemble(
+        self,
+        query: str,
+        core_candidates: List[Tuple[dict, float]],
+        environment_candidates: List[Tuple[dict, float]],
+    ) -> AssembledPrompt:
+        """
+        Build the prompt for a chat turn
+
+        Args:
+            query: The user's message
+            core_candidates: (memory, relevance) pairs for core memories
+            environment_candidates: (memory, relevance) pairs for environment memories
+
+        Returns:
+            The system prompt, the human message and a summary of what was
+            included or dropped
+        """
+        used = estimate_tokens(self.system_prompt) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+        # The query is never dropped, but it is truncated if it alone exceeds the budget
+        query_truncated = False
+        remaining = max(self.token_budget - used, 0)
+        if estimate_tokens(query) > remaining:
+            query = query[: remaining * CHARS_PER_TOKEN]
+            query_truncated = True
+        used += estimate_tokens(query)
+
+        core_memories, dropped_core, used = self._fill(
+            self.rank(core_candidates), estimate_tokens(CORE_MEMORIES_HEADER) + 1, used
+        )
+        environment_memories, dropped_environment, used = self._fill(
+            self.rank(environment_candidates),
+            estimate_tokens(ENVIRONMENT_MEMORIES_HEADER + QUERY_PREFIX) + 2,
+            used,
+        )
+
+        # Create system prompt with core memories
+        system_prompt = self.system_prompt
+        if core_memories:
+            system_prompt += f"\n\n{format_core_memories(core_memories)}"
+
+        # Create human message with environment memories and user query
+        human_message = query
+        if environment_memories:
+            human_message = f"{format_environment_memories(environment_memories)}\n\n{QUERY_PREFIX}{query}"
+
+        dropped = dropped_core + dropped_environment
+        metadata = {
+            "token_budget": self.token_budget,
+            "estimated_tokens": used,
+            "core_memories_used": len(core_memories),
+            "core_memories_dropped": len(dropped_core),
+            "environment_memories_used": len(environment_memories),
+            "environment_memories_dropped": len(dropped_environment),
+            "dropped_memory_ids": [str(memory.get("_id")) for memory in dropped[:MAX_DROPPED_IDS]],
+            "query_truncated": query_truncated,
+        }
+
+        return AssembledPrompt(system_prompt, human_message, metadata)
+
+prompt_assembler = PromptAssembler(
+    token_budget=settings.PROMPT_TOKEN_BUDGET,
+    recency_weight=settings.PROMPT_RECENCY_WEIGHT,
+    recency_half_life_days=settings.PROMPT_RECENCY_HALF_LIFE_DAYS,
+)
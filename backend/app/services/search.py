@@ -0,0 +1,235 @@
+import heapq
+import math
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.text import tokenize
+from app.repositories.chat import chat_message_repository
+from app.repositories.memory import memory_repository
+from app.repositories.session import session_repository
+from app.services.cache import TTLCache
+from app.services.memory_cache import get_memory_index
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Characters of context kept around the first match in a snippet
+SNIPPET_CHARS = 160
+
+class SearchHit(NamedTuple):
+    kind: str  # "message" or "memory"
+    document: dict
+    score: float
+
+class InvertedIndex:
+    """
+    In-process inverted index ranked with BM25
+
+    Documents are added and removed one at a time, so the index can be kept
+    current as new messages are written instead of being rebuilt.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.documents: Dict[str, dict] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, doc_id: str, text: str, document: dict) -> None:
+        if doc_id in self.documents:
+            self.remove(doc_id)
+
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[doc_id] = count
+
+        self.documents[doc_id] = document
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for token in set(tokenize(document.get("content", ""))):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[token]
+        self.total_length -= self.lengths.pop(doc_id)
+
+    def search(
+        self, query: str, limit: int, where: Optional[Callable[[dict], bool]] = None
+    ) -> List[Tuple[dict, float]]:
+        """
+        Get the documents best matching any query term, best first
+
+        With `where`, only documents it accepts are ranked, so the result
+        still holds up to `limit` of them.
+        """
+        if not self.documents:
+            return []
+        average_length = self.total_length / len(self.documents) or 1.0
+
+        scores: Dict[str, float] = {}
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self.documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+
+        if where is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if where(self.documents[doc_id])}
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.documents[doc_id], score) for doc_id, score in ranked]
+
+def make_snippet(content: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """
+    Cut a window of `content` around the first occurrence of a query term
+    """
+    text = " ".join(content.split())
+    if len(text) <= width:
+        return text
+
+    terms = tokenize(query)
+    match = re.search(r"\b(" + "|".join(re.escape(term) for term in terms) + r")", text, re.IGNORECASE) if terms else None
+    start = max(0, (match.start() if match else 0) - width // 3)
+    end = min(len(text), start + width)
+    start = max(0, end - width)
+
+    snippet = text[start:end]
+    if start > 0:
+        snippet = "…" + snippet.split(" ", 1)[-1]
+    if end < len(text):
+        snippet = snippet.rsplit(" ", 1)[0] + "…"
+    return snippet
+
+class SearchBackend:
+    async def search_messages(self, user_id: str, query: str, limit: int, session_ids: Set[str]) -> List[SearchHit]:
+        """
+        Search a user's messages, counting only those in `session_ids` towards `limit`
+        """
+        raise NotImplementedError
+
+    async def search_memories(self, user_id: str, query: str, limit: int) -> List[SearchHit]:
+        raise NotImplementedError
+
+    def index_messages(self, user_id: str, messages: List[dict]) -> None:
+        """
+        Make newly stored chat messages searchable
+        """
+
+class MongoTextSearch(SearchBackend):
+    """
+    Search using MongoDB text indexes prefixed by user_id
+
+    The index prefix means every query is an equality match on the user
+    followed by a text lookup, and new documents are indexed by the server.
+    """
+
+    async def search_messages(self, user_id: str, query: str, limit: int, session_ids: Set[str]) -> List[SearchHit]:
+        messages = await chat_message_repository.text_search(user_id, query, limit, list(session_ids))
+        return [SearchHit("message", message, message.pop("score")) for message in messages]
+
+    async def search_memories(self, user_id: str, query: str, limit: int) -> List[SearchHit]:
+        memories = await memory_repository.text_search(user_id, query, limit)
+        return [SearchHit("memory", memory, memory.pop("score")) for memory in memories]
+
+class LocalIndexSearch(SearchBackend):
+    """
+    Search using per-user inverted indexes held in this process
+
+    For database backends without text indexes. A user's message index is
+    built from one cursor scan on their first search and then kept current
+    by `index_messages` on every chat turn; entries expire after
+    SEARCH_INDEX_TTL_SECONDS so messages written by other workers show up.
+    Memories are indexed lazily alongside the user's cached memory context,
+    which is already invalidated on every memory write.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float):
+        self.message_indexes = TTLCache(max_size=max_users, ttl_seconds=ttl_seconds)
+
+    async def _message_index(self, user_id: str) -> InvertedIndex:
+        index = self.message_indexes.get(user_id)
+        if index is not None:
+            return index
+
+        version = self.message_indexes.version()
+        index = InvertedIndex()
+        async for message in chat_message_repository.iterate_for_user(user_id, settings.EXPORT_CURSOR_BATCH_SIZE):
+            index.add(str(message["_id"]), message["content"], message)
+        self.message_indexes.set(user_id, index, version)
+        return index
+
+    async def search_messages(self, user_id: str, query: str, limit: int, session_ids: Set[str]) -> List[SearchHit]:
+        index = await self._message_index(user_id)
+        found = index.search(query, limit, where=lambda message: message["session_id"] in session_ids)
+        return [SearchHit("message", message, score) for message, score in found]
+
+    async def search_memories(self, user_id: str, query: str, limit: int) -> List[SearchHit]:
+        memory_index = await get_memory_index(user_id)
+        if memory_index.text_index is None:
+            memory_index.text_index = InvertedIndex()
+            for memory in memory_index.memories:
+                memory_index.text_index.add(str(memory["_id"]), memory.get("content", ""), memory)
+        return [SearchHit("memory", memory, score) for memory, score in memory_index.text_index.search(query, limit)]
+
+    def index_messages(self, user_id: str, messages: List[dict]) -> None:
+        index = self.message_indexes.get(user_id)
+        if index is None:
+            # Not loaded yet; the first search will read these from the database
+            return
+        for message in messages:
+            index.add(str(message["_id"]), message["content"], message)
+
+SEARCH_BACKENDS = {
+    "mongo": lambda: MongoTextSearch(),
+    "local": lambda: LocalIndexSearch(settings.SEARCH_INDEX_CACHE_SIZE, settings.SEARCH_INDEX_TTL_SECONDS),
+}
+
+_search_backend: Optional[SearchBackend] = None
+
+def get_search_backend() -> SearchBackend:
+    """
+    Get the process-wide search backend configured by SEARCH_BACKEND
+    """
+    global _search_backend
+    if _search_backend is None:
+        try:
+            factory = SEARCH_BACKENDS[settings.SEARCH_BACKEND]
+        except KeyError:
+            raise ValueError(f"Unknown search backend: {settings.SEARCH_BACKEND}")
+        _search_backend = factory()
+    return _search_backend
+
+async def search_user_content(user_id: str, query: str, scope: str, limit: int) -> List[SearchHit]:
+    """
+    Search a user's chat messages and/or memories, best match first
+
+    Messages of sessions that are being deleted are left out before the
+    best `limit` are picked, so they never crowd out live matches.
+    """
+    backend = get_search_backend()
+    hits: List[SearchHit] = []
+    if scope in ("all", "messages"):
+        sessions = await session_repository.list_for_user(user_id, projection={"_id": 1})
+        live_sessions = {str(session["_id"]) for session in sessions}
+        if live_sessions:
+            hits += await backend.search_messages(user_id, query, limit, live_sessions)
+    if scope in ("all", "memories"):
+        hits += await backend.search_memories(user_id, query, limit)
+
+    hits.sort(key=lambda hit: hit.score, reverse=True)
+    return hits[:limit]
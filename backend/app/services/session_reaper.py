@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.repositories.chat import ChatMessageRepository, chat_message_repository
+from app.repositories.session import SessionRepository, session_repository
+
+logger = logging.getLogger(__name__)
+
+# Tombstoned sessions fetched per scan
+SCAN_LIMIT = 100
+
+class SessionReaper:
+    """
+    Background worker that finishes deleting tombstoned sessions
+
+    Deleting a session only sets its `deleted_at` tombstone, which hides it
+    at once. The reaper then removes the session's messages oldest first
+    in batches of `batch_size`, pausing `batch_interval_seconds` between
+    batches, and records progress in the session's `messages_deleted`.
+    The session document itself goes last. Tombstones live in the database,
+    so a reaper started after a restart resumes where the last one stopped,
+    and sessions deleted through other workers are found within
+    `poll_seconds`.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        batch_interval_seconds: float,
+        poll_seconds: float,
+        sessions: SessionRepository = session_repository,
+        messages: ChatMessageRepository = chat_message_repository,
+    ):
+        self.batch_size = batch_size
+        self.batch_interval_seconds = batch_interval_seconds
+        self.poll_seconds = poll_seconds
+        self.sessions = sessions
+        self.messages = messages
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self.sessions_reaped = 0
+        self.messages_deleted = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the worker; unfinished sessions are resumed on the next start
+        """
+        if self._task is None:
+            return
+        # wait_for can swallow a cancel that races with a wakeup, so the
+        # loop also checks this flag
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def wake(self) -> None:
+        """
+        Start reaping now rather than at the next poll
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                await self.reap_all()
+            except Exception as e:
+                logger.warning(f"Session reaper failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def reap_all(self) -> int:
+        """
+        Reap tombstoned sessions, oldest deletion first, until none are left
+
+        Returns:
+            Number of sessions removed
+        """
+        reaped = 0
+        while True:
+            sessions = await self.sessions.list_tombstoned(SCAN_LIMIT)
+            if not sessions:
+                return reaped
+            for session in sessions:
+                await self.reap(session)
+                reaped += 1
+
+    async def reap(self, session: dict) -> None:
+        """
+        Delete all of a tombstoned session's messages, then the session itself
+        """
+        session_id = str(session["_id"])
+        while True:
+            message_ids = await self.messages.list_ids_for_session(session_id, self.batch_size)
+            if not message_ids:
+                break
+
+            deleted = await self.messages.delete_by_ids(message_ids)
+            await self.sessions.record_messages_deleted(session["_id"], deleted)
+            self.messages_deleted += deleted
+
+            await asyncio.sleep(self.batch_interval_seconds)
+
+        await self.sessions.purge(session["_id"])
+        self.sessions_reaped += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "sessions_reaped": self.sessions_reaped,
+            "messages_deleted": self.messages_deleted,
+        }
+
+session_reaper = SessionReaper(
+    batch_size=settings.SESSION_REAPER_BATCH_SIZE,
+    batch_interval_seconds=settings.SESSION_REAPER_BATCH_INTERVAL_SECONDS,
+    poll_seconds=settings.SESSION_REAPER_POLL_SECONDS,
+)
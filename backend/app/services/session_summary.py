@@ -0,0 +1,61 @@
+import asyncio
+import json
+from typing import Optional
+
+from app.core.config import settings
+from app.repositories.base import to_object_id
+from app.repositories.chat import chat_message_repository
+from app.repositories.session import session_repository
+from app.services.prompt import CHARS_PER_TOKEN
+
+# Session summaries written concurrently by the backfill
+BACKFILL_BATCH_SIZE = 100
+
+def session_preview(content: str) -> str:
+    """
+    Shorten a message to the preview shown in the session list
+    """
+    text = " ".join(content.split())
+    if len(text) <= settings.SESSION_PREVIEW_CHARS:
+        return text
+    return text[:settings.SESSION_PREVIEW_CHARS - 1].rstrip() + "…"
+
+async def backfill_session_summaries(user_id: Optional[str] = None) -> dict:
+    """
+    Recompute session summaries from the stored messages
+
+    Repairs message counts, token totals and previews that have drifted,
+    and fills them in on sessions created before they existed. Covers one
+    user's sessions, or every session if `user_id` is None.
+
+    Returns:
+        Number of sessions initialized and recomputed
+    """
+    initialized = await session_repository.initialize_missing_summaries(user_id)
+
+    recomputed = 0
+    pending = []
+    async for summary in chat_message_repository.summarize_sessions(user_id, CHARS_PER_TOKEN):
+        session_id = to_object_id(summary["_id"])
+        if session_id is None:
+            continue
+        pending.append(session_repository.set_summary(
+            session_id,
+            summary["message_count"],
+            int(summary["total_tokens"]),
+            session_preview(summary["last_content"] or ""),
+        ))
+        if len(pending) >= BACKFILL_BATCH_SIZE:
+            await asyncio.gather(*pending)
+            recomputed += len(pending)
+            pending = []
+
+    if pending:
+        await asyncio.gather(*pending)
+        recomputed += len(pending)
+
+    return {"sessions_initialized": initialized, "sessions_recomputed": recomputed}
+
+if __name__ == "__main__":
+    # Backfill every session: python -m app.services.session_summary
+    print(json.dumps(asyncio.run(backfill_session_summaries())))
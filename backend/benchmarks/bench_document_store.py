@@ -0,0 +1,123 @@
+"""
+Benchmark the in-memory database backend's indexes
+
+Stores N chat messages spread over sessions and users in two in-memory
+collections, one with the indexes the migrations declare and one with
+none, and times the app's hot queries against both:
+
+- history page: the newest 50 messages of a session, as the chat history endpoint reads them
+- next page: a session's messages after a cursor timestamp, oldest first
+- insert: one new message, index maintenance included
+
+Without indexes every query scans the whole collection, so its time grows
+with N; with them it should stay roughly flat.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_document_store --messages 1000 10000 100000
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+# Settings require these even though nothing here talks to Gemini or MongoDB
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+from bson import ObjectId
+
+from app.core.document_store import InMemoryClient
+from app.core.migrations import MIGRATIONS
+
+SESSIONS = 500
+USERS = 50
+
+def make_messages(count: int, rng: random.Random) -> List[dict]:
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "session_id": f"session-{rng.randrange(SESSIONS)}",
+            "user_id": f"user-{rng.randrange(USERS)}",
+            "content": "how was the trip to the mountains",
+            "message_type": "user" if index % 2 == 0 else "bot",
+            "timestamp": start + datetime.timedelta(seconds=index),
+        }
+        for index in range(count)
+    ]
+
+class _Database:
+    """
+    Exposes one in-memory database the way the migrations expect
+    """
+
+    def __init__(self, client: InMemoryClient, name: str):
+        self.db = client[name]
+
+    def collection(self, name: str):
+        return self.db[name]
+
+async def measure(operation: Callable[[], Awaitable], repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - start)
+    ordered = sorted(samples)
+    return {"p50_ms": round(ordered[len(ordered) // 2] * 1e3, 4), "mean_ms": round(statistics.fmean(ordered) * 1e3, 4)}
+
+async def bench(count: int, repeats: int) -> dict:
+    rng = random.Random(count)
+    messages = make_messages(count, rng)
+    client = InMemoryClient()
+    indexed = _Database(client, "indexed")
+    for migration in MIGRATIONS:
+        await migration.apply(indexed)
+    collections = {"indexed": indexed.collection("chat_messages"), "unindexed": client["unindexed"]["chat_messages"]}
+
+    results = {"messages": count}
+    for kind, collection in collections.items():
+        await collection.insert_many([dict(message) for message in messages])
+
+        async def history_page():
+            session_id = f"session-{rng.randrange(SESSIONS)}"
+            cursor = collection.find({"session_id": session_id}).sort([("timestamp", -1), ("_id", -1)]).limit(50)
+            await cursor.to_list(length=None)
+
+        async def next_page():
+            after = datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=rng.randrange(count))
+            query = {"session_id": f"session-{rng.randrange(SESSIONS)}", "timestamp": {"$gt": after}}
+            await collection.find(query).sort([("timestamp", 1), ("_id", 1)]).limit(50).to_list(length=None)
+
+        async def insert():
+            await collection.insert_one({
+                "session_id": f"session-{rng.randrange(SESSIONS)}",
+                "user_id": f"user-{rng.randrange(USERS)}",
+                "content": "and the food",
+                "message_type": "user",
+                "timestamp": datetime.datetime(2025, 1, 1),
+            })
+
+        results[kind] = {
+            "history_page": await measure(history_page, repeats),
+            "next_page": await measure(next_page, repeats),
+            "insert": await measure(insert, repeats),
+        }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(json.dumps([asyncio.run(bench(count, args.repeats)) for count in args.messages], indent=2))
+
+if __name__ == "__main__":
+    main()
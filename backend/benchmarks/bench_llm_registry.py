@@ -0,0 +1,170 @@
+"""
+Benchmark per-request LLM client overhead with and without the registry
+
+Runs against a local stand-in provider (a tiny keep-alive HTTP server on
+127.0.0.1), so no API key or network access is needed. Two client types
+are measured:
+
+- stand-in: an httpx-based client, showing the cost of a fresh HTTP
+  session (and TCP handshake) per request versus a pooled connection
+- gemini: the real ChatGoogleGenerativeAI constructor with a dummy key,
+  showing credential and SDK setup cost (no requests are sent)
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_llm_registry --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+# Settings require these even though nothing here talks to Mongo or Gemini
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+from app.services.llm import DEFAULT_GENERATION_PARAMS, LLMRegistry
+
+class StandInProvider:
+    """
+    Minimal HTTP/1.1 server that answers every POST with a canned completion
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.connections = 0
+        self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                body = json.dumps({"content": "stand-in completion"}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+class StandInChatModel:
+    """
+    Chat client for the stand-in provider, built like a real SDK client:
+    each instance owns its own HTTP session and connection pool
+    """
+
+    def __init__(self, model_name: str, base_url: str, **params):
+        self.model_name = model_name
+        self.params = params
+        self.client = httpx.AsyncClient(base_url=base_url)
+
+    async def ainvoke(self, prompt: str) -> str:
+        response = await self.client.post(
+            "/generate", json={"model": self.model_name, "prompt": prompt, **self.params}
+        )
+        return response.json()["content"]
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+    }
+
+async def bench_stand_in(requests: int, latency: float) -> dict:
+    provider = StandInProvider(latency)
+    base_url = await provider.start()
+    model = "stand-in-model"
+
+    per_request = []
+    connections_before = provider.connections
+    for _ in range(requests):
+        start = time.perf_counter()
+        llm = StandInChatModel(model, base_url, **DEFAULT_GENERATION_PARAMS)
+        await llm.ainvoke("hello")
+        per_request.append(time.perf_counter() - start)
+        await llm.aclose()
+    per_request_connections = provider.connections - connections_before
+
+    registry = LLMRegistry(factory=lambda name, **params: StandInChatModel(name, base_url, **params))
+    registry.warm([model])
+    shared = []
+    connections_before = provider.connections
+    for _ in range(requests):
+        start = time.perf_counter()
+        await registry.get(model).ainvoke("hello")
+        shared.append(time.perf_counter() - start)
+    shared_connections = provider.connections - connections_before
+    await registry.get(model).aclose()
+
+    await provider.stop()
+    return {
+        "per_request_client": {**summarize(per_request), "connections": per_request_connections},
+        "registry": {**summarize(shared), "connections": shared_connections},
+    }
+
+def bench_gemini_construction(requests: int) -> dict:
+    from app.services.llm import create_gemini_client
+
+    model = "gemini-2.0-flash-lite"
+    per_request = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        create_gemini_client(model, **DEFAULT_GENERATION_PARAMS)
+        per_request.append(time.perf_counter() - start)
+
+    registry = LLMRegistry()
+    registry.warm([model])
+    shared = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        registry.get(model)
+        shared.append(time.perf_counter() - start)
+
+    return {"per_request_client": summarize(per_request), "registry": summarize(shared)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stand-in provider latency in seconds")
+    parser.add_argument("--gemini-requests", type=int, default=20, help="0 skips the Gemini constructor benchmark")
+    args = parser.parse_args()
+
+    results = {"stand_in": asyncio.run(bench_stand_in(args.requests, args.latency))}
+    if args.gemini_requests:
+        results["gemini_construction"] = bench_gemini_construction(args.gemini_requests)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
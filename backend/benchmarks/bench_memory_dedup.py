@@ -0,0 +1,111 @@
+"""
+Benchmark near-duplicate memory detection with MinHash/LSH
+
+Generates one user's memories, a share of which are reworded repeats of
+earlier ones, and groups them with `find_duplicate_groups`. For smaller
+sizes the result is checked against an exhaustive pairwise comparison of
+signatures. Reports timings, duplicates found and the prompt tokens the
+consolidation would save.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_memory_dedup --memories 1000 10000 30000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+# Settings require these even though nothing here talks to Mongo or Gemini
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+from app.core.config import settings
+from app.models.memory import MemoryModel
+from app.services.dedup import (
+    MinHasher,
+    dedup_fields,
+    find_duplicate_groups,
+    memory_prompt_tokens,
+    memory_signature,
+    pick_survivor,
+)
+
+SUBJECTS = ["sister", "manager", "dog", "landlord", "doctor", "best friend", "neighbour", "coach"]
+VERBS = ["enjoys", "prefers", "dislikes", "is learning", "collects", "writes about", "teaches"]
+TOPICS = [
+    "hiking", "jazz", "pottery", "chess", "sourdough", "astronomy", "rust", "gardening",
+    "cycling", "opera", "sailing", "origami", "climbing", "poetry", "knitting", "surfing",
+]
+PREFIXES = ["", "The user mentioned that ", "User said ", "Apparently "]
+SUFFIXES = ["", " a lot", " these days", " very much"]
+
+def make_memories(count: int, duplicate_rate: float, seed: int) -> list:
+    rng = random.Random(seed)
+    facts = []
+    memories = []
+    for index in range(count):
+        if facts and rng.random() < duplicate_rate:
+            # Reword an earlier fact
+            fact = rng.choice(facts)
+        else:
+            fact = (
+                f"User's {rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(TOPICS)} "
+                f"and {rng.choice(TOPICS)} since {rng.randint(1950, 2025)} in city {index}"
+            )
+            facts.append(fact)
+        content = f"{rng.choice(PREFIXES)}{fact}{rng.choice(SUFFIXES)}"
+        memories.append(MemoryModel(
+            user_id="user", content=content, memo_type="core_memory", **dedup_fields(content)
+        ).model_dump(by_alias=True))
+    return memories
+
+def pairwise_duplicates(memories: list) -> int:
+    """
+    Count memories in duplicate groups by comparing every pair
+    """
+    signatures = [memory_signature(memory) for memory in memories]
+    in_group = set()
+    for first in range(len(memories)):
+        for second in range(first + 1, len(memories)):
+            if MinHasher.similarity(signatures[first], signatures[second]) >= settings.DEDUP_THRESHOLD:
+                in_group.update((first, second))
+    return len(in_group)
+
+def run(count: int, duplicate_rate: float, pairwise_limit: int) -> dict:
+    memories = make_memories(count, duplicate_rate, seed=count)
+
+    start = time.perf_counter()
+    groups = find_duplicate_groups(memories, settings.DEDUP_THRESHOLD)
+    lsh_seconds = time.perf_counter() - start
+
+    removed = [memory for group in groups for memory in group if memory is not pick_survivor(group)]
+    result = {
+        "memories": count,
+        "lsh_seconds": lsh_seconds,
+        "duplicate_groups": len(groups),
+        "memories_removed": len(removed),
+        "prompt_tokens_before": memory_prompt_tokens(memories),
+        "prompt_tokens_saved": memory_prompt_tokens(removed),
+    }
+
+    if count <= pairwise_limit:
+        start = time.perf_counter()
+        pairwise_in_groups = pairwise_duplicates(memories)
+        result["pairwise_seconds"] = time.perf_counter() - start
+        result["lsh_recall"] = sum(len(group) for group in groups) / max(pairwise_in_groups, 1)
+
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memories", type=int, nargs="+", default=[1000, 10000, 30000])
+    parser.add_argument("--duplicate-rate", type=float, default=0.3, help="Share of memories that repeat an earlier one")
+    parser.add_argument("--pairwise-limit", type=int, default=2000, help="Largest size also checked pairwise")
+    args = parser.parse_args()
+
+    print(json.dumps([run(count, args.duplicate_rate, args.pairwise_limit) for count in args.memories], indent=2))
+
+if __name__ == "__main__":
+    main()
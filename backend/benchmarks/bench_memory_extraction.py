@@ -0,0 +1,118 @@
+"""
+Benchmark the background memory-extraction pipeline with a fake LLM
+
+Simulates many users chatting concurrently, feeding each completed turn
+to a MemoryExtractor whose extraction model is a local fake with
+configurable latency. Reports the per-turn cost added to the chat path
+(the enqueue call) and the ratio of extraction LLM calls to chat turns.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_memory_extraction --users 50 --turns 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+# Settings require these even though nothing here talks to Mongo or Gemini
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+from langchain_core.messages import AIMessage
+
+from app.services.memory_extraction import MemoryExtractor
+
+class FakeExtractionLLM:
+    """
+    Stand-in extraction model that returns one memory per call after a delay
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        conversation = messages[-1].content
+        first_line = conversation.splitlines()[0].removeprefix("User: ")
+        return AIMessage(content=json.dumps([{"content": first_line, "memo_type": "core_memory"}]))
+
+class FakeMemoryRepository:
+    def __init__(self):
+        self.documents = []
+        self.insert_calls = 0
+
+    async def find_by_lsh_bands(self, user_id, memo_type, lsh_bands):
+        bands = set(lsh_bands)
+        return [
+            document for document in self.documents
+            if document["user_id"] == user_id and document["memo_type"] == memo_type
+            and bands.intersection(document["lsh_bands"])
+        ]
+
+    async def insert_many(self, documents):
+        self.insert_calls += 1
+        self.documents.extend(documents)
+        return [document["_id"] for document in documents]
+
+async def run(args) -> dict:
+    llm = FakeExtractionLLM(args.llm_latency)
+    repository = FakeMemoryRepository()
+    extractor = MemoryExtractor(
+        turns_per_call=args.turns_per_call,
+        max_delay_seconds=args.max_delay,
+        queue_size=args.users * args.turns,
+        concurrency=args.concurrency,
+        llm_factory=lambda: llm,
+        repository=repository,
+    )
+    extractor.start()
+
+    enqueue_times = []
+
+    async def user(user_id: str):
+        for turn in range(args.turns):
+            # Time between a user's messages, standing in for the chat request itself
+            await asyncio.sleep(random.uniform(0, args.think_time))
+            start = time.perf_counter()
+            extractor.enqueue(user_id, f"My favourite number is {turn} ({user_id})", "Noted!")
+            enqueue_times.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(f"user-{i}") for i in range(args.users)))
+    await extractor.stop()
+    elapsed = time.perf_counter() - started
+
+    turns = args.users * args.turns
+    return {
+        "chat_turns": turns,
+        "extraction_llm_calls": llm.calls,
+        "llm_calls_per_chat_turn": llm.calls / turns,
+        "insert_many_calls": repository.insert_calls,
+        "memories_written": len(repository.documents),
+        "enqueue_mean_us": statistics.fmean(enqueue_times) * 1e6,
+        "enqueue_max_us": max(enqueue_times) * 1e6,
+        "elapsed_s": elapsed,
+        "extractor": extractor.stats(),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20, help="Chat turns per user")
+    parser.add_argument("--think-time", type=float, default=0.05, help="Max seconds between a user's turns")
+    parser.add_argument("--turns-per-call", type=int, default=5)
+    parser.add_argument("--max-delay", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark chat latency on a worker that is handling a login storm
+
+Chat requests are simulated as coroutines that wait on I/O (standing in
+for Mongo and the LLM) at a fixed arrival rate, and their latency is
+recorded while a burst of concurrent logins verifies bcrypt hashes either
+inline on the event loop (the old behaviour) or through the bounded
+password hashing pool.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_password_hashing --logins 40 --rounds 12
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+# Settings require these even though nothing here talks to Mongo or Gemini
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+from app.core import security
+
+def percentile(samples, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+async def chat_traffic(duration: float, interval: float, io_latency: float):
+    """
+    Issue simulated chat requests every `interval` seconds and record their latency
+    """
+    latencies = []
+
+    async def request():
+        start = time.perf_counter()
+        await asyncio.sleep(io_latency)
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(request()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    return latencies
+
+async def login_storm(logins: int, hashed: str, offload: bool) -> None:
+    async def login():
+        if offload:
+            await security.verify_and_update_password("correct horse battery", hashed)
+        else:
+            security.verify_password("correct horse battery", hashed)
+
+    # Spread the logins over the first part of the run, as a real burst would
+    for _ in range(logins):
+        asyncio.create_task(login())
+        await asyncio.sleep(0.01)
+
+async def scenario(name: str, args, hashed: str) -> dict:
+    storm = None
+    if name != "no_logins":
+        storm = asyncio.create_task(login_storm(args.logins, hashed, offload=name == "offloaded"))
+    latencies = await chat_traffic(args.duration, args.interval, args.io_latency)
+    if storm is not None:
+        await storm
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=security.settings.BCRYPT_ROUNDS)
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds of chat traffic per scenario")
+    parser.add_argument("--interval", type=float, default=0.005, help="Seconds between chat requests")
+    parser.add_argument("--io-latency", type=float, default=0.02, help="Simulated I/O time per chat request")
+    args = parser.parse_args()
+
+    security.pwd_context.update(bcrypt__rounds=args.rounds)
+    hashed = security.get_password_hash("correct horse battery")
+
+    results = {
+        "bcrypt_rounds": args.rounds,
+        "hash_workers": security.settings.PASSWORD_HASH_WORKERS,
+    }
+    for name in ("no_logins", "inline", "offloaded"):
+        results[name] = asyncio.run(scenario(name, args, hashed))
+    security.shutdown_password_executor()
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark full-text search latency at realistic corpus sizes
+
+Generates one user's chat history of N messages and measures, for the
+local inverted index: the initial build, incremental adds, and query
+latency percentiles, against a naive scan of every message as the
+baseline. With --mongo-uri the same corpus is also loaded into a scratch
+database on that server and `$text` query latency is measured through
+the (user_id, content) text index the app creates.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_search --messages 10000 100000
+    python -m benchmarks.bench_search --messages 100000 --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+# Settings require these even though nothing here talks to Gemini
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+from app.services.search import InvertedIndex, make_snippet
+
+# Zipf-like vocabulary so a few words are very common and most are rare
+VOCABULARY = [f"word{i}" for i in range(20000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+def make_messages(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "_id": str(index),
+            "user_id": "user",
+            "session_id": f"session-{index // 200}",
+            "content": " ".join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(5, 60))),
+        }
+        for index in range(count)
+    ]
+
+def make_queries(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    # Mostly mid-frequency words, as people search for specific things
+    return [" ".join(rng.choices(VOCABULARY[50:5000], k=rng.randint(1, 3))) for _ in range(count)]
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": ordered[len(ordered) // 2] * 1e3,
+        "p95_ms": ordered[int(len(ordered) * 0.95)] * 1e3,
+        "mean_ms": statistics.fmean(ordered) * 1e3,
+    }
+
+def bench_local(messages: list, queries: list, limit: int) -> dict:
+    start = time.perf_counter()
+    index = InvertedIndex()
+    for message in messages[:-100]:
+        index.add(message["_id"], message["content"], message)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in messages[-100:]:
+        index.add(message["_id"], message["content"], message)
+    add_us = (time.perf_counter() - start) / 100 * 1e6
+
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        for document, _ in index.search(query, limit):
+            make_snippet(document["content"], query)
+        samples.append(time.perf_counter() - start)
+
+    return {"build_seconds": build_seconds, "incremental_add_us": add_us, **percentiles(samples)}
+
+def bench_scan(messages: list, queries: list) -> dict:
+    samples = []
+    for query in queries:
+        terms = query.split()
+        start = time.perf_counter()
+        [message for message in messages if any(term in message["content"] for term in terms)]
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def bench_mongo(uri: str, messages: list, queries: list, limit: int) -> dict:
+    from pymongo import MongoClient
+
+    client = MongoClient(uri)
+    collection = client["search_benchmark"]["chat_messages"]
+    try:
+        collection.drop()
+        collection.create_index([("user_id", 1), ("content", "text")])
+        collection.insert_many([{k: v for k, v in message.items() if k != "_id"} for message in messages])
+
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            list(
+                collection.find(
+                    {"user_id": "user", "$text": {"$search": query}},
+                    {"score": {"$meta": "textScore"}},
+                )
+                .sort([("score", {"$meta": "textScore"})])
+                .limit(limit)
+            )
+            samples.append(time.perf_counter() - start)
+        return percentiles(samples)
+    finally:
+        client.drop_database("search_benchmark")
+        client.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--mongo-uri", help="Also measure $text queries on this MongoDB server")
+    args = parser.parse_args()
+
+    results = []
+    queries = make_queries(args.queries, seed=1)
+    for count in args.messages:
+        messages = make_messages(count, seed=count)
+        result = {
+            "messages": count,
+            "local_index": bench_local(messages, queries, args.limit),
+            "naive_scan": bench_scan(messages, queries),
+        }
+        if args.mongo_uri:
+            result["mongo_text"] = bench_mongo(args.mongo_uri, messages, queries, args.limit)
+        results.append(result)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
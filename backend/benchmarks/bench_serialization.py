@@ -0,0 +1,170 @@
+"""
+Benchmark JSON encoding of the hot list endpoints
+
+For chat history, the session list and the memory list, serves N stored
+documents through two FastAPI routes in process:
+
+- standard: add `id` to every document and return the list for FastAPI to
+  validate against the response model and encode, as the endpoints did
+- fast: map the documents with the endpoint's DocumentSerializer and
+  return the encoded bytes, as the endpoints do now
+
+and checks that both produce the same JSON. Database time is left out;
+only routing, validation and encoding are measured.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.bench_serialization --items 100 1000 10000
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from typing import List
+
+# Settings require these even though nothing here talks to Gemini or MongoDB
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from app.api.endpoints.chat import message_serializer
+from app.api.endpoints.memory import memory_serializer
+from app.api.endpoints.session import session_serializer
+from app.schemas.chat import ChatHistoryResponse
+from app.schemas.memory import MemoryListItem
+from app.schemas.session import SessionResponse
+from app.services.serialization import FastJSONResponse, dumps, orjson
+
+def make_messages(count: int, rng: random.Random) -> List[dict]:
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "session_id": "6650f1b2c3d4e5f601234567",
+            "user_id": "6650f1b2c3d4e5f601234568",
+            "content": " ".join(rng.choice(["sure", "tell", "me", "about", "the", "trip", "plans"]) for _ in range(rng.randint(5, 80))),
+            "message_type": "user" if index % 2 == 0 else "bot",
+            "timestamp": start + datetime.timedelta(seconds=index, milliseconds=rng.randint(0, 999)),
+            "model_used": None if index % 2 == 0 else "gemini-2.0-flash-lite",
+            "reasoning": False,
+            "metadata": None if index % 2 == 0 else {
+                "prompt": {"token_budget": 4000, "estimated_tokens": rng.randint(100, 4000), "dropped_memory_ids": []},
+                "timings_ms": {"session_lookup": 0.4, "memory_fetch": 0.2, "llm": 812.5, "save": 1.3},
+            },
+        }
+        for index in range(count)
+    ]
+
+def make_sessions(count: int, rng: random.Random) -> List[dict]:
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": "6650f1b2c3d4e5f601234568",
+            "name": f"Session {index}",
+            "created_at": start + datetime.timedelta(hours=index),
+            "updated_at": start + datetime.timedelta(hours=index, minutes=5),
+            "last_message_at": start + datetime.timedelta(hours=index, minutes=5),
+            "message_count": rng.randint(0, 500),
+            "last_message_preview": "Have a great trip to the mountains and let me know how it goes",
+            "total_tokens": rng.randint(0, 50000),
+        }
+        for index in range(count)
+    ]
+
+def make_memories(count: int, rng: random.Random) -> List[dict]:
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": "6650f1b2c3d4e5f601234568",
+            "content": f"User enjoys hobby number {rng.randint(0, 1000)} on weekends",
+            "memo_type": "core_memory" if index % 2 == 0 else "environment_memory",
+            "created_at": start + datetime.timedelta(minutes=index),
+        }
+        for index in range(count)
+    ]
+
+def build_app(messages: List[dict], sessions: List[dict], memories: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    def with_ids(documents: List[dict]) -> List[dict]:
+        # The endpoints mutate the documents they load, so each request gets fresh ones
+        return [{**document, "id": str(document["_id"])} for document in documents]
+
+    @app.get("/standard/messages", response_model=ChatHistoryResponse)
+    async def standard_messages():
+        return {"messages": with_ids(messages), "session_id": "s", "next_cursor": None}
+
+    @app.get("/fast/messages", response_model=ChatHistoryResponse)
+    async def fast_messages():
+        return FastJSONResponse(dumps({"messages": message_serializer.items(messages), "session_id": "s", "next_cursor": None}))
+
+    @app.get("/standard/sessions", response_model=List[SessionResponse])
+    async def standard_sessions():
+        return with_ids(sessions)
+
+    @app.get("/fast/sessions", response_model=List[SessionResponse])
+    async def fast_sessions():
+        return session_serializer.response(sessions)
+
+    @app.get("/standard/memories", response_model=List[MemoryListItem], response_model_exclude_unset=True)
+    async def standard_memories():
+        return [{"id": str(memory["_id"]), **{key: value for key, value in memory.items() if key != "_id"}} for memory in memories]
+
+    @app.get("/fast/memories", response_model=List[MemoryListItem], response_model_exclude_unset=True)
+    async def fast_memories():
+        return memory_serializer.response(memories)
+
+    return app
+
+async def measure(client: httpx.AsyncClient, path: str, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+    ordered = sorted(samples)
+    return {"p50_ms": ordered[len(ordered) // 2] * 1e3, "mean_ms": statistics.fmean(ordered) * 1e3, "bytes": len(response.content)}
+
+async def bench(count: int, repeats: int) -> dict:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    rng = random.Random(count)
+    app = build_app(make_messages(count, rng), make_sessions(count, rng), make_memories(count, rng))
+    results = {"items": count}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for kind in ("messages", "sessions", "memories"):
+            standard = (await client.get(f"/standard/{kind}")).json()
+            fast = (await client.get(f"/fast/{kind}")).json()
+            if standard != fast:
+                raise AssertionError(f"{kind}: fast path output differs from the response model's")
+
+            before = await measure(client, f"/standard/{kind}", repeats)
+            after = await measure(client, f"/fast/{kind}", repeats)
+            results[kind] = {
+                "standard": before,
+                "fast": after,
+                "speedup": round(before["p50_ms"] / after["p50_ms"], 2),
+            }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    results = [asyncio.run(bench(count, args.repeats)) for count in args.items]
+    print(json.dumps({"encoder": "orjson" if orjson is not None else "pydantic-core", "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
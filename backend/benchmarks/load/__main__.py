@@ -0,0 +1,179 @@
+"""
+End-to-end load test of the API with local stand-ins
+
+By default the app runs in this process behind httpx's ASGI transport,
+with MongoDB replaced by the in-memory database and Gemini by a fake model
+that answers after `--first-token-ms` and then produces `--tokens-per-second`.
+Everything from routing and auth to the repositories runs for real.
+With `--base-url` the same scenarios are sent to a running server instead,
+e.g. one started with `python -m benchmarks.load.serve`.
+
+Each scenario reports throughput and p50/p95/p99 latency per endpoint.
+Results are printed and saved as JSON tagged with the current commit, and
+two result files can be compared with `--compare`.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.load
+    python -m benchmarks.load --users 50 --scenarios chat_burst history_paging
+    python -m benchmarks.load --base-url http://localhost:8001
+    python -m benchmarks.load --compare results/load-abc1234.json results/load-def5678.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import List
+
+from benchmarks.load.scenarios import SCENARIOS, LoadClient, LoadConfig, Recorder, credentials
+from benchmarks.load.stand_ins import install_stand_ins
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "results"
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+def git_revision() -> dict:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+async def setup_users(http, recorder: Recorder, config: LoadConfig, run_id: str):
+    """
+    Register and log in one account per simulated user
+    """
+    users = [credentials(index, run_id) for index in range(config.users)]
+    clients = [LoadClient(http, recorder, buffered=config.in_process) for _ in users]
+
+    async def register(client: LoadClient, user: dict) -> None:
+        response = await client.call("POST", "/api/auth/register", json=user)
+        response.raise_for_status()
+        user["id"] = response.json()["id"]
+        await client.login(user["username"], user["password"])
+
+    await asyncio.gather(*(register(client, user) for client, user in zip(clients, users)))
+    return clients, users
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    config = LoadConfig(
+        users=args.users,
+        logins_per_user=args.logins_per_user,
+        messages_per_user=args.messages_per_user,
+        history_messages=args.history_messages,
+        history_page_size=args.history_page_size,
+        memories_per_user=args.memories_per_user,
+        in_process=args.base_url is None,
+    )
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with AsyncExitStack() as stack:
+        if config.in_process:
+            from app.main import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            http = httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout)
+        else:
+            http = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+        await stack.enter_async_context(http)
+
+        results = {}
+        setup = Recorder()
+        clients, users = await setup_users(http, setup, config, uuid.uuid4().hex[:8])
+        setup.finish()
+        results["setup"] = setup.report()
+
+        for name in args.scenarios:
+            recorder = Recorder()
+            for client in clients:
+                client.recorder = recorder
+            await SCENARIOS[name](clients, users, config)
+            recorder.finish()
+            results[name] = recorder.report()
+            print(f"{name}: {results[name]['requests']} requests in {results[name]['duration_seconds']}s", file=sys.stderr)
+
+    return {
+        **git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "target": args.base_url or "in-process",
+        "config": {
+            **config.__dict__,
+            "first_token_ms": args.first_token_ms,
+            "tokens_per_second": args.tokens_per_second,
+            "response_tokens": args.response_tokens,
+            "bcrypt_rounds": int(os.environ["BCRYPT_ROUNDS"]) if "BCRYPT_ROUNDS" in os.environ else None,
+        },
+        "scenarios": results,
+    }
+
+def compare(old_path: str, new_path: str) -> None:
+    """
+    Print per-endpoint changes between two result files
+    """
+    old, new = (json.loads(Path(path).read_text()) for path in (old_path, new_path))
+    print(f"{old['commit']} -> {new['commit']}")
+    for scenario, report in new["scenarios"].items():
+        before = old["scenarios"].get(scenario)
+        if before is None:
+            continue
+        print(f"\n{scenario}")
+        for endpoint, metrics in report["endpoints"].items():
+            previous = before["endpoints"].get(endpoint)
+            if previous is None:
+                continue
+            changes = []
+            for metric in COMPARED_METRICS:
+                change = (metrics[metric] - previous[metric]) / previous[metric] * 100 if previous[metric] else 0.0
+                changes.append(f"{metric} {previous[metric]:.1f} -> {metrics[metric]:.1f} ({change:+.1f}%)")
+            print(f"  {endpoint}\n    " + ", ".join(changes))
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--logins-per-user", type=int, default=5)
+    parser.add_argument("--messages-per-user", type=int, default=5)
+    parser.add_argument("--history-messages", type=int, default=1000, help="Messages seeded per paged session")
+    parser.add_argument("--history-page-size", type=int, default=50)
+    parser.add_argument("--memories-per-user", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Fake LLM generation rate")
+    parser.add_argument("--response-tokens", type=int, default=60, help="Fake LLM reply length")
+    parser.add_argument("--bcrypt-rounds", type=int, help="Override BCRYPT_ROUNDS in process (default: app setting)")
+    parser.add_argument("--base-url", help="Load a running server instead of the app in process")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.base_url is None:
+        install_stand_ins(args.first_token_ms / 1e3, args.tokens_per_second, args.response_tokens, args.bcrypt_rounds)
+
+    start = time.perf_counter()
+    result = asyncio.run(run(args))
+    result["wall_seconds"] = round(time.perf_counter() - start, 3)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load-{result['commit']}-{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(json.dumps(result, indent=2))
+    print(f"Saved to {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
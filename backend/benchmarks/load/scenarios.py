@@ -0,0 +1,238 @@
+"""
+Scripted load scenarios and the latency recorder they report into
+
+Each scenario runs one coroutine per simulated user, all concurrently, and
+records every request under its route template (e.g.
+`GET /api/chat/{session_id}/messages`) so results aggregate per endpoint.
+"""
+import asyncio
+import math
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+@dataclass
+class LoadConfig:
+    users: int = 20
+    logins_per_user: int = 5
+    messages_per_user: int = 5
+    history_messages: int = 1000
+    history_page_size: int = 50
+    memories_per_user: int = 20
+    in_process: bool = True
+
+class Recorder:
+    """
+    Collects request latencies and failures per endpoint
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.samples.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def report(self) -> dict:
+        duration = (self.finished or time.perf_counter()) - self.started
+        endpoints = {endpoint: summarize(samples, duration) for endpoint, samples in sorted(self.samples.items())}
+        for endpoint, summary in endpoints.items():
+            summary["errors"] = self.errors.get(endpoint, 0)
+        requests = sum(len(samples) for samples in self.samples.values())
+        return {
+            "duration_seconds": round(duration, 3),
+            "requests": requests,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(requests / duration, 2) if duration else 0.0,
+            "endpoints": endpoints,
+        }
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+def summarize(samples: List[float], duration: float) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "throughput_rps": round(len(ordered) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1e3, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1e3, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1e3, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1e3, 3),
+        "max_ms": round(ordered[-1] * 1e3, 3),
+    }
+
+class LoadClient:
+    """
+    HTTP client for one simulated user that times every request
+    """
+
+    def __init__(self, http: httpx.AsyncClient, recorder: Recorder, buffered: bool = False):
+        self.http = http
+        self.recorder = recorder
+        # In-process responses arrive whole, so there is no first token to time
+        self.buffered = buffered
+        self.headers: Dict[str, str] = {}
+
+    async def call(self, method: str, template: str, expected: int = 200, **params) -> httpx.Response:
+        """
+        Send a request to `template` filled in with `params`, timing it under the template
+        """
+        path_params = {key: params.pop(key) for key in list(params) if "{" + key + "}" in template}
+        start = time.perf_counter()
+        response = await self.http.request(method, template.format(**path_params), headers=self.headers, **params)
+        self.recorder.record(f"{method} {template}", time.perf_counter() - start, response.status_code == expected)
+        return response
+
+    async def stream_message(self, session_id: str, content: str) -> None:
+        """
+        Send a chat message over SSE, timing the first token as well as the whole turn
+        """
+        template = "/api/chat/{session_id}/messages/stream"
+        start = time.perf_counter()
+        first_token = None
+        async with self.http.stream(
+            "POST", template.format(session_id=session_id), headers=self.headers, json={"content": content}
+        ) as response:
+            async for line in response.aiter_lines():
+                if first_token is None and line.startswith("event: token"):
+                    first_token = time.perf_counter() - start
+        self.recorder.record(f"POST {template}", time.perf_counter() - start, response.status_code == 200)
+        if first_token is not None and not self.buffered:
+            self.recorder.record(f"POST {template} (first token)", first_token, True)
+
+    async def login(self, username: str, password: str) -> None:
+        response = await self.call(
+            "POST", "/api/auth/login", data={"username": username, "password": password}
+        )
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def credentials(index: int, run_id: str) -> dict:
+    return {
+        "username": f"load{run_id}u{index}",
+        "email": f"load{run_id}u{index}@example.com",
+        "password": "load-test-password",
+        "full_name": f"Load User {index}",
+    }
+
+async def login_storm(clients: List[LoadClient], users: List[dict], config: LoadConfig) -> None:
+    """
+    Every user logs in repeatedly and reads their profile with each new token
+    """
+    async def run(client: LoadClient, user: dict) -> None:
+        for _ in range(config.logins_per_user):
+            await client.login(user["username"], user["password"])
+            await client.call("GET", "/api/profile/me")
+
+    await asyncio.gather(*(run(client, user) for client, user in zip(clients, users)))
+
+async def chat_burst(clients: List[LoadClient], users: List[dict], config: LoadConfig) -> None:
+    """
+    Every user opens a session and sends messages back to back, the last one streamed
+    """
+    async def run(client: LoadClient, index: int) -> None:
+        session = (await client.call("POST", "/api/sessions/", json={"name": f"Burst {index}"})).json()
+        for turn in range(config.messages_per_user):
+            content = f"Message {turn} from user {index}: I have been planning a trip to the mountains"
+            if turn == config.messages_per_user - 1:
+                await client.stream_message(session["id"], content)
+            else:
+                await client.call("POST", "/api/chat/{session_id}/messages", session_id=session["id"], json={"content": content})
+        await client.call("GET", "/api/sessions/")
+
+    await asyncio.gather(*(run(client, index) for index, client in enumerate(clients)))
+
+async def seed_history(client: LoadClient, user_id: str, session_id: str, count: int, in_process: bool) -> None:
+    """
+    Fill a session with `count` messages, directly through the repository when in process
+    """
+    if not in_process:
+        for turn in range(count // 2):
+            await client.call("POST", "/api/chat/{session_id}/messages", session_id=session_id, json={"content": f"Seed {turn}"})
+        return
+
+    from app.models.chat import ChatMessageModel, MessageType
+    from app.repositories.chat import chat_message_repository
+
+    await chat_message_repository.create_many([
+        ChatMessageModel(
+            session_id=session_id,
+            user_id=user_id,
+            content=f"Seeded message {turn} about the weekend plans and the weather",
+            message_type=MessageType.USER if turn % 2 == 0 else MessageType.BOT,
+        )
+        for turn in range(count)
+    ])
+
+async def history_paging(clients: List[LoadClient], users: List[dict], config: LoadConfig) -> None:
+    """
+    Every user walks a long session's history from the newest page to the oldest
+    """
+    async def run(client: LoadClient, user: dict) -> None:
+        session = (await client.call("POST", "/api/sessions/", json={"name": "History"})).json()
+        await seed_history(client, user["id"], session["id"], config.history_messages, config.in_process)
+
+        before = None
+        while True:
+            params = {"limit": config.history_page_size}
+            if before:
+                params["before"] = before
+            page = (await client.call(
+                "GET", "/api/chat/{session_id}/messages", session_id=session["id"], params=params
+            )).json()
+            before = page.get("next_cursor")
+            if not before:
+                break
+
+    await asyncio.gather(*(run(client, user) for client, user in zip(clients, users)))
+
+async def memory_crud(clients: List[LoadClient], users: List[dict], config: LoadConfig) -> None:
+    """
+    Every user creates memories, lists them page by page, then reads, edits and deletes each
+    """
+    async def run(client: LoadClient, index: int) -> None:
+        memory_ids = []
+        for number in range(config.memories_per_user):
+            memo_type = "core_memory" if number % 2 == 0 else "environment_memory"
+            response = await client.call("POST", "/api/memory/", json={
+                "content": f"User {index} fact {number}: enjoys hobby number {number * 7 % 13} on weekends",
+                "memo_type": memo_type,
+            })
+            memory_ids.append(response.json()["id"])
+
+        cursor = None
+        while True:
+            params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+            response = await client.call("GET", "/api/memory/", params=params)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        for memory_id in memory_ids:
+            await client.call("GET", "/api/memory/{memory_id}", memory_id=memory_id)
+            await client.call("PUT", "/api/memory/{memory_id}", memory_id=memory_id, json={"content": f"Edited memory {memory_id}"})
+        for memory_id in memory_ids:
+            await client.call("DELETE", "/api/memory/{memory_id}", expected=204, memory_id=memory_id)
+
+    await asyncio.gather(*(run(client, index) for index, client in enumerate(clients)))
+
+SCENARIOS: Dict[str, Callable[[List[LoadClient], List[dict], LoadConfig], Awaitable[None]]] = {
+    "login_storm": login_storm,
+    "chat_burst": chat_burst,
+    "history_paging": history_paging,
+    "memory_crud": memory_crud,
+}
@@ -0,0 +1,34 @@
+"""
+Serve the app with the load-test stand-ins through uvicorn
+
+For load tests that include the HTTP server and real sockets; point
+`python -m benchmarks.load --base-url` at it.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.load.serve --port 8001
+"""
+import argparse
+
+from benchmarks.load.stand_ins import install_stand_ins
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Fake LLM generation rate")
+    parser.add_argument("--response-tokens", type=int, default=60, help="Fake LLM reply length")
+    parser.add_argument("--bcrypt-rounds", type=int, help="Override BCRYPT_ROUNDS (default: app setting)")
+    args = parser.parse_args()
+
+    install_stand_ins(args.first_token_ms / 1e3, args.tokens_per_second, args.response_tokens, args.bcrypt_rounds)
+
+    import uvicorn
+    from app.main import app
+
+    # A single process: the in-memory database is not shared between workers
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
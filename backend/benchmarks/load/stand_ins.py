@@ -0,0 +1,78 @@
+"""
+Local stand-in for Gemini used by the load-test suite
+
+MongoDB is replaced by the app's own in-memory backend
+(DATABASE_BACKEND=memory), which answers queries through the same indexes
+the migrations declare, so the whole request path runs, repositories
+included, without a server. `FakeChatLLM` stands in for the Gemini client
+with a configurable time to first token and token rate.
+"""
+import asyncio
+from typing import Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+class FakeChatLLM:
+    """
+    Chat model stand-in with a fixed time to first token and token rate
+
+    Replies are `response_tokens` words long. `ainvoke` returns after the
+    whole reply has been "generated"; `astream` yields it word by word.
+    """
+
+    def __init__(self, first_token_latency: float, tokens_per_second: float, response_tokens: int):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+
+    def _usage(self, messages) -> dict:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": self.response_tokens,
+            "total_tokens": input_tokens + self.response_tokens,
+        }
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        await asyncio.sleep(self.first_token_latency + self.response_tokens / self.tokens_per_second)
+        return AIMessage(content=" ".join(["token"] * self.response_tokens), usage_metadata=self._usage(messages))
+
+    async def astream(self, messages, **kwargs):
+        await asyncio.sleep(self.first_token_latency)
+        for index in range(self.response_tokens):
+            if index:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield AIMessageChunk(content="token ")
+
+def install_stand_ins(
+    first_token_latency: float,
+    tokens_per_second: float,
+    response_tokens: int,
+    bcrypt_rounds: Optional[int] = None,
+) -> None:
+    """
+    Point the app at the in-memory database and the fake LLM
+
+    Must run before anything under `app` is imported, since settings are
+    read at import time.
+    """
+    import os
+    import sys
+
+    if any(name == "app" or name.startswith("app.") for name in sys.modules):
+        raise RuntimeError("install_stand_ins() must be called before the app is imported")
+
+    # Settings require these even though nothing here talks to Gemini or MongoDB
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+    os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://in-memory")
+    os.environ["DATABASE_BACKEND"] = "memory"
+    # Simulated users message far faster than people do; set it to load-test the limiter
+    os.environ.setdefault("CHAT_USER_RATE_PER_MINUTE", "0")
+    if bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+
+    from app.services.llm import llm_registry
+
+    llm = FakeChatLLM(first_token_latency, tokens_per_second, response_tokens)
+    llm_registry.factory = lambda model_name, **params: llm
+    llm_registry.clear()
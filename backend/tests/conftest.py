@@ -0,0 +1,35 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Settings require these; the tests never talk to Gemini or a MongoDB server
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("MONGO_DB_CONNECTION_STRING", "mongodb://localhost:27017")
+os.environ["DATABASE_BACKEND"] = "memory"
+# Extraction would call the real model from the background worker
+os.environ["MEMORY_EXTRACTION_ENABLED"] = "false"
+
+# Make `app` importable however pytest is invoked
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def auth_headers(client):
+    username = f"user{uuid.uuid4().hex[:12]}"
+    response = client.post("/api/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password1", "full_name": "Test User",
+    })
+    assert response.status_code == 200, response.text
+    response = client.post("/api/auth/login", data={"username": username, "password": "password1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
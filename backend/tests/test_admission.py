@@ -0,0 +1,221 @@
+import asyncio
+
+import pytest
+
+from app.services import admission
+from app.services.admission import AdmissionRejected, ConcurrencyLimiter, TokenBucket, TokenBuckets
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+async def settle():
+    # Let woken tasks run; wait_for takes a few loop iterations to resume its caller
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", fake)
+    return fake
+
+def test_token_bucket_allows_burst_then_refills(clock):
+    bucket = TokenBucket(rate_per_second=2, burst=3)
+
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+    assert bucket.take() > 0
+
+def test_token_bucket_never_exceeds_burst(clock):
+    bucket = TokenBucket(rate_per_second=1, burst=2)
+    clock.now += 3600
+
+    assert [bucket.take() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.take() > 0
+
+def test_token_buckets_are_per_key(clock):
+    buckets = TokenBuckets(rate_per_minute=60, burst=1, max_keys=10)
+
+    assert buckets.take("alice") == 0.0
+    assert buckets.take("alice") > 0
+    assert buckets.take("bob") == 0.0
+
+def test_token_buckets_evict_least_recently_used(clock):
+    buckets = TokenBuckets(rate_per_minute=60, burst=1, max_keys=2)
+    buckets.take("alice")
+    buckets.take("bob")
+    buckets.take("alice")
+    buckets.take("carol")
+
+    assert len(buckets) == 2
+    # bob was evicted, so he starts over with a full bucket
+    assert buckets.take("bob") == 0.0
+    assert buckets.take("carol") > 0
+
+def test_token_buckets_disabled_with_zero_rate():
+    buckets = TokenBuckets(rate_per_minute=0, burst=1, max_keys=10)
+
+    assert not buckets.enabled
+    assert all(buckets.take("alice") == 0.0 for _ in range(100))
+    assert len(buckets) == 0
+
+def test_limiter_rejects_when_queue_is_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout_seconds=5)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_full"
+
+        limiter.release()
+        await waiter
+        assert limiter.active == 1
+        assert limiter.waiting == 0
+
+    asyncio.run(scenario())
+
+def test_limiter_times_out_waiters():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout_seconds=0.01)
+        await limiter.acquire()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_timeout"
+        assert limiter.waiting == 0
+        assert limiter.active == 1
+
+    asyncio.run(scenario())
+
+def test_limiter_hands_slots_to_waiters_in_order():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout_seconds=5)
+        await limiter.acquire()
+        admitted = []
+
+        async def wait(name):
+            await limiter.acquire()
+            admitted.append(name)
+
+        waiters = [asyncio.create_task(wait(name)) for name in ("first", "second")]
+        await settle()
+        limiter.release()
+        await settle()
+        assert admitted == ["first"]
+        assert limiter.active == 1
+
+        limiter.release()
+        await asyncio.gather(*waiters)
+        assert admitted == ["first", "second"]
+
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+def test_limiter_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout_seconds=5)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await settle()
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.waiting == 0
+
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+def test_controller_release_is_idempotent():
+    async def scenario():
+        controller = admission.AdmissionController(
+            user_buckets=TokenBuckets(60, 1, 10),
+            model_buckets=TokenBuckets(0, 1, 10),
+            limiter=ConcurrencyLimiter(1, 1, 1),
+        )
+        release = await controller.acquire("model")
+        assert controller.limiter.active == 1
+
+        release()
+        release()
+        assert controller.limiter.active == 0
+
+        controller.check_user("alice")
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.check_user("alice")
+        assert rejected.value.reason == "user_rate"
+
+    asyncio.run(scenario())
+
+def test_shed_request_gets_its_rate_tokens_back(clock):
+    async def scenario():
+        controller = admission.AdmissionController(
+            user_buckets=TokenBuckets(1, 1, 10),
+            model_buckets=TokenBuckets(1, 1, 10),
+            limiter=ConcurrencyLimiter(1, 0, 1),
+        )
+        controller.limiter.active = 1
+
+        controller.check_user("alice")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("model", "alice")
+        assert rejected.value.reason == "queue_full"
+
+        # Neither bucket has refilled, so both tokens must have been given back
+        controller.limiter.active = 0
+        controller.check_user("alice")
+        release = await controller.acquire("model", "alice")
+        release()
+
+    asyncio.run(scenario())
+
+def test_model_rate_rejection_gives_back_the_user_token(clock):
+    async def scenario():
+        controller = admission.AdmissionController(
+            user_buckets=TokenBuckets(1, 1, 10),
+            model_buckets=TokenBuckets(1, 1, 10),
+            limiter=ConcurrencyLimiter(2, 0, 1),
+        )
+        controller.model_buckets.take("model")
+
+        controller.check_user("alice")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("model", "alice")
+        assert rejected.value.reason == "model_rate"
+        controller.check_user("alice")
+
+    asyncio.run(scenario())
+
+class EchoLLM:
+    async def ainvoke(self, messages):
+        from langchain_core.messages import AIMessage
+
+        return AIMessage(content="hello")
+
+def test_unknown_session_does_not_spend_rate_tokens(client, auth_headers, monkeypatch):
+    from app.api.endpoints import chat
+
+    monkeypatch.setattr(admission.llm_admission, "user_buckets", TokenBuckets(rate_per_minute=1, burst=1, max_keys=10))
+    monkeypatch.setattr(chat, "get_llm", lambda model_name: EchoLLM())
+    session_id = client.post("/api/sessions/", headers=auth_headers, json={"name": "chat"}).json()["id"]
+
+    for _ in range(3):
+        response = client.post("/api/chat/000000000000000000000000/messages", headers=auth_headers, json={"content": "hi"})
+        assert response.status_code == 404
+
+    assert client.post(f"/api/chat/{session_id}/messages", headers=auth_headers, json={"content": "hi"}).status_code == 200
+    assert client.post(f"/api/chat/{session_id}/messages", headers=auth_headers, json={"content": "hi"}).status_code == 429
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from langchain_core.messages import AIMessageChunk
+
+from app.api.endpoints import chat
+from app.models.session import SessionModel
+from app.repositories.chat import chat_message_repository
+from app.repositories.session import session_repository
+from app.schemas.chat import ChatMessageCreate
+
+class StallingLLM:
+    """
+    Streams one chunk, then waits until generation is cancelled
+    """
+
+    async def astream(self, messages):
+        yield AIMessageChunk(content="hello")
+        await asyncio.Event().wait()
+
+class FinishingLLM:
+    """
+    Streams a two-chunk reply
+    """
+
+    async def astream(self, messages):
+        yield AIMessageChunk(content="hello ")
+        yield AIMessageChunk(content="there")
+
+class FailingLLM:
+    """
+    Fails before producing any chunk
+    """
+
+    async def astream(self, messages):
+        raise RuntimeError("quota exceeded")
+        yield
+
+class Client:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+@pytest.fixture(autouse=True)
+def llm(monkeypatch):
+    monkeypatch.setattr(chat, "get_llm", lambda model_name: StallingLLM())
+
+async def open_stream(client: Client):
+    user = {"_id": ObjectId()}
+    session = await session_repository.create(SessionModel(user_id=str(user["_id"]), name="chat"))
+    response = await chat.stream_message(str(session["_id"]), ChatMessageCreate(content="remember this"), client, user)
+    return str(session["_id"]), response
+
+async def start_stream(client: Client):
+    session_id, response = await open_stream(client)
+    frames = response.body_iterator
+    assert "event: token" in await frames.__anext__()
+    return session_id, frames
+
+async def stored_state(session_id: str):
+    await asyncio.gather(*chat.pending_saves)
+    messages = [message async for message in chat_message_repository.iterate_for_session(session_id, 10)]
+    session = await session_repository.find_one({"_id": ObjectId(session_id)})
+    return [(message["message_type"], message["content"]) for message in messages], session["message_count"]
+
+def test_cancelled_stream_keeps_user_message():
+    async def scenario():
+        session_id, frames = await start_stream(Client())
+        consumer = asyncio.create_task(frames.__anext__())
+        await asyncio.sleep(0)
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        return await stored_state(session_id)
+
+    assert asyncio.run(scenario()) == ([("user", "remember this")], 1)
+
+def test_closed_stream_keeps_user_message():
+    async def scenario():
+        session_id, frames = await start_stream(Client())
+        await frames.aclose()
+        return await stored_state(session_id)
+
+    assert asyncio.run(scenario()) == ([("user", "remember this")], 1)
+
+def test_stream_never_iterated_keeps_user_message():
+    async def scenario():
+        session_id, response = await open_stream(Client())
+        # The client went away before the response started; only the background task runs
+        await response.background()
+        return await stored_state(session_id)
+
+    assert asyncio.run(scenario()) == ([("user", "remember this")], 1)
+
+def test_finished_stream_saves_reply_after_user_message(monkeypatch):
+    monkeypatch.setattr(chat, "get_llm", lambda model_name: FinishingLLM())
+
+    async def scenario():
+        session_id, response = await open_stream(Client())
+        frames = [frame async for frame in response.body_iterator]
+        return frames, await stored_state(session_id)
+
+    frames, state = asyncio.run(scenario())
+    assert frames[-1].startswith("event: message")
+    assert state == ([("user", "remember this"), ("bot", "hello there")], 2)
+
+def test_failed_stream_logs_the_error(monkeypatch, caplog):
+    monkeypatch.setattr(chat, "get_llm", lambda model_name: FailingLLM())
+
+    async def scenario():
+        session_id, response = await open_stream(Client())
+        frames = [frame async for frame in response.body_iterator]
+        return frames, await stored_state(session_id)
+
+    frames, state = asyncio.run(scenario())
+    assert frames[0].startswith("event: error")
+    assert state[0][-1] == ("bot", chat.LLM_ERROR_MESSAGE)
+    assert any(record.exc_info and "quota exceeded" in str(record.exc_info[1]) for record in caplog.records)
@@ -0,0 +1,203 @@
+import asyncio
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.core.document_store import InMemoryClient
+from app.models.memory import MemoryModel
+from app.repositories.memory import MemoryRepository
+from app.services.dedup import (
+    MinHasher, consolidate_user_memories, dedup_fields, dedup_tokens, find_duplicate_groups, find_near_duplicate,
+    is_negated, minhasher, pick_survivor,
+)
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def similarity(first: str, second: str) -> float:
+    return MinHasher.similarity(minhasher.signature(first), minhasher.signature(second))
+
+def memory(content: str, memo_type: str = "core_memory", **extra) -> dict:
+    return {"_id": ObjectId(), "content": content, "memo_type": memo_type, **dedup_fields(content), **extra}
+
+@pytest.fixture
+def repository():
+    return MemoryRepository(InMemoryClient()["test"]["memories"])
+
+async def store(repository: MemoryRepository, user_id: str, content: str, memo_type: str = "core_memory") -> dict:
+    return await repository.create(MemoryModel(user_id=user_id, content=content, memo_type=memo_type, **dedup_fields(content)))
+
+def test_signature_is_deterministic():
+    text = "The user lives in Berlin with two cats"
+
+    assert (minhasher.signature(text) == minhasher.signature(text)).all()
+    assert dedup_fields(text) == dedup_fields(text)
+
+def test_similarity_separates_rewordings_from_unrelated_text():
+    assert similarity("The user lives in Berlin with two cats", "The user lives in Berlin with two cats now") >= 0.7
+    assert similarity("The user lives in Berlin with two cats", "The user is training for a marathon") < 0.2
+
+def test_text_without_shingles_has_no_signature():
+    assert minhasher.signature("") is None
+    assert dedup_fields("") == {"minhash": None, "lsh_bands": []}
+
+def test_dedup_tokens_keep_negations():
+    assert dedup_tokens("The user does not eat meat") == ["user", "not", "eat", "meat"]
+    assert dedup_tokens("The user doesn't eat meat") == ["user", "not", "eat", "meat"]
+    assert dedup_tokens("The user\u2019s sister can\u2019t swim") == ["user", "sister", "not", "swim"]
+    assert dedup_tokens("No pets, nor plans for any") == ["no", "pets", "nor", "plans"]
+
+@pytest.mark.parametrize("text, negated", [
+    ("User eats meat", False),
+    ("User does not eat meat", True),
+    ("User never eats meat", True),
+    ("User isn't against eating meat", False),
+])
+def test_is_negated(text, negated):
+    assert is_negated(text) is negated
+
+NEGATION_PAIRS = [
+    ("User has been vegetarian for ten years and cooks at home every day",
+     "User has not been vegetarian for ten years and cooks at home every day"),
+    ("User likes living in the big city close to work and friends",
+     "User doesn't like living in the big city close to work and friends"),
+    ("User wants children with their partner in the next few years",
+     "User never wants children with their partner in the next few years"),
+]
+
+@pytest.mark.parametrize("statement, negation", NEGATION_PAIRS)
+def test_negation_is_not_a_near_duplicate(repository, statement, negation):
+    async def scenario():
+        await store(repository, "alice", statement)
+        return await find_near_duplicate("alice", "core_memory", negation, repository=repository)
+
+    assert run(scenario()) is None
+
+@pytest.mark.parametrize("statement, negation", NEGATION_PAIRS)
+def test_negation_is_not_grouped_for_consolidation(statement, negation):
+    assert find_duplicate_groups([memory(statement), memory(negation)], threshold=0.7) == []
+
+def test_find_duplicate_groups_keeps_types_apart():
+    memories = [
+        memory("User loves hiking in the Alps every summer"),
+        memory("User loves hiking in the Alps every summer!"),
+        memory("User loves hiking in the Alps every summer", memo_type="environment_memory"),
+        memory("User is allergic to peanuts"),
+    ]
+
+    groups = find_duplicate_groups(memories, threshold=0.7)
+
+    assert [sorted(member["_id"] for member in group) for group in groups] == [
+        sorted([memories[0]["_id"], memories[1]["_id"]])
+    ]
+
+def test_pick_survivor_prefers_longest_then_newest():
+    older = {"content": "User likes tea", "created_at": datetime.datetime(2024, 1, 1)}
+    newer = {"content": "User likes tea", "created_at": datetime.datetime(2024, 2, 1)}
+    longer = {"content": "User likes green tea", "created_at": datetime.datetime(2023, 1, 1)}
+
+    assert pick_survivor([older, newer]) is newer
+    assert pick_survivor([older, newer, longer]) is longer
+
+def test_pick_survivor_handles_missing_creation_time():
+    undated = {"content": "User likes tea"}
+    dated = {"content": "User likes tea", "created_at": datetime.datetime(2024, 1, 1)}
+
+    assert pick_survivor([undated, dated]) is dated
+    assert pick_survivor([dated, undated]) is dated
+    assert pick_survivor([undated, {"content": "User likes tea", "created_at": None}]) is undated
+
+def test_find_near_duplicate_matches_same_user_and_type(repository):
+    async def scenario():
+        stored = await store(repository, "alice", "User works as a nurse at the city hospital")
+        await store(repository, "bob", "User works as a nurse at the city hospital now")
+        content = "User works as a nurse at the city hospital now"
+        same = await find_near_duplicate("alice", "core_memory", content, repository=repository)
+        other_type = await find_near_duplicate("alice", "environment_memory", content, repository=repository)
+        unrelated = await find_near_duplicate("alice", "core_memory", "User plays the violin", repository=repository)
+        return stored, same, other_type, unrelated
+
+    stored, same, other_type, unrelated = run(scenario())
+    assert same["_id"] == stored["_id"]
+    assert other_type is None
+    assert unrelated is None
+
+def test_consolidate_removes_duplicates_and_reports_savings(repository):
+    async def scenario():
+        await store(repository, "alice", "User has a dog named Rex")
+        await store(repository, "alice", "User has a dog named Rex.")
+        await store(repository, "alice", "User has a dog that is named Rex")
+        await store(repository, "alice", "User studies chemistry")
+        dry_run = await consolidate_user_memories("alice", dry_run=True, repository=repository)
+        report = await consolidate_user_memories("alice", repository=repository)
+        remaining = await repository.list_for_user("alice")
+        return dry_run, report, remaining
+
+    dry_run, report, remaining = run(scenario())
+    assert dry_run["memories_removed"] == report["memories_removed"]
+    assert report["duplicate_groups"] == 1
+    assert report["memories_scanned"] == 4
+    assert report["prompt_tokens_saved"] > 0
+    assert len(remaining) == 4 - report["memories_removed"]
+    assert "User studies chemistry" in [memory["content"] for memory in remaining]
+
+def one_word_edits(first: str, last: str) -> list:
+    """
+    Rewrite `first` into `last` one word at a time, returning every step
+    """
+    words, replacements = first.split(), last.split()
+    steps = [first]
+    for position, replacement in enumerate(replacements):
+        words[position] = replacement
+        steps.append(" ".join(words))
+    return steps
+
+def test_chained_rewordings_are_only_grouped_with_a_close_survivor():
+    chain = one_word_edits(
+        "user spent last summer hiking mountains near lake with old school friends",
+        "person passed previous winter climbing hills beside river alongside former college pals",
+    )
+    memories = [memory(content) for content in chain]
+
+    groups = find_duplicate_groups(memories, threshold=0.7)
+
+    # Neighbours match, so joining matches transitively would chain far rewordings into one group
+    assert similarity(chain[0], chain[-1]) < 0.2
+    assert groups
+    for group in groups:
+        survivor = pick_survivor(group)
+        assert all(similarity(survivor["content"], member["content"]) >= 0.7 for member in group)
+
+def test_consolidate_keeps_memories_unlike_the_survivor(repository):
+    chain = one_word_edits(
+        "user spent last summer hiking mountains near lake with old school friends",
+        "person passed previous winter climbing hills beside river alongside former college pals",
+    )
+
+    async def scenario():
+        for content in chain:
+            await store(repository, "alice", content)
+        report = await consolidate_user_memories("alice", repository=repository)
+        return report, [memory["content"] for memory in await repository.list_for_user("alice")]
+
+    report, remaining = run(scenario())
+    assert len(remaining) == len(chain) - report["memories_removed"]
+    # Every deleted memory nearly duplicates one that was kept
+    for content in set(chain) - set(remaining):
+        assert max(similarity(content, kept) for kept in remaining) >= 0.7
+
+def test_consolidate_backfills_unsigned_memories_once(repository):
+    async def scenario():
+        for content in ("User has a dog named Rex", "User has a dog named Rex.", "User studies chemistry"):
+            await repository.create(MemoryModel(user_id="alice", content=content, memo_type="core_memory"))
+        dry_run = await consolidate_user_memories("alice", dry_run=True, repository=repository)
+        first = await consolidate_user_memories("alice", repository=repository)
+        second = await consolidate_user_memories("alice", repository=repository)
+        return dry_run, first, second
+
+    dry_run, first, second = run(scenario())
+    assert dry_run["memories_removed"] == first["memories_removed"] == 1
+    assert first["signatures_backfilled"] == 3
+    assert second["signatures_backfilled"] == 0
+    assert second["memories_removed"] == 0
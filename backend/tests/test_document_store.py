@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+
+import pytest
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.core.document_store import InMemoryClient
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+@pytest.fixture
+def collection():
+    return InMemoryClient()["test"]["documents"]
+
+async def seed(collection, indexed: bool):
+    if indexed:
+        await collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+        await collection.create_index([("tags", 1)])
+    start = datetime.datetime(2024, 1, 1)
+    await collection.insert_many([
+        {
+            "user_id": f"user-{index % 3}",
+            "n": index,
+            "tags": ["even" if index % 2 == 0 else "odd"] + (["fifth"] if index % 5 == 0 else []),
+            "created_at": start + datetime.timedelta(minutes=index),
+            **({"flag": True} if index % 4 == 0 else {}),
+        }
+        for index in range(30)
+    ])
+
+@pytest.mark.parametrize("indexed", [False, True])
+@pytest.mark.parametrize("query, expected", [
+    ({"user_id": "user-1"}, [n for n in range(30) if n % 3 == 1]),
+    ({"n": {"$gte": 10, "$lt": 13}}, [10, 11, 12]),
+    ({"n": {"$in": [1, 2, 99]}}, [1, 2]),
+    ({"n": {"$nin": list(range(1, 30))}}, [0]),
+    ({"n": {"$ne": 0}, "user_id": "user-0", "tags": "fifth"}, [15]),
+    ({"tags": "fifth", "n": {"$gt": 0}}, [5, 10, 15, 20, 25]),
+    ({"flag": {"$exists": False}, "n": {"$lt": 4}}, [1, 2, 3]),
+    ({"$or": [{"n": 1}, {"n": {"$gt": 27}}]}, [1, 28, 29]),
+    ({"$and": [{"n": {"$gt": 5}}, {"n": {"$lt": 8}}]}, [6, 7]),
+    ({"user_id": "user-2", "created_at": {"$gt": datetime.datetime(2024, 1, 1, 0, 20)}}, [23, 26, 29]),
+])
+def test_find_matches_query_with_or_without_indexes(collection, indexed, query, expected):
+    async def scenario():
+        await seed(collection, indexed)
+        found = await collection.find(query).sort("n", 1).to_list(length=None)
+        return [document["n"] for document in found]
+
+    assert run(scenario()) == expected
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_find_sorts_skips_and_limits(collection, indexed):
+    async def scenario():
+        await seed(collection, indexed)
+        cursor = collection.find({"user_id": "user-0"}).sort([("created_at", -1), ("_id", -1)]).skip(1).limit(3)
+        return [document["n"] for document in await cursor.to_list(length=None)]
+
+    assert run(scenario()) == [24, 21, 18]
+
+def test_planner_uses_compound_index_for_prefix_and_sort(collection):
+    async def scenario():
+        await seed(collection, indexed=True)
+        return collection.explain({"user_id": "user-0"}, sort=[("created_at", -1), ("_id", -1)])
+
+    plan = run(scenario())
+    assert plan.get("index") == "user_id_1_created_at_-1__id_-1"
+
+def test_projection_includes_or_excludes_fields(collection):
+    async def scenario():
+        await seed(collection, indexed=False)
+        included = await collection.find_one({"n": 4}, {"n": 1})
+        only_id = await collection.find_one({"n": 4}, {"_id": 1})
+        excluded = await collection.find_one({"n": 4}, {"tags": 0, "created_at": 0})
+        return included, only_id, excluded
+
+    included, only_id, excluded = run(scenario())
+    assert set(included) == {"_id", "n"}
+    assert set(only_id) == {"_id"}
+    assert set(excluded) == {"_id", "user_id", "n", "flag"}
+
+def test_returned_documents_are_copies(collection):
+    async def scenario():
+        await collection.insert_one({"_id": 1, "tags": ["a"]})
+        found = await collection.find_one({"_id": 1})
+        found["tags"].append("b")
+        return await collection.find_one({"_id": 1})
+
+    assert run(scenario())["tags"] == ["a"]
+
+def test_datetimes_are_stored_as_naive_utc_milliseconds(collection):
+    async def scenario():
+        aware = datetime.datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+        await collection.insert_one({"_id": 1, "at": aware})
+        return (await collection.find_one({"_id": 1}))["at"]
+
+    assert run(scenario()) == datetime.datetime(2024, 1, 1, 10, 0, 0, 123000)
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_update_operators(collection, indexed):
+    async def scenario():
+        await seed(collection, indexed)
+        first = await collection.update_one(
+            {"n": 3},
+            {"$set": {"user_id": "user-9", "meta.note": "moved"}, "$inc": {"n": 100}, "$unset": {"tags": ""}},
+        )
+        second = await collection.update_one({"n": 103}, {"$push": {"history": "a"}, "$max": {"n": 50}})
+        missing = await collection.update_one({"n": -1}, {"$set": {"x": 1}})
+        moved = await collection.find({"user_id": "user-9"}).to_list(length=None)
+        return first, second, missing, moved
+
+    first, second, missing, moved = run(scenario())
+    assert (first.matched_count, first.modified_count) == (1, 1)
+    assert (second.matched_count, second.modified_count) == (1, 1)
+    assert missing.matched_count == 0
+    assert len(moved) == 1
+    document = moved[0]
+    assert document["n"] == 103
+    assert document["meta"] == {"note": "moved"}
+    assert "tags" not in document
+    assert document["history"] == ["a"]
+
+def test_update_keeps_indexes_in_sync(collection):
+    async def scenario():
+        await seed(collection, indexed=True)
+        await collection.update_many({"user_id": "user-0"}, {"$set": {"user_id": "user-x"}})
+        old = await collection.count_documents({"user_id": "user-0"})
+        new = await collection.count_documents({"user_id": "user-x"})
+        deleted = await collection.delete_many({"user_id": "user-x", "n": {"$gte": 15}})
+        remaining = await collection.count_documents({"user_id": "user-x"})
+        return old, new, deleted.deleted_count, remaining
+
+    assert run(scenario()) == (0, 10, 5, 5)
+
+def test_upsert_seeds_document_from_query(collection):
+    async def scenario():
+        result = await collection.update_one(
+            {"_id": "indexes"}, {"$max": {"version": 2}, "$push": {"applied": 2}}, upsert=True
+        )
+        await collection.update_one({"_id": "indexes"}, {"$max": {"version": 1}, "$push": {"applied": 1}}, upsert=True)
+        return result.upserted_id, await collection.find_one({"_id": "indexes"})
+
+    upserted_id, document = run(scenario())
+    assert upserted_id == "indexes"
+    assert document == {"_id": "indexes", "version": 2, "applied": [2, 1]}
+
+def test_find_one_and_update_returns_requested_version(collection):
+    async def scenario():
+        await collection.insert_one({"_id": 1, "count": 0})
+        before = await collection.find_one_and_update({"_id": 1}, {"$inc": {"count": 1}})
+        after = await collection.find_one_and_update(
+            {"_id": 1}, {"$inc": {"count": 1}}, return_document=ReturnDocument.AFTER
+        )
+        return before["count"], after["count"]
+
+    assert run(scenario()) == (0, 2)
+
+def test_unique_index_rejects_duplicates(collection):
+    async def scenario():
+        await collection.create_index("email", unique=True)
+        await collection.insert_one({"email": "a@example.com"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"email": "a@example.com"})
+        with pytest.raises(BulkWriteError) as error:
+            await collection.insert_many([{"email": "b@example.com"}, {"email": "a@example.com"}, {"email": "c@example.com"}])
+        assert error.value.details["nInserted"] == 1
+        second = await collection.insert_one({"email": "d@example.com"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.update_one({"_id": second.inserted_id}, {"$set": {"email": "b@example.com"}})
+        return sorted(document["email"] for document in await collection.find({}).to_list(length=None))
+
+    assert run(scenario()) == ["a@example.com", "b@example.com", "d@example.com"]
+
+def test_text_search_scores_and_scopes(collection):
+    async def scenario():
+        await collection.create_index([("user_id", 1), ("content", "text")])
+        await collection.insert_many([
+            {"user_id": "alice", "content": "hiking in the mountains"},
+            {"user_id": "alice", "content": "mountains mountains everywhere"},
+            {"user_id": "alice", "content": "a quiet day at home"},
+            {"user_id": "bob", "content": "mountains"},
+        ])
+        cursor = collection.find(
+            {"user_id": "alice", "$text": {"$search": "mountains"}},
+            {"content": 1, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"})])
+        return await cursor.to_list(length=None)
+
+    found = run(scenario())
+    assert [document["content"] for document in found] == ["mountains mountains everywhere", "hiking in the mountains"]
+    assert found[0]["score"] > found[1]["score"]
+
+def test_aggregate_match_group_sort(collection):
+    async def scenario():
+        await seed(collection, indexed=True)
+        pipeline = [
+            {"$match": {"n": {"$lt": 9}}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}, "total": {"$sum": "$n"}}},
+            {"$sort": {"_id": 1}},
+        ]
+        return await collection.aggregate(pipeline).to_list(length=None)
+
+    assert run(scenario()) == [
+        {"_id": "user-0", "count": 3, "total": 9},
+        {"_id": "user-1", "count": 3, "total": 12},
+        {"_id": "user-2", "count": 3, "total": 15},
+    ]
@@ -0,0 +1,25 @@
+from app.core.database import database
+
+def test_live_returns_only_status_and_counts(client):
+    response = client.get("/health/live")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive", "pool": {"open": 0, "checked_out": 0, "waiting": 0}}
+
+def test_ready(client):
+    response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"status", "pool"}
+    assert response.json()["status"] == "ready"
+
+def test_ready_does_not_leak_failure_details(client, monkeypatch, caplog):
+    async def unreachable():
+        raise ConnectionError("db-primary.internal:27017 refused the connection")
+
+    monkeypatch.setattr(database, "ping", unreachable)
+    response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "unavailable", "pool": {"open": 0, "checked_out": 0, "waiting": 0}}
+    assert "db-primary.internal" in caplog.text
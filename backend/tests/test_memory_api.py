@@ -0,0 +1,78 @@
+import json
+
+def create(client, headers, content, memo_type="core_memory"):
+    response = client.post("/api/memory/", headers=headers, json={"content": content, "memo_type": memo_type})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_create_flags_near_duplicate_without_merging(client, auth_headers):
+    first = create(client, auth_headers, "User loves hiking in the Alps every summer with friends")
+    second = create(client, auth_headers, "User loves hiking in the Alps every summer with old friends")
+
+    assert first["duplicate_of"] is None
+    assert second["duplicate_of"] == first["id"]
+    assert second["id"] != first["id"]
+    contents = [memory["content"] for memory in client.get("/api/memory/", headers=auth_headers).json()]
+    assert sorted(contents) == sorted([first["content"], second["content"]])
+
+def test_create_never_matches_a_negation(client, auth_headers):
+    statement = create(client, auth_headers, "User has been vegetarian for ten years and cooks at home every day")
+    negation = create(client, auth_headers, "User has not been vegetarian for ten years and cooks at home every day")
+
+    assert negation["duplicate_of"] is None
+    stored = client.get(f"/api/memory/{statement['id']}", headers=auth_headers).json()
+    assert stored["content"] == statement["content"]
+
+def import_lines(client, headers, lines):
+    body = "".join(json.dumps(line) + "\n" for line in lines)
+    response = client.post("/api/memory/import", headers=headers, content=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_reimporting_an_export_adds_nothing(client, auth_headers):
+    create(client, auth_headers, "User grew up in a small town by the sea")
+    create(client, auth_headers, "User is learning to play the cello", memo_type="environment_memory")
+    export = [json.loads(line) for line in client.get("/api/memory/export", headers=auth_headers).text.splitlines()]
+
+    report = import_lines(client, auth_headers, export)
+
+    assert (report["imported"], report["duplicates"], report["failed"]) == (0, 2, 0)
+    assert len(client.get("/api/memory/", headers=auth_headers).json()) == 2
+
+def test_import_skips_duplicates_within_the_file(client, auth_headers):
+    lines = [
+        {"content": "User runs five kilometres every morning before work", "memo_type": "core_memory"},
+        {"content": "User does not run five kilometres every morning before work", "memo_type": "core_memory"},
+        {"content": "User runs five kilometres every morning before work!", "memo_type": "core_memory"},
+        {"content": "User runs five kilometres every morning before work", "memo_type": "environment_memory"},
+    ]
+
+    report = import_lines(client, auth_headers, lines)
+
+    assert (report["imported"], report["duplicates"]) == (3, 1)
+    contents = {(memory["content"], memory["memo_type"]) for memory in client.get("/api/memory/", headers=auth_headers).json()}
+    assert (lines[2]["content"], "core_memory") not in contents
+
+def test_list_is_unpaged_without_limit_or_cursor(client, auth_headers):
+    lines = [{"content": f"Fact {index} about topic {index}", "memo_type": "core_memory"} for index in range(60)]
+    assert import_lines(client, auth_headers, lines)["imported"] == 60
+
+    response = client.get("/api/memory/", headers=auth_headers)
+
+    assert len(response.json()) == 60
+    assert "X-Next-Cursor" not in response.headers
+
+def test_list_pages_with_limit_and_cursor(client, auth_headers):
+    lines = [{"content": f"Fact {index} about topic {index}", "memo_type": "core_memory"} for index in range(60)]
+    import_lines(client, auth_headers, lines)
+
+    first = client.get("/api/memory/?limit=25", headers=auth_headers)
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/api/memory/", headers=auth_headers, params={"cursor": cursor})
+
+    assert len(first.json()) == 25
+    # A cursor without a limit pages by the default size
+    assert len(second.json()) == 35
+    assert "X-Next-Cursor" not in second.headers
+    ids = [memory["id"] for memory in first.json() + second.json()]
+    assert len(set(ids)) == 60
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage
+
+from app.core.document_store import InMemoryClient
+from app.models.memory import MemoryModel
+from app.repositories.memory import MemoryRepository
+from app.services.dedup import dedup_fields
+from app.services.memory_extraction import ChatTurnRecord, MemoryExtractor, parse_extracted_memories
+
+class ScriptedLLM:
+    def __init__(self, memories):
+        self.reply = json.dumps(memories)
+
+    async def ainvoke(self, messages):
+        return AIMessage(content=self.reply)
+
+def extractor(memories, repository):
+    return MemoryExtractor(
+        turns_per_call=1, max_delay_seconds=1, queue_size=10, concurrency=1,
+        llm_factory=lambda: ScriptedLLM(memories), repository=repository,
+    )
+
+def test_parse_tolerates_fences_and_drops_invalid_entries():
+    reply = '```json\n[{"content": " Likes tea ", "memo_type": "core_memory"}, {"content": "", "memo_type": "core_memory"}, ' \
+            '{"content": "x", "memo_type": "other"}, "junk"]\n```'
+
+    assert parse_extracted_memories(reply) == [{"content": "Likes tea", "memo_type": "core_memory"}]
+    assert parse_extracted_memories("no memories here") == []
+
+def test_extraction_skips_duplicates_within_a_batch_and_of_stored_memories():
+    repository = MemoryRepository(InMemoryClient()["test"]["memories"])
+    stored = "User works night shifts as a nurse at the city hospital"
+    extracted = [
+        {"content": "User works night shifts as a nurse at the city hospital", "memo_type": "core_memory"},
+        {"content": "User adopted a rescue greyhound called Pepper last spring", "memo_type": "core_memory"},
+        {"content": "User adopted a rescue greyhound called Pepper last spring!", "memo_type": "core_memory"},
+        {"content": "User did not adopt a rescue greyhound called Pepper last spring", "memo_type": "core_memory"},
+    ]
+    worker = extractor(extracted, repository)
+
+    async def scenario():
+        await repository.create(MemoryModel(user_id="alice", content=stored, memo_type="core_memory", **dedup_fields(stored)))
+        documents = await worker.extract("alice", [ChatTurnRecord("alice", "hi", "hello")])
+        return documents, await repository.list_for_user("alice")
+
+    documents, memories = asyncio.run(scenario())
+    assert [document["content"] for document in documents] == [extracted[1]["content"], extracted[3]["content"]]
+    assert worker.duplicates_skipped == 2
+    assert len(memories) == 3
@@ -0,0 +1,15 @@
+from app.services.metrics import metrics_registry
+
+def test_requests_are_labelled_with_the_declared_route(client, auth_headers):
+    # The session id equals the route's literal last segment
+    response = client.get("/api/chat/messages/messages", headers=auth_headers)
+    assert response.status_code == 404
+
+    rendered = metrics_registry.render()
+    assert 'route="/api/chat/{session_id}/messages"' in rendered
+    assert "{session_id}/{session_id}" not in rendered
+
+def test_pool_gauges_are_registered():
+    rendered = metrics_registry.render()
+    for name in ("mongo_pool_open_connections", "mongo_pool_checked_out_connections", "mongo_pool_wait_queue"):
+        assert f"\n{name} " in rendered
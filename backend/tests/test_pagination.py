@@ -0,0 +1,45 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.core.document_store import matches
+from app.repositories.pagination import decode_cursor, encode_cursor, keyset_filter
+
+def test_cursor_round_trip():
+    sort_value = datetime.datetime(2024, 5, 1, 12, 30, 15, 123000)
+    object_id = ObjectId()
+
+    cursor = encode_cursor(sort_value, object_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (sort_value, object_id)
+
+def test_cursor_round_trip_keeps_timezone():
+    sort_value = datetime.datetime(2024, 5, 1, 12, tzinfo=datetime.timezone.utc)
+
+    decoded, _ = decode_cursor(encode_cursor(sort_value, ObjectId()))
+
+    assert decoded == sort_value
+    assert decoded.tzinfo is not None
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "WzEsMl0", encode_cursor(datetime.datetime(2024, 1, 1), ObjectId())[:-4]])
+def test_decode_rejects_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_keyset_filter_resumes_after_cursor():
+    timestamp = datetime.datetime(2024, 1, 1)
+    ids = sorted(ObjectId() for _ in range(3))
+    documents = [
+        {"_id": ids[0], "created_at": timestamp},
+        {"_id": ids[1], "created_at": timestamp},
+        {"_id": ids[2], "created_at": timestamp + datetime.timedelta(seconds=1)},
+    ]
+    cursor = encode_cursor(timestamp, ids[1])
+
+    after = [document["_id"] for document in documents if matches(document, keyset_filter("created_at", cursor, 1))]
+    before = [document["_id"] for document in documents if matches(document, keyset_filter("created_at", cursor, -1))]
+
+    assert after == [ids[2]]
+    assert before == [ids[0]]
@@ -0,0 +1,62 @@
+import datetime
+import json
+
+import pytest
+from bson import ObjectId
+
+from app.schemas.memory import MemoryListItem
+from app.schemas.session import SessionResponse
+from app.services import serialization
+from app.services.ndjson import dumps_line
+from app.services.serialization import DocumentSerializer, dumps, format_datetime
+
+UTC = datetime.timezone.utc
+DATETIMES = [
+    datetime.datetime(2024, 3, 1, 12, 30),
+    datetime.datetime(2024, 3, 1, 12, 30, 15, 123000),
+    datetime.datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=UTC),
+]
+
+@pytest.fixture(params=["orjson", "pydantic-core"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+@pytest.mark.parametrize("created_at", DATETIMES)
+def test_fast_path_matches_response_model(encoder, created_at):
+    document = {"_id": ObjectId(), "user_id": "u", "content": "c", "memo_type": "core_memory", "created_at": created_at}
+    serializer = DocumentSerializer(MemoryListItem)
+
+    fast = dumps(serializer.items([document]))
+    standard = f"[{MemoryListItem(**serializer.item(document)).model_dump_json()}]".encode()
+
+    assert fast == standard
+    assert json.loads(fast)[0]["created_at"].endswith("Z")
+
+def test_every_datetime_field_is_utc():
+    naive = datetime.datetime(2024, 3, 1, 12, 30)
+    session = SessionResponse(
+        id="s", user_id="u", name="n", created_at=naive,
+        updated_at=datetime.datetime(2024, 3, 1, 14, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+        last_message_at=naive.replace(tzinfo=UTC),
+    )
+
+    encoded = json.loads(session.model_dump_json())
+
+    assert encoded["created_at"] == encoded["updated_at"] == encoded["last_message_at"] == "2024-03-01T12:30:00Z"
+
+def test_format_datetime_converts_to_utc(encoder):
+    offset = datetime.datetime(2024, 3, 1, 14, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+
+    assert format_datetime(offset) == "2024-03-01T12:30:00Z"
+    assert format_datetime(datetime.datetime(2024, 3, 1, 12, 30)) == "2024-03-01T12:30:00Z"
+    if encoder == "pydantic-core":
+        assert dumps({"at": offset}) == b'{"at":"2024-03-01T12:30:00Z"}'
+
+def test_ndjson_lines_use_the_same_format():
+    line = json.loads(dumps_line({"created_at": DATETIMES[1]}))
+
+    assert line["created_at"] == "2024-03-01T12:30:15.123000Z"
@@ -0,0 +1,63 @@
+import asyncio
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.api.endpoints import chat
+from app.core.database import database
+from app.core.migrations import migrate
+from app.models.chat import ChatMessageModel, MessageType
+from app.models.session import SessionModel
+from app.repositories.chat import chat_message_repository
+from app.repositories.session import session_repository
+from app.services import search
+from app.services.session_reaper import SessionReaper
+
+def message(session: dict, content: str) -> ChatMessageModel:
+    return ChatMessageModel(
+        session_id=str(session["_id"]), user_id=session["user_id"], content=content, message_type=MessageType.USER,
+    )
+
+async def new_session(user_id: str) -> dict:
+    return await session_repository.create(SessionModel(user_id=user_id, name="chat"))
+
+async def tombstone(session: dict) -> None:
+    assert await session_repository.tombstone_for_user(str(session["_id"]), session["user_id"], datetime.datetime.now(datetime.timezone.utc))
+
+def test_messages_saved_into_a_deleted_session_are_removed():
+    async def scenario():
+        session = await new_session(str(ObjectId()))
+        await tombstone(session)
+        await chat.store_messages([message(session, "hello"), message(session, "hi")], "hi")
+        return await chat_message_repository.count_for_session(str(session["_id"]))
+
+    assert asyncio.run(scenario()) == 0
+
+def test_messages_saved_after_the_reaper_purged_the_session_are_removed():
+    async def scenario():
+        session = await new_session(str(ObjectId()))
+        await tombstone(session)
+        await SessionReaper(batch_size=10, batch_interval_seconds=0, poll_seconds=60).reap_all()
+        await chat.store_messages([message(session, "late reply")], "late reply")
+        return await chat_message_repository.count_for_session(str(session["_id"]))
+
+    assert asyncio.run(scenario()) == 0
+
+@pytest.mark.parametrize("backend", ["local", "mongo"])
+def test_search_fills_limit_from_live_sessions(monkeypatch, backend):
+    monkeypatch.setattr(search, "_search_backend", search.SEARCH_BACKENDS[backend]())
+
+    async def scenario():
+        await migrate(database)
+        user_id = str(ObjectId())
+        live, deleted = await new_session(user_id), await new_session(user_id)
+        await chat.store_messages([message(live, f"a trip to the lake, day {day}") for day in range(3)], "lake")
+        # Better matches, all in the session being deleted
+        await chat.store_messages([message(deleted, f"lake lake lake {day}") for day in range(5)], "lake")
+        await tombstone(deleted)
+        return str(live["_id"]), await search.search_user_content(user_id, "lake", "messages", limit=3)
+
+    live_id, hits = asyncio.run(scenario())
+    assert len(hits) == 3
+    assert {hit.document["session_id"] for hit in hits} == {live_id}
@@ -18,6 +18,8 @@ const MemoryManager = () => {
     setMemoryType,
     isLoading,
     error: memoryError,
+    loadMoreMemories,
+    hasMoreMemories,
     addMemory,
     editMemory,
     removeMemory
@@ -156,6 +158,11 @@ const MemoryManager = () => {
             </div>
           ))
         )}
+        {!isLoading && hasMoreMemories && (
+          <button type="button" className="btn load-more-btn" onClick={loadMoreMemories}>
+            Load more
+          </button>
+        )}
       </div>
 
       <form onSubmit={handleCreateMemory} className="new-memory-form">
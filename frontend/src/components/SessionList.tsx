@@ -8,6 +8,9 @@ interface Session {
   created_at: string;
   updated_at: string;
   last_message_at: string | null;
+  message_count: number;
+  last_message_preview: string | null;
+  total_tokens: number;
 }
 
 interface SessionListProps {
@@ -75,7 +78,12 @@ const SessionList = ({ sessions, activeSessionId, onSelectSession, onSessionsCha
               onClick={() => onSelectSession(session.id)}
             >
               <div className="session-name">{session.name}</div>
-              <div className="session-date">Last active: {formatDate(session.last_message_at || session.updated_at)}</div>
+              {session.last_message_preview && (
+                <div className="session-preview">{session.last_message_preview}</div>
+              )}
+              <div className="session-date">
+                Last active: {formatDate(session.last_message_at || session.updated_at)} · {session.message_count} messages
+              </div>
               <button 
                 className="session-delete-btn"
                 onClick={(e) => handleDeleteSession(session.id, e)}
@@ -10,6 +10,7 @@ interface Memory {
 
 export const useMemory = (initialType: string = 'core_memory') => {
   const [memories, setMemories] = useState<Memory[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | undefined>(undefined);
   const [memoryType, setMemoryType] = useState<string>(initialType);
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
@@ -19,9 +20,10 @@ export const useMemory = (initialType: string = 'core_memory') => {
     setIsLoading(true);
     setError(null);
     try {
-      const data = await fetchMemories(memoType);
-      setMemories(data);
-      return data;
+      const page = await fetchMemories(memoType);
+      setMemories(page.memories);
+      setNextCursor(page.nextCursor);
+      return page.memories;
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Failed to load memories');
       return [];
@@ -30,6 +32,21 @@ export const useMemory = (initialType: string = 'core_memory') => {
     }
   }, [memoryType]);
 
+  const loadMoreMemories = useCallback(async () => {
+    if (!nextCursor) return;
+    setIsLoading(true);
+    setError(null);
+    try {
+      const page = await fetchMemories(memoryType, nextCursor);
+      setMemories(current => [...current, ...page.memories]);
+      setNextCursor(page.nextCursor);
+    } catch (err: any) {
+      setError(err.response?.data?.detail || 'Failed to load memories');
+    } finally {
+      setIsLoading(false);
+    }
+  }, [memoryType, nextCursor]);
+
   const addMemory = useCallback(async (content: string, type?: string) => {
     const memoType = type || memoryType;
     setIsLoading(true);
@@ -89,6 +106,8 @@ export const useMemory = (initialType: string = 'core_memory') => {
     isLoading,
     error,
     loadMemories,
+    loadMoreMemories,
+    hasMoreMemories: nextCursor !== undefined,
     addMemory,
     editMemory,
     removeMemory
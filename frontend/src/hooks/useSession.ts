@@ -7,6 +7,9 @@ interface Session {
   created_at: string;
   updated_at: string;
   last_message_at: string | null;
+  message_count: number;
+  last_message_preview: string | null;
+  total_tokens: number;
 }
 
 export const useSession = () => {
@@ -21,8 +21,9 @@ export const deleteSession = async (sessionId: string) => {
 };
 
 // Chat API
-export const fetchChatHistory = async (sessionId: string, limit = 50, skip = 0) => {
-  const response = await axios.get(`/api/chat/${sessionId}/messages?limit=${limit}&skip=${skip}`);
+export const fetchChatHistory = async (sessionId: string, limit = 50, before?: string) => {
+  const cursor = before ? `&before=${encodeURIComponent(before)}` : '';
+  const response = await axios.get(`/api/chat/${sessionId}/messages?limit=${limit}${cursor}`);
   return response.data;
 };
 
@@ -32,10 +33,12 @@ export const sendMessage = async (sessionId: string, content: string, reasoning
 };
 
 // Memory API
-export const fetchMemories = async (memoType?: string) => {
-  const url = memoType ? `/api/memory?memo_type=${memoType}` : '/api/memory';
-  const response = await axios.get(url);
-  return response.data;
+export const fetchMemories = async (memoType?: string, cursor?: string, limit = 50) => {
+  const params: Record<string, string | number> = { limit, fields: 'content,memo_type,created_at' };
+  if (memoType) params.memo_type = memoType;
+  if (cursor) params.cursor = cursor;
+  const response = await axios.get('/api/memory', { params });
+  return { memories: response.data, nextCursor: response.headers['x-next-cursor'] as string | undefined };
 };
 
 export const createMemory = async (content: string, memoType: string) => {